@@ -2,7 +2,7 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-from scripts import (help_pagination, round_robin, formatter, metaltronus, saga, seventh_tachyon, small_world, standings, tiebreakers, top_archetype_breakdown, tournament, top_archetypes, top_cards, card_price_scraper, feedback)
+from scripts import (help_pagination, round_robin, formatter, metaltronus, saga, seventh_tachyon, small_world, standings, tiebreakers, top_archetype_breakdown, tournament, top_archetypes, top_cards, card_price_scraper, feedback, card_repository, command_pool, decklist_scraper)
 from dotenv import load_dotenv
 import os
 import asyncio
@@ -56,9 +56,9 @@ client = Client(command_prefix="!", intents=intents)
 # MARK: CARD PRICE 
 @client.tree.command(name="card_price", description="View a card's pricing from TCG Player")
 @app_commands.describe(
-    card_name="(Required): Any Yu-Gi-Oh! card name (Partial names work as well)", 
-    set_code="(Optional): The set code of the card's printing")
-async def card_price_helper(interaction: discord.Interaction, card_name: str, set_code: str = None):
+    card_name="(Optional): Any Yu-Gi-Oh! card name (Partial names work as well)", 
+    set_code="(Optional): The set code of the card's printing (Works without a card name)")
+async def card_price_helper(interaction: discord.Interaction, card_name: str = None, set_code: str = None):
     if update_lock.locked():
         await interaction.response.send_message("The bot is already in the process of retreiving another card's information.\nThis may have been triggered in another channel.\nPlease wait a short while until it finishes and try again", ephemeral=True)
     async with update_lock:
@@ -147,13 +147,48 @@ async def metaltronus_decklist_helper(
         return
 
     # Generate and send response
-    response = metaltronus.metaltronus_decklist(interaction.guild.id, opponents_decklist, your_decklist)
+    response = await command_pool.run_command(interaction, "metaltronus_decklist", metaltronus.metaltronus_decklist, interaction.guild.id, opponents_decklist, your_decklist)
+    # If response is None, the command timed out or the bot was busy and the message was already sent
+    if response is None:
+        return
     file_path = f"guilds/{interaction.guild.id}/docs/metaltronus_deck_compare.txt"
     with open(file_path, "rb") as file:
         await interaction.followup.send(response, file=discord.File(file_path))
 
 
 
+#MARK: METALTRONUS GAUNTLET
+@client.tree.command(name="metaltronus_gauntlet", description="Tests your deck's Metaltronus targets against every topping decklist")
+@app_commands.describe(
+    clipboard_ydk="(Use only 1 Method): Paste the copied \"Clipboard YDK\"", 
+    ydk_file="(Use only 1 Method): Upload a .ydk file")
+async def metaltronus_gauntlet_helper(interaction: discord.Interaction, clipboard_ydk: str = None, ydk_file: discord.Attachment = None):
+    # Defer the response and show the user that the bot is working on it
+    await interaction.response.defer(thinking=True)
+
+    # Get the decklist from the various input methods
+    decklist = await formatter.format_one_decklist_input(interaction, clipboard_ydk, ydk_file)
+
+    # If decklist is None, validation failed and message was already sent
+    if decklist is None:
+        return
+
+    # Generate and send response
+    file_path = f"guilds/{interaction.guild.id}/docs/metaltronus_gauntlet.txt"
+    if os.path.exists(file_path):
+        os.remove(file_path)
+    response = await command_pool.run_command(interaction, "metaltronus_gauntlet", metaltronus.metaltronus_gauntlet, interaction.guild.id, decklist)
+    # If response is None, the command timed out or the bot was busy and the message was already sent
+    if response is None:
+        return
+    if not os.path.exists(file_path):
+        await interaction.followup.send(response)
+        return
+    with open(file_path, "rb") as file:
+        await interaction.followup.send(response, file=discord.File(file_path))
+
+
+
 #MARK: METALTRONUS SINGLE
 @client.tree.command(name="metaltronus_single", description="Lists all the Metaltronus targets in the game for a specific card")
 @app_commands.describe(monster_name="(Required): Any Yu-Gi-Oh! monster card name (Partial names work as well)")
@@ -162,8 +197,14 @@ async def metaltronus_single_helper(interaction: discord.Interaction, monster_na
     await interaction.response.defer(thinking=True)
 
     # Create the response for the metaltronus output
-    response = metaltronus.metaltronus_single(interaction.guild.id, monster_name)
+    response = await command_pool.run_command(interaction, "metaltronus_single", metaltronus.metaltronus_single, interaction.guild.id, monster_name)
+    # If response is None, the command timed out or the bot was busy and the message was already sent
+    if response is None:
+        return
     file_path = f"guilds/{interaction.guild.id}/docs/metaltronus_single.txt"
+    if not os.path.exists(file_path):
+        await interaction.followup.send(response)
+        return
     with open(file_path, "rb") as file:
         await interaction.followup.send(response, file=discord.File(file_path))
 # Adds autocomplete functionality to metaltronus function above
@@ -225,7 +266,10 @@ async def seventh_tachyon_list_helper(interaction: discord.Interaction):
     await interaction.response.defer(thinking=True)
 
     # Create the response for the metaltronus output
-    response = seventh_tachyon.seventh_tachyon_list(interaction.guild.id)
+    response = await command_pool.run_command(interaction, "seventh_tachyon", seventh_tachyon.seventh_tachyon_list, interaction.guild.id)
+    # If response is None, the command timed out or the bot was busy and the message was already sent
+    if response is None:
+        return
     file_path = f"guilds/{interaction.guild.id}/docs/seventh_tachyon_targets.txt"
     with open(file_path, "rb") as file:
         await interaction.followup.send(response, file=discord.File(file_path))
@@ -249,7 +293,10 @@ async def seventh_tachyon_decklist_helper(interaction: discord.Interaction, clip
         return
 
     # Create the response for the metaltronus output
-    response = seventh_tachyon.seventh_tachyon_decklist(interaction.guild.id, decklist)
+    response = await command_pool.run_command(interaction, "seventh_tachyon_decklist", seventh_tachyon.seventh_tachyon_decklist, interaction.guild.id, decklist)
+    # If response is None, the command timed out or the bot was busy and the message was already sent
+    if response is None:
+        return
     file_path = f"guilds/{interaction.guild.id}/docs/seventh_tachyon_deck_targets.txt"
     with open(file_path, "rb") as file:
         await interaction.followup.send(response, file=discord.File(file_path))
@@ -266,8 +313,14 @@ async def small_world_pair_helper(interaction: discord.Interaction, first_card:
     await interaction.response.defer(thinking=True)
 
     # Create the response for the metaltronus output
-    response = small_world.small_world_pair(interaction.guild.id, first_card, second_card)
+    response = await command_pool.run_command(interaction, "small_world", small_world.small_world_pair, interaction.guild.id, first_card, second_card)
+    # If response is None, the command timed out or the bot was busy and the message was already sent
+    if response is None:
+        return
     file_path = f"guilds/{interaction.guild.id}/docs/small_world.txt"
+    if not os.path.exists(file_path):
+        await interaction.followup.send(response)
+        return
     with open(file_path, "rb") as file:
         await interaction.followup.send(response, file=discord.File(file_path))
 @small_world_pair_helper.autocomplete("first_card")
@@ -294,13 +347,78 @@ async def small_world_decklist_helper(interaction: discord.Interaction, clipboar
         return
 
     # Create the response for the metaltronus output
-    response = small_world.small_world_decklist(interaction.guild.id, decklist)
+    response = await command_pool.run_command(interaction, "small_world_decklist", small_world.small_world_decklist, interaction.guild.id, decklist)
+    # If response is None, the command timed out or the bot was busy and the message was already sent
+    if response is None:
+        return
     file_path = f"guilds/{interaction.guild.id}/docs/small_world_decklist.txt"
     with open(file_path, "rb") as file:
         await interaction.followup.send(response, file=discord.File(file_path))
 
 
 
+# MARK: SMALL WORLD OPTIMIZE 
+@client.tree.command(name="small_world_optimize", description="Find the best Small World bridges for a decklist and a target")
+@app_commands.describe(
+    target_card="(Required): The Main Deck monster you want to reach (Partial names work as well)",
+    clipboard_ydk="(Use only 1 Method): Paste the copied \"Clipboard YDK\"", 
+    ydk_file="(Use only 1 Method): Upload a .ydk file")
+async def small_world_optimize_helper(interaction: discord.Interaction, target_card: str, clipboard_ydk: str = None, ydk_file: discord.Attachment = None):
+    # Defer the response and show the user that the bot is working on it
+    await interaction.response.defer(thinking=True)
+
+    # Get the decklist from the various input methods
+    decklist = await formatter.format_one_decklist_input(interaction, clipboard_ydk, ydk_file)
+    
+    # If decklist is None, validation failed and message was already sent
+    if decklist is None:
+        return
+
+    # Create the response for the small world optimize output
+    response = await command_pool.run_command(interaction, "small_world_optimize", small_world.small_world_optimize, interaction.guild.id, decklist, target_card)
+    # If response is None, the command timed out or the bot was busy and the message was already sent
+    if response is None:
+        return
+    file_path = f"guilds/{interaction.guild.id}/docs/small_world_optimize.txt"
+    if not os.path.exists(file_path):
+        await interaction.followup.send(response)
+        return
+    with open(file_path, "rb") as file:
+        await interaction.followup.send(response, file=discord.File(file_path))
+@small_world_optimize_helper.autocomplete("target_card")
+async def small_world_optimize_autocomplete_handler(interaction: discord.Interaction, current_input: str):
+    return small_world.small_world_autocomplete(current_input)
+
+
+
+# MARK: SMALL WORLD PATH 
+@client.tree.command(name="small_world_path", description="Find the shortest chain of Small World activations between 2 cards")
+@app_commands.describe(
+    first_card="(Required): The Main Deck monster in your hand (Partial names work as well)", 
+    second_card="(Required): The Main Deck monster you want to reach (Partial names work as well)",
+    activations="(Optional): The most Small World activations to search (1-5)")
+async def small_world_path_helper(interaction: discord.Interaction, first_card: str, second_card: str, activations: app_commands.Range[int, 1, 5] = None):
+    # Defer the response and show the user that the bot is working on it
+    await interaction.response.defer(thinking=True)
+
+    # Create the response for the small world path output
+    response = await command_pool.run_command(interaction, "small_world_path", small_world.small_world_path, interaction.guild.id, first_card, second_card, activations)
+    # If response is None, the command timed out or the bot was busy and the message was already sent
+    if response is None:
+        return
+    file_path = f"guilds/{interaction.guild.id}/docs/small_world_path.txt"
+    if not os.path.exists(file_path):
+        await interaction.followup.send(response)
+        return
+    with open(file_path, "rb") as file:
+        await interaction.followup.send(response, file=discord.File(file_path))
+@small_world_path_helper.autocomplete("first_card")
+@small_world_path_helper.autocomplete("second_card")
+async def small_world_path_autocomplete_handler(interaction: discord.Interaction, current_input: str):
+    return small_world.small_world_autocomplete(current_input)
+
+
+
 # MARK: SPIN
 @client.tree.command(name="spin", description="Spin 5 random Secret Packs!")
 @app_commands.describe(number_of_spins="(Optional): Enter a specific number of packs to be spun (1-10)")
@@ -370,4 +488,35 @@ async def update_database(interaction: discord.Interaction):
         except Exception as e:
             await interaction.response.send_message(f"Something went wrong during update:\n```{e}```", ephemeral=True)
 
-client.run(os.getenv("BOT_TOKEN"))
\ No newline at end of file
+
+
+# MARK: UPDATE CANCEL
+@client.tree.command(name="update_cancel", description="Cancels the decklist scraping started by /update, keeping the current decklists")
+async def update_cancel_helper(interaction: discord.Interaction):
+    # Decks the scrape already visited are kept in its journal, the next /update picks them back up
+    if decklist_scraper.is_scrape_running() and decklist_scraper.cancel_scrape():
+        await interaction.response.send_message("Cancelling the decklist scraping, the current decklists are kept.\nThe next /update picks up where it left off", ephemeral=True)
+    else:
+        await interaction.response.send_message("No decklist scrape is running right now", ephemeral=True)
+
+
+
+# MARK: UPDATE STATUS
+@client.tree.command(name="update_status", description="Shows the progress of the decklist scraping started by /update")
+async def update_status_helper(interaction: discord.Interaction):
+    await interaction.response.send_message(decklist_scraper.scrape_status(), ephemeral=True)
+
+# Worker processes import this file too, only the bot itself should load the databases and connect
+if __name__ == "__main__":
+    # Load every card database once, before any commands come in
+    card_repository.get_repository().preload()
+
+    # Start the workers for the heavy commands, they preload the databases in the background
+    command_pool.get_command_pool().start()
+
+    client.run(os.getenv("BOT_TOKEN"))
+
+    # Close the background scraper's browsers, the /card_price browsers and the command workers before exiting
+    decklist_scraper.stop_scrape()
+    card_price_scraper.close_browser_pool()
+    command_pool.get_command_pool().shutdown()
\ No newline at end of file
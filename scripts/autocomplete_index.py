@@ -0,0 +1,124 @@
+MAX_RESULTS = 25         # Discord only shows 25 autocomplete choices
+MAX_PREFIX_LENGTH = 6    # Longer prefixes are answered by the trigram postings instead
+
+# Ranks for each kind of match, lower is better
+EXACT_MATCH = 0
+PREFIX_MATCH = 1
+WORD_START_MATCH = 2
+SUBSTRING_MATCH = 3
+
+# Prebuilt, lowercase search index over a list of names used to answer autocomplete requests
+class AutocompleteIndex:
+    def __init__(self, names):
+        # Remove duplicates, then sort so every list below is already in display order
+        self.names = sorted(dict.fromkeys(names), key=lambda name: name.lower())
+        self.lower_names = [name.lower() for name in self.names]
+
+        # Lowercase name -> position
+        self.exact = {}
+
+        # Short prefix -> first positions of names starting with it
+        self.prefixes = {}
+
+        # Short prefix -> first positions of names with a later word starting with it
+        self.word_prefixes = {}
+
+        # Trigram -> every position of a name containing it
+        self.trigrams = {}
+
+        for position, lower_name in enumerate(self.lower_names):
+            self.exact.setdefault(lower_name, position)
+
+            # Prefixes of the full name
+            for length in range(1, min(len(lower_name), MAX_PREFIX_LENGTH) + 1):
+                add_capped(self.prefixes, lower_name[:length], position)
+
+            # Prefixes of every word after the first
+            for start in word_starts(lower_name):
+                for length in range(1, min(len(lower_name) - start, MAX_PREFIX_LENGTH) + 1):
+                    word_prefix = lower_name[start:start + length]
+                    # Skip prefixes the full name already matches
+                    if not lower_name.startswith(word_prefix):
+                        add_capped(self.word_prefixes, word_prefix, position)
+
+            # Every trigram, only listing each name once per trigram
+            for trigram in {lower_name[i:i + 3] for i in range(len(lower_name) - 2)}:
+                self.trigrams.setdefault(trigram, []).append(position)
+
+    # Returns up to "limit" names ranked exact > prefix > word start > substring
+    def search(self, query: str, limit: int = MAX_RESULTS):
+        query = query.lower().strip()
+
+        # Nothing typed yet, show the start of the list
+        if not query:
+            return self.names[:limit]
+
+        # Long queries are selective enough to rank every substring match
+        if len(query) > MAX_PREFIX_LENGTH:
+            matches = self.substring_matches(query)
+            matches.sort(key=lambda position: (self.rank(query, position), position))
+            return [self.names[position] for position in matches[:limit]]
+
+        # Short queries fill the results tier by tier, stopping once there are enough
+        results = []
+        seen = set()
+
+        def add(positions):
+            for position in positions:
+                if len(results) >= limit:
+                    return
+                if position not in seen:
+                    seen.add(position)
+                    results.append(position)
+
+        if query in self.exact:
+            add([self.exact[query]])
+        add(self.prefixes.get(query, []))
+        add(self.word_prefixes.get(query, []))
+        if len(results) < limit:
+            add(self.substring_matches(query, limit + len(seen)))
+
+        return [self.names[position] for position in results]
+
+    # Returns the positions of names containing the query, in order
+    def substring_matches(self, query: str, limit: int = None):
+        # Queries shorter than a trigram have no postings to narrow the search, scan until there are enough
+        if len(query) < 3:
+            candidates = range(len(self.names))
+        else:
+            # Walk the rarest trigram's postings, everything else must contain it
+            postings = [self.trigrams.get(query[i:i + 3], []) for i in range(len(query) - 2)]
+            candidates = min(postings, key=len)
+
+        matches = []
+        for position in candidates:
+            if query in self.lower_names[position]:
+                matches.append(position)
+                if limit is not None and len(matches) >= limit:
+                    break
+        return matches
+
+    # Ranks how well a name matches the query
+    def rank(self, query: str, position: int):
+        lower_name = self.lower_names[position]
+        if lower_name == query:
+            return EXACT_MATCH
+        if lower_name.startswith(query):
+            return PREFIX_MATCH
+        if any(lower_name.startswith(query, start) for start in word_starts(lower_name)):
+            return WORD_START_MATCH
+        return SUBSTRING_MATCH
+
+# Returns the positions where a new word begins, not counting the start of the name
+def word_starts(lower_name: str):
+    return [
+        i for i in range(1, len(lower_name))
+        if lower_name[i].isalnum() and not lower_name[i - 1].isalnum()
+    ]
+
+# Appends a position to a key's list until it has enough results to fill an autocomplete response
+def add_capped(index: dict, key: str, position: int):
+    positions = index.setdefault(key, [])
+    # Positions arrive in order, so a repeat can only be the last entry
+    if len(positions) < MAX_RESULTS and (not positions or positions[-1] != position):
+        positions.append(position)
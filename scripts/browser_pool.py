@@ -0,0 +1,217 @@
+import collections
+import concurrent.futures
+import functools
+import os
+import threading
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import WebDriverException
+from webdriver_manager.chrome import ChromeDriverManager
+
+DEFAULT_BROWSERS = max(1, min(4, (os.cpu_count() or 2) - 1))   # Browsers kept open, Chrome runs its pages on their own cores
+PAGES_PER_DRIVER = 50                                           # Jobs a browser runs before it is replaced, long lived Chrome sessions slowly leak memory
+
+# Chrome options taken from recommended FAQ
+CHROME_ARGUMENTS = [
+    "--headless",  # Run in headless mode
+    "--disable-gpu",  # May help on some systems
+    "--disable-software-rasterizer",  # Prevents software fallback for WebGL
+    "--window-size=1920,1080",  # Set a standard window size
+    "--no-sandbox",  # Useful for running in some environments
+    "--disable-dev-shm-usage",  # Helps prevent crashes
+    "--use-gl=swiftshader", # Addresses "fallback to software WebGL deprecated" errors
+    "--ignore-certificate-errors", # Addresses "handshake failed" errors
+    "--disable-features=SSLVersionMin", # Addresses "handshake failed" errors
+]
+
+# Downloads the matching chromedriver once per process instead of once per browser
+@functools.lru_cache(maxsize=None)
+def chromedriver_path():
+    return ChromeDriverManager().install()
+
+# Creates a headless Chrome driver
+def create_driver(user_agent: str = None):
+    options = webdriver.ChromeOptions()
+    for argument in CHROME_ARGUMENTS:
+        options.add_argument(argument)
+    if user_agent:
+        options.add_argument(f"--user-agent={user_agent}")
+    return webdriver.Chrome(service=Service(chromedriver_path()), options=options)
+
+# One browser of the pool, replaced when it breaks or has run too many jobs
+class PooledBrowser:
+    def __init__(self, driver_factory, pages_per_driver: int):
+        self.driver_factory = driver_factory
+        self.pages_per_driver = pages_per_driver
+        self.driver = None
+        self.pages = 0
+        self.recycled = 0
+
+    # Returns a healthy driver with pages left, replacing the current one if needed
+    def checkout(self):
+        if self.driver is not None and (self.pages >= self.pages_per_driver or not self.is_healthy()):
+            self.recycle()
+        if self.driver is None:
+            self.driver = self.driver_factory()
+            self.pages = 0
+        return self.driver
+
+    # A driver is healthy if its browser still answers a script
+    def is_healthy(self):
+        try:
+            self.driver.execute_script("return document.readyState;")
+            return True
+        except Exception:
+            return False
+
+    # Closes the current driver, the next checkout creates a new one
+    def recycle(self):
+        self.quit()
+        self.recycled += 1
+
+    # Closes the driver, ignoring browsers that already died
+    def quit(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception as e:
+                print(f"Error closing browser: {e}")
+            self.driver = None
+
+# Keeps several warm browsers open and spreads jobs across them
+# Every browser has its own job queue, and a browser with nothing left to do steals from the back of the longest other queue
+class BrowserPool:
+    def __init__(self, size: int = DEFAULT_BROWSERS, driver_factory=create_driver, pages_per_driver: int = PAGES_PER_DRIVER):
+        self.size = size
+        self.driver_factory = driver_factory
+        self.pages_per_driver = pages_per_driver
+        self.queues = [collections.deque() for _ in range(size)]
+        self.condition = threading.Condition()
+        self.next_queue = 0
+        self.threads = []
+        self.browsers = []
+        self.closed = False
+
+        # Totals since the pool started, see status()
+        self.completed = 0
+        self.failed = 0
+        self.stolen = 0
+
+    # Opens every browser in the background, so they are warm by the time the first jobs arrive
+    def start(self):
+        with self.condition:
+            if self.threads:
+                return self
+            for index in range(self.size):
+                browser = PooledBrowser(self.driver_factory, self.pages_per_driver)
+                thread = threading.Thread(target=self.run_browser, args=(index, browser), name=f"browser-pool-{index}", daemon=True)
+                self.browsers.append(browser)
+                self.threads.append(thread)
+                thread.start()
+        return self
+
+    # Queues function(driver, *args) and returns a future of its result
+    def submit(self, function, *args) -> concurrent.futures.Future:
+        future = concurrent.futures.Future()
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("The browser pool is closed")
+
+            # Deal jobs out in turn, stealing evens out the queues of browsers that get slow pages
+            self.queues[self.next_queue].append((future, function, args))
+            self.next_queue = (self.next_queue + 1) % self.size
+            self.condition.notify()
+        self.start()
+        return future
+
+    # Runs function(driver, item) for every item across the pool, returns the results in the same order
+    def map(self, function, items):
+        futures = [self.submit(function, item) for item in items]
+        return [future.result() for future in futures]
+
+    # Takes the next job for a browser: the front of its own queue, otherwise the back of the longest other queue
+    def next_job(self, index: int):
+        with self.condition:
+            while True:
+                if self.queues[index]:
+                    return self.queues[index].popleft()
+
+                longest_queue = max(self.queues, key=len)
+                if longest_queue:
+                    self.stolen += 1
+                    return longest_queue.pop()
+
+                if self.closed:
+                    return None
+                self.condition.wait()
+
+    # Worker thread of one browser, runs jobs until the pool closes
+    def run_browser(self, index: int, browser: PooledBrowser):
+        # Warm the browser up before any job needs it
+        try:
+            browser.checkout()
+        except Exception as e:
+            print(f"Error launching browser {index}: {e}")
+
+        while (job := self.next_job(index)) is not None:
+            future, function, args = job
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                driver = browser.checkout()
+                result = function(driver, *args)
+            except Exception as e:
+                # A broken session would fail every later job too
+                if isinstance(e, WebDriverException) and not browser.is_healthy():
+                    browser.recycle()
+                self.count_job(failed=True)
+                future.set_exception(e)
+            else:
+                self.count_job(failed=False)
+                future.set_result(result)
+            browser.pages += 1
+
+        browser.quit()
+
+    # Counts a finished job, browsers finish jobs from their own threads
+    def count_job(self, failed: bool):
+        with self.condition:
+            if failed:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    # Cancels every job that hasn't started yet
+    def cancel_pending(self):
+        with self.condition:
+            for queue in self.queues:
+                while queue:
+                    future, _, _ = queue.popleft()
+                    future.cancel()
+
+    # Finishes the running jobs, cancels the rest and closes every browser
+    def close(self):
+        self.cancel_pending()
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        for thread in self.threads:
+            thread.join()
+
+    # Jobs waiting, and totals since the pool started
+    def status(self) -> dict:
+        return {
+            "browsers": self.size,
+            "queued": sum(len(queue) for queue in self.queues),
+            "completed": self.completed,
+            "failed": self.failed,
+            "stolen": self.stolen,
+            "recycled": sum(browser.recycled for browser in self.browsers),
+        }
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
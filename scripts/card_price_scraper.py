@@ -1,17 +1,40 @@
+import asyncio
+import functools
 import json
 import time
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
-from scripts import card_price_pagination, formatter
+from scripts import card_price_pagination, formatter, browser_pool
+from scripts.browser_pool import BrowserPool
 from collections import defaultdict
 import os
 
+TCG_PLAYER_URL = "https://www.tcgplayer.com/"
+PRICE_BROWSERS = 3      # Warm browsers kept open for /card_price, printings are visited in parallel across them
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+              "AppleWebKit/537.36 (KHTML, like Gecko) "
+              "Chrome/120.0.0.0 Safari/537.36")
+
+# The browsers shared by every /card_price, opened on first use
+price_browser_pool = None
+
+# Returns the shared browser pool, opening its browsers on first use
+def get_browser_pool() -> BrowserPool:
+    global price_browser_pool
+    if price_browser_pool is None:
+        price_browser_pool = BrowserPool(PRICE_BROWSERS, driver_factory=functools.partial(browser_pool.create_driver, USER_AGENT)).start()
+    return price_browser_pool
+
+# Closes the shared browsers, used when the bot shuts down
+def close_browser_pool():
+    global price_browser_pool
+    if price_browser_pool is not None:
+        price_browser_pool.close()
+        price_browser_pool = None
+
 # Scrolls the webpage to the element we want to click on
 def scroll_to_element(driver, element):
     driver.execute_script("arguments[0].scrollIntoView(true);", element)
@@ -51,38 +74,32 @@ def progress_bar(iteration, total):
 
 # Gets the data from TCG Player
 async def pull_data_from_tcg_player(guild_id_as_int: int, message, card_name: str, set_code: str):
-    # Check if input is correct
-    if not formatter.check_valid_card_name(card_name):
+    # A bare set code is enough to find the card
+    if not card_name:
+        if not set_code:
+            await message.edit(content="Please enter a card name or a set code")
+            return
+        card_name = formatter.card_name_from_set_code(set_code)
+        if card_name is None:
+            await message.edit(content=f"{set_code} is not a valid set code")
+            return
+        set_code = set_code.strip().upper()
+
+    # Check if input is correct, partial or misspelled names become the closest real card name
+    resolved_card_name = formatter.resolve_card_name(card_name)
+    if resolved_card_name is None:
         await message.edit(content=f"{card_name} is not a valid card name")
         return
+    card_name = resolved_card_name
 
-    # Setup WebDriver, options taken from recommended FAQ
-    options = webdriver.ChromeOptions()
-    options.add_argument("--headless")  # Run in headless mode
-    options.add_argument("--disable-gpu")  # May help on some systems
-    options.add_argument("--disable-software-rasterizer")  # Prevents software fallback for WebGL
-    options.add_argument("--window-size=1920,1080")  # Set a standard window size
-    options.add_argument("--no-sandbox")  # Useful for running in some environments
-    options.add_argument("--disable-dev-shm-usage")  # Helps prevent crashes
-    options.add_argument("--use-gl=swiftshader") # Addresses "fallback to software WebGL deprecated" errors
-    options.add_argument("--ignore-certificate-errors") # Addresses "handshake failed" errors
-    options.add_argument("--disable-features=SSLVersionMin") # Addresses "handshake failed" errors
-    options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                     "AppleWebKit/537.36 (KHTML, like Gecko) "
-                     "Chrome/120.0.0.0 Safari/537.36")
-
-    # Inform the user that the driver has started
-    await message.edit(content="Launching Selenium Web Driver For TCG Player")
-
-    # Create the Driver
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-
-    # Wait for initial load
-    wait = WebDriverWait(driver, 5)  # Increase wait time
+    # Browser jobs run on the pool's threads, their messages are sent back through the event loop
+    loop = asyncio.get_running_loop()
+    def report(content: str):
+        asyncio.run_coroutine_threadsafe(message.edit(content=content), loop)
 
-    # Go to the home page
-    tcg_player_url = "https://www.tcgplayer.com/"
-    driver.get(tcg_player_url)
+    # Inform the user that the drivers have started
+    await message.edit(content="Launching Selenium Web Driver For TCG Player")
+    pool = get_browser_pool()
 
     # Iterator for Progress Bar function
     num_printings = 0
@@ -95,41 +112,38 @@ async def pull_data_from_tcg_player(guild_id_as_int: int, message, card_name: st
             # Inform the user that we are now searching for the card
             await message.edit(content=f"Driver Launched, searching for **{formatter.smart_capitalize(card_name)}**")
 
-
-        # Searches for the card
-        await search_for_card(driver, wait, card_name, message)
-
-        # Gets all the links for each individual printing of the card
-        printings_links = []
-        printings_links = await get_all_printings(driver, wait, card_name, message, set_code)
+        # Searches for the card, and gets all the links for each individual printing of the card
+        printings_links = await asyncio.wrap_future(pool.submit(find_printings, card_name, set_code, report))
 
         # Used for the total value of the progress bar
         num_printings = len(printings_links)
         
         await message.edit(content=f"Found **{num_printings} printings** of **{formatter.smart_capitalize(card_name)}**\n\nRetrieving individual listing data...")
 
-        # Visit all the urls and get the listing information
-        all_listings = []
-        listing_number = 0
-        for printing_url in printings_links:
-            # Update the progress bar and Inform the user which archetype we are looking at
-            progress_bar_message = progress_bar(listing_number, num_printings)
-
-            # retrieve listings
-            listing_data = await get_printing_information(driver, wait, printing_url, card_name, message)
-            all_listings.append(listing_data)
+        # Visit all the urls at once across the pool's browsers and get the listing information
+        printing_futures = [asyncio.wrap_future(pool.submit(get_printing_information, printing_url, card_name, report)) for printing_url in printings_links]
+        try:
+            listing_number = 0
+            for next_printing in asyncio.as_completed(printing_futures):
+                listing_data = await next_printing
 
-            # Increment the iterator for the Progress Bar function
-            listing_number += 1
+                # Increment the iterator for the Progress Bar function
+                listing_number += 1
+                progress_bar_message = progress_bar(listing_number, num_printings)
 
-            # Extract the printing name from the result
-            printing_name = next(iter(listing_data))
+                # Extract the printing name from the result
+                printing_name = next(iter(listing_data))
 
-            # Update the message with the progress bar and current printing
-            await message.edit(content=f"Visiting listings for: \n\n\t**{formatter.smart_capitalize(printing_name)}**\n\n{progress_bar_message}")
+                # Update the message with the progress bar and current printing
+                await message.edit(content=f"Visiting listings for: \n\n\t**{formatter.smart_capitalize(printing_name)}**\n\n{progress_bar_message}")
+        except Exception:
+            # Don't leave the other printings queued on the browsers
+            for printing_future in printing_futures:
+                printing_future.cancel()
+            raise
 
-        # Exit the Web Driver
-        driver.quit()
+        # Keep the printings in the order they were found
+        all_listings = [printing_future.result() for printing_future in printing_futures]
 
         formatted_card_name = formatter.sanitize_card_name(card_name).replace(" ", "-").lower()
     
@@ -148,17 +162,31 @@ async def pull_data_from_tcg_player(guild_id_as_int: int, message, card_name: st
     except Exception as e:
         await message.edit(content=f"Error with TCG Player")
 
+# Goes to the home page, searches for the card and returns the urls of all its printings, runs on one of the pool's browsers
+def find_printings(driver, card_name: str, set_code: str, report):
+    # Wait for initial load
+    wait = WebDriverWait(driver, 5)  # Increase wait time
+
+    # Go to the home page
+    driver.get(TCG_PLAYER_URL)
+
+    # Searches for the card
+    search_for_card(driver, wait, card_name, report)
+
+    # Gets all the links for each individual printing of the card
+    return get_all_printings(driver, wait, card_name, report, set_code)
+
 # Inputs the card name and searches for the card
-async def search_for_card(driver, wait, card_name, message):
+def search_for_card(driver, wait, card_name, report):
     # Filters the search to yugioh cards
-    await filter_By_YuGiOh(driver, wait, message)
+    filter_By_YuGiOh(driver, wait, report)
 
     # click the input box
     input_box = wait.until(EC.element_to_be_clickable((By.CLASS_NAME, "input")))
     if input_box:
         click_element(driver, wait, input_box, True)
     else:
-        await message.edit(content="Failed to find the input box for card search")
+        report("Failed to find the input box for card search")
 
     # Type the card name
     input_box.clear()
@@ -166,13 +194,13 @@ async def search_for_card(driver, wait, card_name, message):
     input_box.send_keys(Keys.ENTER)
 
 # Selects the Yugioh Filter from TCG Player search
-async def filter_By_YuGiOh(driver, wait, message):
+def filter_By_YuGiOh(driver, wait, report):
     # Find and click the dropdown
     dropdown = wait.until(EC.element_to_be_clickable((By.CLASS_NAME, "dropdown-container")))
     if dropdown:
         click_element(driver, wait, dropdown, True)
     else:
-        await message.edit(content="Failed to find the dropdown box for filtering by franchise")
+        report("Failed to find the dropdown box for filtering by franchise")
 
     # Find and save the container for list elements, then get the individual elements
     options_container = wait.until(EC.presence_of_element_located((By.ID, "drop-down-menu")))
@@ -193,10 +221,10 @@ async def filter_By_YuGiOh(driver, wait, message):
     if target_option:
         click_element(driver, wait, target_option, True)
     else:
-        await message.edit(content="Failed to find the filter for YuGiOh")
+        report("Failed to find the filter for YuGiOh")
 
 # Gets all the valid urls for each printings of the card
-async def get_all_printings(driver, wait, card_name, message, set_code):
+def get_all_printings(driver, wait, card_name, report, set_code):
     all_links = []
     card_name_lower = formatter.sanitize_card_name(card_name).lower()
     printing_counter = 0
@@ -243,10 +271,10 @@ async def get_all_printings(driver, wait, card_name, message, set_code):
                                 
                                 if set_code:
                                     # Update the user on the progress of the specific printing
-                                    await message.edit(content=f"Driver Launched, searching for **{set_code}** print of **{formatter.smart_capitalize(card_name)}**\n\nFound **{printing_counter} printings** so far")
+                                    report(f"Driver Launched, searching for **{set_code}** print of **{formatter.smart_capitalize(card_name)}**\n\nFound **{printing_counter} printings** so far")
                                 else:
                                     # Update the user on the progress of the all the card printings
-                                    await message.edit(content=f"Driver Launched, searching for **{formatter.smart_capitalize(card_name)}**\n\nFound **{printing_counter} printings** so far")
+                                    report(f"Driver Launched, searching for **{formatter.smart_capitalize(card_name)}**\n\nFound **{printing_counter} printings** so far")
 
                                 all_links.append(href)
                 
@@ -262,7 +290,7 @@ async def get_all_printings(driver, wait, card_name, message, set_code):
                     # Get the button element containing the icon
                     next_button_parent = next_button.find_element(By.XPATH, "./ancestor::a")
                 else:
-                    await message.edit(content="Failed to find the next button chevron for the results page")
+                    report("Failed to find the next button chevron for the results page")
 
 
                 # Check if the button is disabled (on last page)
@@ -274,7 +302,7 @@ async def get_all_printings(driver, wait, card_name, message, set_code):
                     # If it's not disabled, move to the next page
                     click_element(driver, wait, next_button_parent, True)
                 else:
-                    await message.edit(content="Failed to find the next button for the results page")
+                    report("Failed to find the next button for the results page")
 
                 # Wait for the page to reload and the results to update
                 wait.until(EC.staleness_of(result_elements[0]))
@@ -293,7 +321,10 @@ async def get_all_printings(driver, wait, card_name, message, set_code):
     return all_links
 
 # Gets the additional information for that printing, as well as listing information
-async def get_printing_information(driver, wait, printing_url, card_name, message):
+def get_printing_information(driver, printing_url, card_name, report):
+    # Wait for the page elements to load
+    wait = WebDriverWait(driver, 5)
+
     # Go to the printing url and wait for the page to load
     driver.get(printing_url)
     time.sleep(1)
@@ -336,7 +367,7 @@ async def get_printing_information(driver, wait, printing_url, card_name, messag
     }
 
     # Get 2 html elements, 1 for each edition of printing
-    edition_filters = await initial_listing_filter(driver, wait, message)
+    edition_filters = initial_listing_filter(driver, wait, report)
     unlimited = edition_filters.get("unlimited")
     first_edition = edition_filters.get("first_edition")
     limited = edition_filters.get("limited")
@@ -360,10 +391,10 @@ async def get_printing_information(driver, wait, printing_url, card_name, messag
             click_element(driver, wait, unlimited, False)
 
         # Save and exit the filter
-        await save_filter(driver, wait, message)
+        save_filter(driver, wait, report)
 
         # Set the listings for unlimited printings
-        results[printing_name][current_edition] = await get_listing_information(driver, wait, all_listings, message)
+        results[printing_name][current_edition] = get_listing_information(driver, wait, all_listings, report)
         all_listings = []
 
         # Reset the filter again to first edition
@@ -371,7 +402,7 @@ async def get_printing_information(driver, wait, printing_url, card_name, messag
         if filter_button:
             click_element(driver, wait, filter_button, False)
         else:
-            await message.edit(content="Failed to find the filter button after finding the first 5 unlimited listings")
+            report("Failed to find the filter button after finding the first 5 unlimited listings")
 
 
         # Make sure "Unlimited" is unselected, and "First Edition" is
@@ -383,11 +414,11 @@ async def get_printing_information(driver, wait, printing_url, card_name, messag
         current_edition = "first_edition"
 
         # Save and exit the filter
-        await save_filter(driver, wait, message)
+        save_filter(driver, wait, report)
         driver.execute_script("window.scrollTo(0, 0);")
 
         # Set the listings for first edition printings
-        results[printing_name][current_edition] = await get_listing_information(driver, wait, all_listings, message)
+        results[printing_name][current_edition] = get_listing_information(driver, wait, all_listings, report)
         
         # Return the complete printing information and listings
         return results
@@ -408,22 +439,22 @@ async def get_printing_information(driver, wait, printing_url, card_name, messag
             click_element(driver, wait, limited, False)
 
         # Save and exit the filter
-        await save_filter(driver, wait, message)
+        save_filter(driver, wait, report)
 
         # Set the listings for the current edition printing
-        results[printing_name][current_edition] = await get_listing_information(driver, wait, all_listings, message)
+        results[printing_name][current_edition] = get_listing_information(driver, wait, all_listings, report)
 
         # Return the complete printing information and listings
         return results
 
 # Set the initial filter, and return the printing edition elements
-async def initial_listing_filter(driver, wait, message):
+def initial_listing_filter(driver, wait, report):
     # Find and click the "All filters" button
     filter_button = wait.until(EC.presence_of_element_located((By.CLASS_NAME, "horizontal-filters-bar__filters__filters-button")))
     if filter_button:
         click_element(driver, wait, filter_button, False)
     else:
-        await message.edit(content="Failed to find the dropdown box for filtering by franchise")
+        report("Failed to find the dropdown box for filtering by franchise")
     
     # Find and click the "verified sellers" check box
     verified_sellers_check_box = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, '[data-testid="verified-seller-filter"]')))
@@ -431,13 +462,13 @@ async def initial_listing_filter(driver, wait, message):
     if verified_sellers_check_box:
         verified_sellers_check_box_classes = verified_sellers_check_box.get_attribute("class")
     else:
-        await message.edit(content="Failed to find the verified sellers check box container")
+        report("Failed to find the verified sellers check box container")
 
     if verified_sellers_check_box_classes:
         if "is-checked" not in verified_sellers_check_box_classes:
             click_element(driver, wait, verified_sellers_check_box, True)
     else:
-        await message.edit(content="Failed to find the verified sellers check box")
+        report("Failed to find the verified sellers check box")
 
     # Find the printing edition elements
     printing_edition_container = wait.until(EC.presence_of_element_located((By.CLASS_NAME, "search-filter__facets__container")))
@@ -475,7 +506,7 @@ async def initial_listing_filter(driver, wait, message):
     return edition_filters
 
 # Save and exit the filter
-async def save_filter(driver, wait, message):
+def save_filter(driver, wait, report):
     save_button = wait.until(EC.presence_of_element_located((
         By.CSS_SELECTOR, 
         ".tcg-button.tcg-button--md.tcg-standard-button.tcg-standard-button--priority.filter-drawer-footer__button-save"
@@ -483,11 +514,11 @@ async def save_filter(driver, wait, message):
     if save_button:
         click_element(driver, wait, save_button, False)
     else:
-        await message.edit(content="Failed to find the save button for the filters")
+        report("Failed to find the save button for the filters")
 
 
 # Gets the individual listing information for the edition
-async def get_listing_information(driver, wait, all_listings, message):
+def get_listing_information(driver, wait, all_listings, report):
     # For the listings
     while True:
         try:
@@ -546,7 +577,7 @@ async def get_listing_information(driver, wait, all_listings, message):
             if next_button:
                 next_button_parent = next_button.find_element(By.XPATH, "./ancestor::a")  # Get the <a> ancestor
             else:
-                await message.edit(content="Failed to find the next button chevron for listings")
+                report("Failed to find the next button chevron for listings")
 
             if next_button_parent:
                 # Check if the button is disabled
@@ -556,7 +587,7 @@ async def get_listing_information(driver, wait, all_listings, message):
                 # If it's not disabled, scroll and click to go to the next page
                 click_element(driver, wait, next_button_parent, True)
             else:
-                await message.edit(content="Failed to find the next button for listings")
+                report("Failed to find the next button for listings")
 
 
             # Wait for the page to reload and continue on the next page
@@ -0,0 +1,296 @@
+import json
+import os
+import threading
+from scripts.autocomplete_index import AutocompleteIndex
+from scripts.name_resolver import NameResolver
+from scripts.monster_columns import MonsterColumns
+from scripts.stat_matcher import StatMatcher
+from scripts.small_world_adjacency import SmallWorldAdjacency
+from scripts.small_world_paths import SmallWorldPaths
+from scripts import card_snapshot
+
+JSON_DIRECTORY = "global/json"
+SNAPSHOT_PATH = os.path.join(card_snapshot.SNAPSHOT_DIRECTORY, card_snapshot.SNAPSHOT_FILE_NAME)
+
+# Holds every dataset found in global/json, each file is only parsed once per repository
+class CardRepository:
+    def __init__(self, json_directory: str = JSON_DIRECTORY, snapshot_path: str = SNAPSHOT_PATH):
+        self.json_directory = json_directory
+        self.snapshot_path = snapshot_path
+        self.datasets = {}
+        self.indexes = {}
+        self.lock = threading.RLock()
+
+    # Loads a dataset the first time it is requested, every later call returns the same object
+    def load(self, file_name: str, default=None):
+        # Skip the lock once the dataset is cached
+        if file_name in self.datasets:
+            return self.datasets[file_name]
+
+        # Only one caller parses the file, everyone else waits and reuses its result
+        with self.lock:
+            if file_name not in self.datasets:
+                file_path = os.path.join(self.json_directory, file_name)
+
+                # Missing files (ex: before the first /update) fall back to an empty dataset
+                if os.path.exists(file_path):
+                    with open(file_path, 'r', encoding="utf-8") as file:
+                        self.datasets[file_name] = json.load(file)
+                else:
+                    self.datasets[file_name] = default
+
+        return self.datasets[file_name]
+
+    # Drops a cached dataset, the next call reads its file again
+    def forget(self, file_name: str):
+        with self.lock:
+            self.datasets.pop(file_name, None)
+
+    # Builds an index from the datasets the first time it is requested, and keeps it for the life of the repository
+    def index(self, index_name: str, builder):
+        if index_name in self.indexes:
+            return self.indexes[index_name]
+
+        with self.lock:
+            if index_name not in self.indexes:
+                self.indexes[index_name] = builder(self)
+
+        return self.indexes[index_name]
+
+    # Maps the snapshot and builds what the heavy commands need from it, used by the command workers
+    # Name and autocomplete tables are only built once a command needs them, so a worker never parses the JSON databases up front
+    def preload_commands(self):
+        self.snapshot()
+        self.card_database_index()
+        self.all_monster_columns()
+        self.main_monster_columns()
+        self.all_monster_matcher()
+        self.main_monster_matcher()
+        self.small_world_adjacency()
+        return self
+
+    # Parses every dataset up front so the first command doesn't pay for it
+    def preload(self):
+        self.preload_commands()
+        self.seventh_tachyon_targets()
+        self.card_names_and_set_codes()
+        self.master_data()
+        self.topping_decklists()
+        self.last_update()
+        self.card_name_autocomplete_index()
+        self.all_monster_autocomplete_index()
+        self.main_monster_autocomplete_index()
+        self.card_name_resolver()
+        self.all_monster_name_resolver()
+        self.main_monster_name_resolver()
+        self.set_codes_by_name()
+        self.card_name_by_set_code()
+        self.set_code_autocomplete_index()
+        return self
+
+    # The full card database downloaded from the ygoprodeck API
+    def full_database(self) -> dict:
+        return self.load("full_database.json", {"data": []})
+
+    # Every card, only keeping the fields the bot uses, written by /update
+    def card_database(self) -> dict:
+        card_database = self.load("card_database.json")
+
+        # Fall back to the full download until /update builds the compact database
+        if card_database is None:
+            return self.full_database()
+        return card_database
+
+    # Every monster in the game
+    def all_monster_database(self) -> dict:
+        return self.load("all_monster_database.json", {"data": []})
+
+    # Every monster that isn't an extra deck monster
+    def main_monster_database(self) -> dict:
+        return self.load("main_monster_database.json", {"data": []})
+
+    # The Number 101-107 XYZ monsters that Seventh Tachyon looks for
+    def seventh_tachyon_targets(self) -> dict:
+        return self.load("seventh_tachyon_targets.json", {"data": []})
+
+    # Every card name in the game, used for autocompletion
+    def card_names(self) -> list:
+        return self.load("card_names_database.json", [])
+
+    # Every card name with all of its set codes
+    def card_names_and_set_codes(self) -> list:
+        return self.load("card_names_and_set_codes_database.json", [])
+
+    # Master Duel secret pack information
+    def master_data(self) -> dict:
+        return self.load("master_data.json", {"packs": []})
+
+    # Every topping decklist, grouped by archetype
+    def topping_decklists(self) -> dict:
+        return self.load("topping_decklists.json", {})
+
+    # Alternate art id -> original card id, written by /update
+    def card_id_aliases(self) -> dict:
+        return self.load("card_id_aliases.json", {})
+
+    # The date of the last /update
+    def last_update(self) -> str:
+        return self.last_update_info()["last_update"]
+
+    # The date, database version and ETag of the last /update
+    def last_update_info(self) -> dict:
+        return self.load("last_update.json", {"last_update": "Never"})
+
+    # The memory mapped card snapshot written by /update, None until the first one
+    def snapshot(self) -> card_snapshot.CardSnapshot:
+        return self.index("snapshot", lambda repository: card_snapshot.open_snapshot(repository.snapshot_path))
+
+    # Card id (including alternate art ids) -> card, served straight from the snapshot when there is one
+    def card_database_index(self) -> dict:
+        return self.index("card_database_index", build_card_database_index)
+
+    # Autocomplete index over every card name, read from the snapshot when there is one
+    def card_name_autocomplete_index(self) -> AutocompleteIndex:
+        return self.index("card_name_autocomplete_index", lambda repository: AutocompleteIndex(build_card_names(repository)))
+
+    # Autocomplete index over every monster name
+    def all_monster_autocomplete_index(self) -> AutocompleteIndex:
+        return self.index("all_monster_autocomplete_index", lambda repository: AutocompleteIndex(repository.all_monster_columns().names))
+
+    # Autocomplete index over every main deck monster name
+    def main_monster_autocomplete_index(self) -> AutocompleteIndex:
+        return self.index("main_monster_autocomplete_index", lambda repository: AutocompleteIndex(repository.main_monster_columns().names))
+
+    # Resolves partial or misspelled names to a card name
+    def card_name_resolver(self) -> NameResolver:
+        return self.index("card_name_resolver", lambda repository: NameResolver(repository.card_name_autocomplete_index()))
+
+    # Resolves partial or misspelled names to a monster name
+    def all_monster_name_resolver(self) -> NameResolver:
+        return self.index("all_monster_name_resolver", lambda repository: NameResolver(repository.all_monster_autocomplete_index()))
+
+    # Resolves partial or misspelled names to a main deck monster name
+    def main_monster_name_resolver(self) -> NameResolver:
+        return self.index("main_monster_name_resolver", lambda repository: NameResolver(repository.main_monster_autocomplete_index()))
+
+    # Case folded card name -> sorted set codes
+    def set_codes_by_name(self) -> dict:
+        return self.index("set_codes_by_name", lambda repository: build_set_codes_by_name(repository.card_names_and_set_codes()))
+
+    # Upper case set code -> card name
+    def card_name_by_set_code(self) -> dict:
+        return self.index("card_name_by_set_code", lambda repository: build_card_name_by_set_code(repository.card_names_and_set_codes()))
+
+    # Autocomplete index over every set code, used when no card name was given
+    def set_code_autocomplete_index(self) -> AutocompleteIndex:
+        return self.index("set_code_autocomplete_index", lambda repository: AutocompleteIndex(repository.card_name_by_set_code()))
+
+    # Every monster's stats as NumPy columns
+    def all_monster_columns(self) -> MonsterColumns:
+        return self.index("all_monster_columns", lambda repository: build_monster_columns(repository, main_deck_only=False))
+
+    # Every main deck monster's stats as NumPy columns
+    def main_monster_columns(self) -> MonsterColumns:
+        return self.index("main_monster_columns", lambda repository: build_monster_columns(repository, main_deck_only=True))
+
+    # Runs "shares stats with" rules (Metaltronus, Seventh Tachyon...) over every monster, with cached results per card
+    def all_monster_matcher(self) -> StatMatcher:
+        return self.index("all_monster_matcher", lambda repository: StatMatcher(repository.all_monster_columns()))
+
+    # Runs "shares stats with" rules (Small World...) over every main deck monster, with cached results per card
+    def main_monster_matcher(self) -> StatMatcher:
+        return self.index("main_monster_matcher", lambda repository: StatMatcher(repository.main_monster_columns()))
+
+    # Small World graph over every main deck monster, read from next to the snapshot when /update saved one
+    def small_world_adjacency(self) -> SmallWorldAdjacency:
+        return self.index("small_world_adjacency", build_small_world_adjacency)
+
+    # Multi activation Small World searches, cached per starting card
+    def small_world_paths(self) -> SmallWorldPaths:
+        return self.index("small_world_paths", lambda repository: SmallWorldPaths(repository.small_world_adjacency()))
+
+
+# Maps every card id to its card, alternate art ids point back to the original card
+def build_card_id_index(cards, card_id_aliases: dict = None) -> dict:
+    card_index = {card["id"]: card for card in cards}
+
+    for card in cards:
+        for card_image in card.get("card_images", []):
+            # Never let an alternate art id replace a real card id
+            card_index.setdefault(card_image["id"], card)
+
+    # Datasets without card_images get their alternate art ids from the alias table (json keys are strings)
+    for alias, card_id in (card_id_aliases or {}).items():
+        if card_id in card_index:
+            card_index.setdefault(int(alias), card_index[card_id])
+
+    return card_index
+
+# Maps every case folded card name to its sorted set codes
+def build_set_codes_by_name(names_and_set_codes) -> dict:
+    return {card["name"].casefold(): sorted(card.get("set_code", [])) for card in names_and_set_codes}
+
+# Maps every set code to the card printed under it, a few codes are shared by two cards so the first name alphabetically is kept
+def build_card_name_by_set_code(names_and_set_codes) -> dict:
+    card_name_by_set_code = {}
+    for card in sorted(names_and_set_codes, key=lambda card: card["name"]):
+        for set_code in card.get("set_code", []):
+            card_name_by_set_code.setdefault(set_code.upper(), card["name"])
+    return card_name_by_set_code
+
+# Uses the snapshot as the id index if there is one, otherwise indexes card_database.json
+def build_card_database_index(repository: CardRepository):
+    snapshot = repository.snapshot()
+    if snapshot is not None:
+        return snapshot
+    return build_card_id_index(repository.card_database()["data"], repository.card_id_aliases())
+
+# Every card name, from the snapshot if there is one, otherwise from card_names_database.json
+def build_card_names(repository: CardRepository):
+    snapshot = repository.snapshot()
+    if snapshot is not None:
+        return snapshot.names()
+    return repository.card_names()
+
+# Reads the monster columns from the snapshot if there is one, otherwise from the monster databases
+def build_monster_columns(repository: CardRepository, main_deck_only: bool):
+    snapshot = repository.snapshot()
+    if snapshot is not None:
+        return snapshot.monster_columns(main_deck_only)
+    if main_deck_only:
+        return MonsterColumns(repository.main_monster_database()["data"])
+    return MonsterColumns(repository.all_monster_database()["data"])
+
+# Maps the saved Small World adjacency, building it in memory if it's missing or out of date
+def build_small_world_adjacency(repository: CardRepository):
+    columns = repository.main_monster_columns()
+    adjacency = SmallWorldAdjacency.load(os.path.dirname(repository.snapshot_path), columns)
+    if adjacency is None:
+        adjacency = SmallWorldAdjacency.build(columns, repository.main_monster_matcher())
+    return adjacency
+
+
+# The repository shared by every command
+repository = None
+repository_lock = threading.Lock()
+
+# Returns the shared repository, creating it on first use
+def get_repository() -> CardRepository:
+    global repository
+    if repository is None:
+        with repository_lock:
+            if repository is None:
+                repository = CardRepository()
+    return repository
+
+# Loads a fresh repository and swaps it in, commands that already hold the old one keep using it
+def reload_repository(preload: bool = True) -> CardRepository:
+    global repository
+    new_repository = CardRepository()
+    if preload:
+        new_repository.preload()
+
+    # Swapping the reference is atomic, so nobody ever sees a half loaded repository
+    with repository_lock:
+        repository = new_repository
+    return new_repository
@@ -0,0 +1,261 @@
+import json
+import mmap
+import os
+import struct
+import numpy as np
+from scripts.monster_columns import MonsterColumns, MISSING_VALUE, MISSING_CODE, TYPE_FLAGS, EXTRA_DECK_FLAGS, encode_stat, encode_type
+
+SNAPSHOT_DIRECTORY = "global/snapshot"
+SNAPSHOT_FILE_NAME = "card_snapshot.bin"
+SNAPSHOT_MAGIC = b"DKSNAP01"
+SNAPSHOT_VERSION = 2
+
+# magic, version, record count, id index count, then the offset (and size) of every section
+HEADER_FORMAT = "<8sIIQQQQQQQQ"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+# One fixed width record per card, names and types are offsets into the string table
+RECORD_DTYPE = np.dtype([
+    ("id", "<i8"),
+    ("name_offset", "<u4"),
+    ("name_length", "<u4"),
+    ("type_offset", "<u4"),
+    ("type_length", "<u4"),
+    ("race", "i1"),
+    ("attribute", "i1"),
+    ("level", "<i2"),
+    ("atk", "<i2"),
+    ("def", "<i2"),
+    ("type_flags", "<u2"),
+])
+
+# Columns stored for every monster and every main deck monster, already in the dtypes MonsterColumns uses so they can be viewed without copying
+COLUMN_DTYPES = {
+    "positions": "<u4",     # Record of each monster, for its name
+    "ids": "<i8",
+    "race": "i1",
+    "attribute": "i1",
+    "level": "<i2",
+    "atk": "<i2",
+    "defense": "<i2",
+    "type_flags": "<u2",
+    "name_codes": "<i4",
+}
+
+# Writes every card to a binary snapshot that other processes can map into memory without parsing JSON
+def write_snapshot(cards, card_id_aliases: dict, file_path: str):
+    race_codes = {None: MISSING_CODE}
+    attribute_codes = {None: MISSING_CODE}
+
+    # Every distinct string is only stored once
+    strings = bytearray()
+    string_offsets = {}
+
+    def add_string(value: str):
+        if value not in string_offsets:
+            encoded = value.encode("utf-8")
+            string_offsets[value] = (len(strings), len(encoded))
+            strings.extend(encoded)
+        return string_offsets[value]
+
+    records = np.zeros(len(cards), dtype=RECORD_DTYPE)
+    for position, card in enumerate(cards):
+        name_offset, name_length = add_string(card["name"])
+        type_offset, type_length = add_string(card["type"])
+        records[position] = (
+            card["id"],
+            name_offset,
+            name_length,
+            type_offset,
+            type_length,
+            race_codes.setdefault(card.get("race"), len(race_codes)),
+            attribute_codes.setdefault(card.get("attribute"), len(attribute_codes)),
+            encode_stat(card.get("level")),
+            encode_stat(card.get("atk")),
+            encode_stat(card.get("def")),
+            encode_type(card["type"]),
+        )
+
+    # Sorted id -> record position index, alternate art ids point at the original card's record
+    id_positions = {card["id"]: position for position, card in enumerate(cards)}
+    for alias, card_id in card_id_aliases.items():
+        if card_id in id_positions:
+            id_positions.setdefault(int(alias), id_positions[card_id])
+    index_ids = np.array(sorted(id_positions), dtype="<i8")
+    index_positions = np.array([id_positions[card_id] for card_id in index_ids], dtype="<u4")
+
+    # Every monster's columns, then every main deck monster's, each set stored one after the other so it can be viewed as is
+    columns = bytearray()
+    column_sets = {}
+    for set_name, main_deck_only in [("all", False), ("main", True)]:
+        column_arrays = monster_column_arrays(records, main_deck_only)
+        column_offsets = {}
+        for column_name, column in column_arrays.items():
+            columns.extend(b"\0" * (align(len(columns)) - len(columns)))
+            column_offsets[column_name] = len(columns)
+            columns.extend(column.tobytes())
+        column_sets[set_name] = {"count": len(column_arrays["ids"]), "offsets": column_offsets}
+
+    # Code tables, position in the list is the code, and where each set of columns starts in the columns section
+    metadata = json.dumps({
+        "races": sorted(race_codes, key=race_codes.get),
+        "attributes": sorted(attribute_codes, key=attribute_codes.get),
+        "columns": column_sets,
+    }).encode("utf-8")
+
+    # Lay the sections out one after another, keeping the arrays 8 byte aligned
+    sections = [metadata, records.tobytes(), bytes(strings), index_ids.tobytes(), index_positions.tobytes(), bytes(columns)]
+    offsets = []
+    offset = align(HEADER_SIZE)
+    for section in sections:
+        offsets.append(offset)
+        offset = align(offset + len(section))
+
+    header = struct.pack(
+        HEADER_FORMAT,
+        SNAPSHOT_MAGIC,
+        SNAPSHOT_VERSION,
+        len(records),
+        len(index_ids),
+        offsets[0],
+        len(metadata),
+        offsets[1],
+        offsets[2],
+        len(strings),
+        offsets[3],
+        offsets[5],
+    )
+
+    # Write to a temporary file and swap it in, processes that mapped the old snapshot keep reading the old file
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    temporary_file_path = f"{file_path}.tmp"
+    with open(temporary_file_path, "wb") as file:
+        file.write(header)
+        for section_offset, section in zip(offsets, sections):
+            file.write(b"\0" * (section_offset - file.tell()))
+            file.write(section)
+    os.replace(temporary_file_path, file_path)
+
+# Returns the columns of every monster (or every main deck monster) in the records, in record order
+def monster_column_arrays(records, main_deck_only: bool):
+    mask = (records["type_flags"] & TYPE_FLAGS["Monster"]) != 0
+    if main_deck_only:
+        mask &= (records["type_flags"] & EXTRA_DECK_FLAGS) == 0
+    positions = np.flatnonzero(mask)
+    monsters = records[positions]
+
+    # Names are only stored once in the string table, so monsters with the same name have the same offset
+    _, first_positions, name_positions = np.unique(monsters["name_offset"], return_index=True, return_inverse=True)
+
+    return {
+        "positions": positions.astype(COLUMN_DTYPES["positions"]),
+        "ids": monsters["id"].astype(COLUMN_DTYPES["ids"]),
+        "race": monsters["race"].astype(COLUMN_DTYPES["race"]),
+        "attribute": monsters["attribute"].astype(COLUMN_DTYPES["attribute"]),
+        "level": monsters["level"].astype(COLUMN_DTYPES["level"]),
+        "atk": monsters["atk"].astype(COLUMN_DTYPES["atk"]),
+        "defense": monsters["def"].astype(COLUMN_DTYPES["defense"]),
+        "type_flags": monsters["type_flags"].astype(COLUMN_DTYPES["type_flags"]),
+        "name_codes": first_positions[name_positions.reshape(-1)].astype(COLUMN_DTYPES["name_codes"]),
+    }
+
+# Read only view of a card snapshot, the file is memory mapped so every process shares one copy
+class CardSnapshot:
+    def __init__(self, file_path: str):
+        with open(file_path, "rb") as file:
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, record_count, id_count, metadata_offset, metadata_size, records_offset, strings_offset, strings_size, index_offset, columns_offset = struct.unpack_from(HEADER_FORMAT, self.buffer, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f"{file_path} is not a version {SNAPSHOT_VERSION} card snapshot")
+
+        metadata = json.loads(self.buffer[metadata_offset:metadata_offset + metadata_size])
+        self.races = metadata["races"]
+        self.attributes = metadata["attributes"]
+        self.column_sets = metadata["columns"]
+        self.columns_offset = columns_offset
+
+        # Views straight into the mapped file, nothing is copied
+        self.records = np.frombuffer(self.buffer, dtype=RECORD_DTYPE, count=record_count, offset=records_offset)
+        self.strings_offset = strings_offset
+        self.index_ids = np.frombuffer(self.buffer, dtype="<i8", count=id_count, offset=index_offset)
+        self.index_positions = np.frombuffer(self.buffer, dtype="<u4", count=id_count, offset=align(index_offset + self.index_ids.nbytes))
+
+    def __len__(self):
+        return len(self.records)
+
+    # Reads a string out of the string table
+    def string(self, offset, length):
+        start = self.strings_offset + int(offset)
+        return self.buffer[start:start + int(length)].decode("utf-8")
+
+    # Names of the cards at "positions", or of every card in record order
+    def names(self, positions=None):
+        records = self.records if positions is None else self.records[positions]
+        return [self.string(offset, length) for offset, length in zip(records["name_offset"].tolist(), records["name_length"].tolist())]
+
+    # Returns the record position of a card id (or alternate art id), or None if it isn't in the snapshot
+    def position_of_id(self, card_id: int):
+        index = int(np.searchsorted(self.index_ids, card_id))
+        if index < len(self.index_ids) and self.index_ids[index] == card_id:
+            return int(self.index_positions[index])
+        return None
+
+    # Returns a card in the same format as card_database.json
+    def card(self, position: int):
+        record = self.records[position]
+        return {
+            "id": int(record["id"]),
+            "name": self.string(record["name_offset"], record["name_length"]),
+            "type": self.string(record["type_offset"], record["type_length"]),
+            "race": self.races[record["race"]],
+            "level": decode_stat(record["level"]),
+            "atk": decode_stat(record["atk"]),
+            "def": decode_stat(record["def"]),
+            "attribute": self.attributes[record["attribute"]],
+        }
+
+    # Looks up a card by id, works the same as the repository's id index dictionaries
+    def get(self, card_id, default=None):
+        position = self.position_of_id(card_id)
+        if position is None:
+            return default
+        return self.card(position)
+
+    # Views the stored monster columns straight from the mapped file, only the name table is built in this process
+    def monster_columns(self, main_deck_only: bool = False) -> MonsterColumns:
+        column_set = self.column_sets["main" if main_deck_only else "all"]
+        columns = {
+            column_name: np.frombuffer(self.buffer, dtype=COLUMN_DTYPES[column_name], count=column_set["count"], offset=self.columns_offset + column_offset)
+            for column_name, column_offset in column_set["offsets"].items()
+        }
+
+        return MonsterColumns.from_arrays(
+            names=self.names(columns.pop("positions")),
+            race_codes={race: code for code, race in enumerate(self.races)},
+            attribute_codes={attribute: code for code, attribute in enumerate(self.attributes)},
+            **columns,
+        )
+
+# Opens a snapshot if one has been written, otherwise returns None
+def open_snapshot(file_path: str = os.path.join(SNAPSHOT_DIRECTORY, SNAPSHOT_FILE_NAME)):
+    if not os.path.exists(file_path):
+        return None
+
+    # A snapshot from an older version of the bot is ignored until /update writes a new one
+    try:
+        return CardSnapshot(file_path)
+    except ValueError as e:
+        print(f"Ignoring the card snapshot: {e}")
+        return None
+
+# Converts a stored level / ATK / DEF back to None if it was missing
+def decode_stat(value):
+    value = int(value)
+    if value == MISSING_VALUE:
+        return None
+    return value
+
+# Rounds an offset up to the next multiple of 8
+def align(offset: int):
+    return (offset + 7) & ~7
@@ -0,0 +1,226 @@
+import asyncio
+import concurrent.futures
+import discord
+import multiprocessing
+import os
+import threading
+import time
+from scripts import card_repository
+
+MAX_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))    # Leave a core for the Discord event loop
+MAX_QUEUE_DEPTH = 16                                        # Commands allowed to wait for a free worker before new ones are turned away
+DEFAULT_TIMEOUT = 60                                        # Seconds a command may take when it has no timeout of its own
+
+# Seconds each command may take, counting the time spent waiting for a worker
+COMMAND_TIMEOUTS = {
+    "metaltronus_decklist": 30,
+    "metaltronus_gauntlet": 120,
+    "metaltronus_single": 30,
+    "seventh_tachyon": 60,
+    "seventh_tachyon_decklist": 30,
+    "small_world": 30,
+    "small_world_decklist": 60,
+    "small_world_optimize": 60,
+    "small_world_path": 60,
+}
+
+# Base class for the errors sent back to the user instead of a result
+class CommandPoolError(Exception):
+    pass
+
+# Too many commands are already waiting for a worker
+class CommandPoolBusy(CommandPoolError):
+    pass
+
+# The command didn't finish within its timeout
+class CommandTimeout(CommandPoolError):
+    pass
+
+# Runs when each worker starts, so every command it runs finds the snapshot already mapped and the monster columns built
+def preload_worker():
+    card_repository.get_repository().preload_commands()
+
+# Runs CPU heavy commands in a bounded pool of worker processes, so they never block the event loop
+class CommandPool:
+    def __init__(self, max_workers: int = MAX_WORKERS, max_queue_depth: int = MAX_QUEUE_DEPTH):
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.executor = None
+        self.lock = threading.Lock()
+
+        # Commands submitted to the pool that haven't finished yet, including ones whose caller timed out
+        self.pending = 0
+
+        # Totals since the bot started, see status(), every command is counted once as completed, failed, timed out or rejected
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.rejected = 0
+        self.peak_queue_depth = 0
+
+        # command name -> [calls, total seconds]
+        self.timings = {}
+
+    # Starts the worker processes if they aren't running yet, and returns the executor commands should be submitted to
+    def start(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = self.create_executor()
+            return self.executor
+
+    # Creates a new set of worker processes, they begin preloading right away
+    def create_executor(self):
+        # Spawned workers behave the same on every OS and never inherit the event loop's threads
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=preload_worker,
+        )
+        # Submitting a no-op makes the pool spawn every worker now instead of on the first command
+        for _ in range(self.max_workers):
+            executor.submit(time.sleep, 0)
+        return executor
+
+    # Replaces the workers with new ones, used after /update so they preload the new databases
+    def restart(self):
+        # Create the new workers before swapping them in, so a command never finds the pool without an executor
+        new_executor = self.create_executor()
+        with self.lock:
+            old_executor = self.executor
+            self.executor = new_executor
+
+        # New commands go to the new workers, commands already sent to the old ones (running or still queued) finish there against the old databases
+        if old_executor is not None:
+            old_executor.shutdown(wait=False)
+
+    # Stops every worker, used when the bot shuts down
+    def shutdown(self):
+        with self.lock:
+            executor = self.executor
+            self.executor = None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        # Leave the totals in the logs
+        self.log_status("Shutting down")
+        for line in self.timing_report():
+            print(f"Command pool - {line}")
+
+    # Number of commands waiting for a free worker
+    def queue_depth(self) -> int:
+        return max(0, self.pending - self.max_workers)
+
+    # Runs function(*args) in a worker and returns its result, raises CommandPoolBusy or CommandTimeout instead
+    async def run(self, command_name: str, function, *args):
+        if self.queue_depth() >= self.max_queue_depth:
+            self.rejected += 1
+            self.log_status(f"/{command_name} rejected")
+            raise CommandPoolBusy(f"Duelkit is busy with {self.pending} other commands right now, please try again in a moment")
+
+        loop = asyncio.get_running_loop()
+        timeout = COMMAND_TIMEOUTS.get(command_name, DEFAULT_TIMEOUT)
+        start = time.perf_counter()
+
+        future = self.submit(function, *args)
+        self.pending += 1
+        self.peak_queue_depth = max(self.peak_queue_depth, self.queue_depth())
+
+        # The future finishes on one of the executor's threads, release it on the event loop so the counter doesn't need a lock
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self.release))
+
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            # A command still waiting for a worker is dropped, one already running can't be interrupted and finishes in the background
+            future.cancel()
+            self.timed_out += 1
+            self.log_status(f"/{command_name} timed out after {timeout}s")
+            raise CommandTimeout(f"/{command_name} took longer than {timeout} seconds, please try again later")
+        except Exception as e:
+            self.failed += 1
+            self.log_status(f"/{command_name} failed: {e}")
+            raise
+
+        self.finish(command_name, start)
+        return result
+
+    # Submits to the current workers, a restart can shut down the executor it got in between, then it is retried once on the new one
+    def submit(self, function, *args):
+        try:
+            return self.start().submit(function, *args)
+        except RuntimeError:
+            return self.start().submit(function, *args)
+
+    # Frees a command's place in the pool once its worker is done with it, even if its caller already timed out
+    def release(self):
+        self.pending -= 1
+
+    # Counts a command whose result was returned, and how long it took
+    def finish(self, command_name: str, start: float):
+        elapsed = time.perf_counter() - start
+        self.completed += 1
+        timing = self.timings.setdefault(command_name, [0, 0.0])
+        timing[0] += 1
+        timing[1] += elapsed
+        self.log_status(f"/{command_name} finished in {elapsed:.2f}s")
+
+    # Current load of the pool and totals since the bot started
+    def status(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "running": min(self.pending, self.max_workers),
+            "queue_depth": self.queue_depth(),
+            "peak_queue_depth": self.peak_queue_depth,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "rejected": self.rejected,
+        }
+
+    # Prints an event along with the pool's load, so queue depth and timeouts show up in the bot's logs
+    def log_status(self, event: str):
+        status = self.status()
+        print(
+            f"Command pool - {event} ({status['running']}/{status['workers']} running, {status['queue_depth']} queued, peak {status['peak_queue_depth']}, "
+            f"{status['completed']} completed, {status['failed']} failed, {status['timed_out']} timed out, {status['rejected']} rejected)"
+        )
+
+    # Calls and average time of every command run so far
+    def timing_report(self):
+        return [
+            f"/{command_name}: {calls} calls, {total / calls * 1000:.1f}ms average"
+            for command_name, (calls, total) in sorted(self.timings.items())
+        ]
+
+
+# The pool shared by every command
+command_pool = None
+command_pool_lock = threading.Lock()
+
+# Returns the shared pool, creating it on first use
+def get_command_pool() -> CommandPool:
+    global command_pool
+    if command_pool is None:
+        with command_pool_lock:
+            if command_pool is None:
+                command_pool = CommandPool()
+    return command_pool
+
+# Runs a command's function in the shared pool, returns None if it couldn't and the message was already sent
+async def run_command(interaction: discord.Interaction, command_name: str, function, *args):
+    try:
+        return await get_command_pool().run(command_name, function, *args)
+    except CommandPoolError as e:
+        await interaction.followup.send(f"❌ {e}")
+        return None
+
+# Number of commands waiting for a free worker in the shared pool
+def queue_depth() -> int:
+    if command_pool is None:
+        return 0
+    return command_pool.queue_depth()
+
+# Restarts the shared pool's workers if it was started, so they load the new databases
+def restart_command_pool():
+    if command_pool is not None and command_pool.executor is not None:
+        command_pool.restart()
@@ -0,0 +1,219 @@
+import asyncio
+import html
+import json
+import random
+import re
+import time
+from urllib.parse import urlsplit, urlunsplit
+import aiohttp
+
+MAX_CONCURRENT_REQUESTS = 8     # Deck pages downloaded at the same time
+HOST_REQUEST_INTERVAL = 0.25    # Seconds between requests starting against the same host
+MAX_ATTEMPTS = 4                # Tries per page before giving up on it
+BACKOFF_SECONDS = 1             # Wait after the first failed try, doubled after every other one
+REQUEST_TIMEOUT = 30            # Seconds a single request may take
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Sent with every request, some hosts refuse requests without one
+HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; Duelkit)"}
+
+# JS globals read from a deck page's inline script -> key in the returned deck page
+DECK_PAGE_VARIABLES = {
+    "maindeckjs": "main_deck",
+    "extradeckjs": "extra_deck",
+    "sidedeckjs": "side_deck",
+    "deckname": "deck_name",
+    "deckid": "deck_id",
+    "chart1": "archetypes",
+    "maindeckcount": "main_deck_count",
+}
+
+# The same values the browser read with jQuery
+TOTAL_PRICE_PATTERN = re.compile(r'<a\b[^>]*\btitle="Deck Price \(TCGplayer\)"[^>]*>(.*?)</a>', re.S)
+PLACEMENT_PATTERN = re.compile(r'<[^>]*\bclass="[^"]*\bdeck-metadata-child\b[^"]*"[^>]*>.*?<b\b[^>]*>(.*?)</b>', re.S)
+TAG_PATTERN = re.compile(r"<[^>]+>")
+
+# A deck page that couldn't be downloaded or read
+class DeckPageError(Exception):
+    pass
+
+# Returns the position right after "var name =" in a page, or None if the variable isn't declared
+def find_variable(page: str, variable_name: str):
+    match = re.search(rf"\b(?:var|let|const)\s+{re.escape(variable_name)}\s*=\s*", page)
+    if match is None:
+        return None
+    return match.end()
+
+# Reads the JS string literal starting at "start", returns (value, end position)
+def read_string_literal(page: str, start: int):
+    quote = page[start]
+    characters = []
+    position = start + 1
+    while position < len(page):
+        character = page[position]
+        if character == "\\":
+            characters.append(page[position:position + 2])
+            position += 2
+            continue
+        if character == quote:
+            break
+        # JSON needs double quotes escaped, JS only needed the string's own quote escaped
+        characters.append('\\"' if character == '"' else character)
+        position += 1
+    else:
+        raise DeckPageError("Unterminated string in the deck page's script")
+
+    # Escaped single quotes and backticks aren't valid JSON escapes
+    literal = "".join(characters).replace("\\'", "'").replace("\\`", "`")
+    try:
+        return json.loads(f'"{literal}"'), position + 1
+    except json.JSONDecodeError as e:
+        raise DeckPageError(f"Unreadable string in the deck page's script: {e}")
+
+# Returns the end of the JS expression starting at "start", the first ";" or line break outside of brackets and strings
+def find_expression_end(page: str, start: int):
+    depth = 0
+    position = start
+    while position < len(page):
+        character = page[position]
+        if character in "'\"`":
+            _, position = read_string_literal(page, position)
+            continue
+        if character in "[{(":
+            depth += 1
+        elif character in "]})":
+            depth -= 1
+        elif depth == 0 and character in ";\n":
+            break
+        position += 1
+    return position
+
+# Reads the value of a JS global, strings come back as str and everything else has to be valid JSON
+def read_variable(page: str, variable_name: str):
+    start = find_variable(page, variable_name)
+    if start is None:
+        raise DeckPageError(f"{variable_name} is missing from the deck page")
+    if start >= len(page):
+        raise DeckPageError(f"{variable_name} has no value in the deck page")
+
+    if page[start] in "'\"`":
+        return read_string_literal(page, start)[0]
+
+    expression = page[start:find_expression_end(page, start)].strip()
+    try:
+        return json.loads(expression)
+    except json.JSONDecodeError:
+        raise DeckPageError(f"{variable_name} isn't plain JSON in the deck page: {expression[:50]}")
+
+# Returns the text inside the first match of a pattern, like jQuery's .text(), or "" if nothing matched
+def read_element_text(page: str, pattern):
+    match = pattern.search(page)
+    if match is None:
+        return ""
+    return html.unescape(TAG_PATTERN.sub("", match.group(1)))
+
+# Reads everything the scraper needs from a deck page's HTML
+def parse_deck_page(page: str):
+    deck_page = {key: read_variable(page, variable_name) for variable_name, key in DECK_PAGE_VARIABLES.items()}
+    deck_page["total_price"] = read_element_text(page, TOTAL_PRICE_PATTERN)
+    deck_page["placement"] = read_element_text(page, PLACEMENT_PATTERN)
+    return deck_page
+
+# Spaces out the requests made to each host
+class HostRateLimiter:
+    def __init__(self, interval: float = HOST_REQUEST_INTERVAL):
+        self.interval = interval
+        self.next_request_times = {}
+        self.locks = {}
+
+    # Waits until the host can be sent another request
+    async def wait(self, host: str):
+        lock = self.locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            delay = self.next_request_times.get(host, 0) - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.next_request_times[host] = time.monotonic() + self.interval
+
+    # Holds back every request to the host, used when it answers with Retry-After
+    def pause(self, host: str, seconds: float):
+        self.next_request_times[host] = max(self.next_request_times.get(host, 0), time.monotonic() + seconds)
+
+# Downloads deck pages concurrently and reads their decklists, without a browser
+class DeckPageFetcher:
+    def __init__(
+        self,
+        base_url: str = None,
+        max_concurrent_requests: int = MAX_CONCURRENT_REQUESTS,
+        host_request_interval: float = HOST_REQUEST_INTERVAL,
+        max_attempts: int = MAX_ATTEMPTS,
+        backoff_seconds: float = BACKOFF_SECONDS,
+    ):
+        # Sends every request to "base_url" instead of the deck's host (ex: a local server with recorded pages)
+        self.base_url = base_url
+        self.max_concurrent_requests = max_concurrent_requests
+        self.rate_limiter = HostRateLimiter(host_request_interval)
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+
+    # The URL actually requested for a deck, the deck's path on the base URL if there is one
+    def request_url(self, deck_url: str):
+        if not self.base_url:
+            return deck_url
+        base = urlsplit(self.base_url)
+        deck = urlsplit(deck_url)
+        return urlunsplit((base.scheme, base.netloc, base.path.rstrip("/") + deck.path, deck.query, ""))
+
+    # Downloads a page, retrying with exponential backoff on network errors and retryable statuses
+    async def fetch_page(self, session: aiohttp.ClientSession, url: str):
+        host = urlsplit(url).netloc
+        for attempt in range(1, self.max_attempts + 1):
+            await self.rate_limiter.wait(host)
+            try:
+                async with session.get(url) as response:
+                    if response.status == 200:
+                        return await response.text()
+                    if response.status not in RETRY_STATUSES:
+                        raise DeckPageError(f"Status code {response.status}")
+                    error = f"Status code {response.status}"
+
+                    # Respect the host asking us to slow down
+                    retry_after = response.headers.get("Retry-After", "")
+                    if retry_after.isdigit():
+                        self.rate_limiter.pause(host, int(retry_after))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = f"{type(e).__name__}: {e}"
+
+            if attempt < self.max_attempts:
+                # Jitter keeps the retries of every page that failed together from landing together
+                backoff = self.backoff_seconds * 2 ** (attempt - 1)
+                await asyncio.sleep(backoff + random.uniform(0, backoff))
+
+        raise DeckPageError(f"Gave up after {self.max_attempts} attempts ({error})")
+
+    # Downloads every deck page and reads it, returns (deck url -> deck page, deck url -> error message)
+    # "on_result(deck_url, deck_page, error)" is called as each page finishes, and no new page is started once "should_stop()" is True
+    async def fetch_decks(self, deck_urls, on_result=None, should_stop=None):
+        deck_pages = {}
+        errors = {}
+        semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+        timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+
+        async def fetch_deck(session, deck_url):
+            async with semaphore:
+                if should_stop is not None and should_stop():
+                    return
+                try:
+                    page = await self.fetch_page(session, self.request_url(deck_url))
+                    deck_pages[deck_url] = parse_deck_page(page)
+                except DeckPageError as e:
+                    errors[deck_url] = str(e)
+                # Anything else only fails this deck, the browser still gets a try at it
+                except Exception as e:
+                    errors[deck_url] = f"{type(e).__name__}: {e}"
+            if on_result is not None:
+                on_result(deck_url, deck_pages.get(deck_url), errors.get(deck_url))
+
+        async with aiohttp.ClientSession(headers=HEADERS, timeout=timeout) as session:
+            await asyncio.gather(*(fetch_deck(session, deck_url) for deck_url in dict.fromkeys(deck_urls)))
+        return deck_pages, errors
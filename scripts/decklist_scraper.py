@@ -1,17 +1,57 @@
+import asyncio
+import concurrent.futures
 import json
-from selenium import webdriver
+import multiprocessing
+import os
+import queue
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from scripts import formatter
+from scripts import formatter, card_repository, command_pool
+from scripts.browser_pool import BrowserPool
+from scripts.deck_page_fetcher import DeckPageFetcher
+from scripts.scrape_journal import ScrapeJournal
 from datetime import datetime
 
-# Writes data to a file
+TOPPING_DECKLISTS_PATH = "global/json/topping_decklists.json"
+JOURNAL_PATH = "global/json/topping_decklists.journal.jsonl"
+TOP_ARCHETYPES_URL = "https://ygoprodeck.com/tournaments/top-archetypes/"
+EVENT_POLL_SECONDS = 1      # How long the bot waits for a scraper event before checking the worker is still alive
+CANCEL_GRACE_SECONDS = 30   # How long a cancelled worker gets to close the browser before it is terminated
+
+# How deck pages are read: "http" downloads them all concurrently and only opens the ones it can't read in the browser, "browser" opens every one
+HTTP_FETCH_MODE = "http"
+BROWSER_FETCH_MODE = "browser"
+DECK_FETCH_MODE = os.getenv("DECK_FETCH_MODE", HTTP_FETCH_MODE)
+
+# Which decks are visited: "incremental" keeps the decks already in topping_decklists.json and only visits new deck URLs, "full" visits every deck again
+INCREMENTAL_SCRAPE_MODE = "incremental"
+FULL_SCRAPE_MODE = "full"
+DECKLIST_SCRAPE_MODE = os.getenv("DECKLIST_SCRAPE_MODE", INCREMENTAL_SCRAPE_MODE)
+
+# Where deck pages are downloaded from in "http" mode, unset to use each deck's own URL (ex: http://localhost:8080 for recorded pages)
+DECK_PAGE_BASE_URL = os.getenv("DECK_PAGE_BASE_URL")
+
+# Events the scraper worker sends back to the bot, as (event, message content) tuples
+PROGRESS = "progress"
+COMPLETE = "complete"
+CANCELLED = "cancelled"
+FAILED = "failed"
+
+# The worker process of the scrape that is currently running, and the event that cancels it
+scraper_process = None
+scraper_cancel_event = None
+
+# When the running scrape started, and its latest progress message, shown by /update_status
+scraper_started_at = None
+scraper_progress = None
+
+# Writes data to a file, through a temporary file so readers never see half of it
 def save_progress(archetype_data):
-    with open("global/json/topping_decklists.json", "w") as f:
+    temporary_path = f"{TOPPING_DECKLISTS_PATH}.tmp"
+    with open(temporary_path, "w") as f:
         json.dump(archetype_data, f, indent=4)
+    os.replace(temporary_path, TOPPING_DECKLISTS_PATH)
 
 # Scrolls the webpage to the element we want to click on
 def scroll_to_element(driver, element):
@@ -37,194 +77,457 @@ def click_element(driver, wait, element):
         return False
     return True
 
-# Gets the data from YGOPro.com
-async def pull_data_from_ygo_pro(message):
-    # Get the latest database of cards
-    with open('global/json/full_database.json', 'r', encoding="utf-8") as file:
-        full_database = json.load(file)
+# Gets the data from YGOPro.com, runs in its own process and reports back through "progress_queue"
+def scrape_topping_decklists(progress_queue, cancel_event):
+    # The decks saved by the last scrape
+    previous_archetype_data = card_repository.get_repository().topping_decklists()
+
+    # Every new deck is written to the journal as soon as it's read, decks from a scrape that was interrupted are picked back up
+    # Decks that couldn't be read are journaled as failed, and are visited again
+    journal = ScrapeJournal(JOURNAL_PATH)
+    journal_records = journal.read()
+    journaled_decks = {record["deck_url"]: record["deck"] for record in journal_records if "deck" in record}
+    journaled_failures = {record["deck_url"] for record in journal_records if "error" in record} - journaled_decks.keys()
+    if journal_records:
+        progress_queue.put((PROGRESS, f"Resuming the last scrape with **{len(journaled_decks)}** decks already visited, retrying **{len(journaled_failures)}** that failed..."))
+
+    # Deck url -> error of every deck that couldn't be read in this scrape
+    failed_decks = {}
 
-    # Setup WebDriver, options taken from recommended FAQ
-    options = webdriver.ChromeOptions()
-    options.add_argument("--headless")  # Run in headless mode
-    options.add_argument("--disable-gpu")  # May help on some systems
-    options.add_argument("--disable-software-rasterizer")  # Prevents software fallback for WebGL
-    options.add_argument("--window-size=1920,1080")  # Set a standard window size
-    options.add_argument("--no-sandbox")  # Useful for running in some environments
-    options.add_argument("--disable-dev-shm-usage")  # Helps prevent crashes
-    options.add_argument("--use-gl=swiftshader") # Addresses "fallback to software WebGL deprecated" errors
-    options.add_argument("--ignore-certificate-errors") # Addresses "handshake failed" errors
-    options.add_argument("--disable-features=SSLVersionMin") # Addresses "handshake failed" errors
+    try:
+        # Inform the user that the drivers have started
+        progress_queue.put((PROGRESS, "Launching Selenium Web Drivers For YGO Pro..."))
+
+        # Every browser is closed when the pool closes, even when the scrape was cancelled or failed
+        with BrowserPool() as pool:
+            archetype_data = scrape_ygo_pro(pool, progress_queue, cancel_event, previous_archetype_data, journal, journaled_decks, failed_decks)
+    except Exception as e:
+        print(f"Error scraping decklists: {e}")
+        progress_queue.put((FAILED, f"Decklist scraping failed, keeping the current decklists:\n```{e}```"))
+        return
+    finally:
+        # Whatever was visited stays on disk for the next scrape
+        journal.close()
+
+    # Cancelled scrapes keep the current decklists, the next scrape resumes from the journal
+    if archetype_data is None:
+        progress_queue.put((CANCELLED, "Decklist scraping was cancelled, keeping the current decklists"))
+        return
+
+    # Only save once every deck was visited, then the journal's decks are all in the saved file
+    save_progress(archetype_data)
+    journal.discard()
+
+    # Compare against the decks the bot was using
+    added, removed, kept = diff_deck_ids(previous_archetype_data, archetype_data)
 
+    # Inform the user the process is done
+    progress_queue.put((COMPLETE, f"Complete! All data has been updated\n\nDecks added: **{len(added)}**, removed: **{len(removed)}**, unchanged: **{len(kept)}**, could not be read: **{len(failed_decks)}**"))
 
-    
-    # Inform the user that the driver has started
-    await message.edit(content="Launching Selenium Web Driver For YGO Pro...")  # Edit the message sent earlier
+# Every deck's id, across all archetypes
+def deck_ids(archetype_data):
+    return {str(deck["deck_id"]) for archetype in archetype_data.values() for deck in archetype["decks"].values()}
 
-    # Create the Driver
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+# Returns the deck ids that were added, removed or kept between two scrapes
+def diff_deck_ids(previous_archetype_data, archetype_data):
+    previous_deck_ids = deck_ids(previous_archetype_data)
+    current_deck_ids = deck_ids(archetype_data)
+    return current_deck_ids - previous_deck_ids, previous_deck_ids - current_deck_ids, current_deck_ids & previous_deck_ids
 
-    # Wait for initial load
-    wait = WebDriverWait(driver, 10)  # Increase wait time
+# Maps every deck URL of a previous scrape to its saved deck
+def decks_by_url(archetype_data):
+    return {deck["deck_url"]: deck for archetype in archetype_data.values() for deck in archetype["decks"].values()}
 
-    # Go to the Top Archetypes page
-    url = "https://ygoprodeck.com/tournaments/top-archetypes/"
-    driver.get(url)
+# Visits every topping deck and returns them grouped by archetype, or None if the scrape was cancelled
+def scrape_ygo_pro(pool: BrowserPool, progress_queue, cancel_event, previous_archetype_data, journal: ScrapeJournal, journaled_decks: dict, failed_decks: dict):
+    # Get the card id index, alternate art ids resolve to the original card
+    card_index = card_repository.get_repository().card_database_index()
 
     # Setup archetype JSON
     archetype_data = {}
-    all_deck_links = []
 
-    # Iterator for Progress Bar function
-    archetype_number = 0
+    # Inform the user that we are now searching for all archetypes
+    progress_queue.put((PROGRESS, "Driver Launched, Obtaining list of Topping Archetypes..."))
 
+    # Get all the archetype names and percentages on the page
     try:
-        # Inform the user that we are now searching for all archetypes
-        await message.edit(content="Driver Launched, Obtaining list of Topping Archetypes...")
+        archetypes = pool.submit(read_archetypes).result()
+    except Exception as e:
+        progress_queue.put((PROGRESS, f"Error loading archetype page: {e}"))
+        print(f"Error loading archetype page: {e}")
+        archetypes = []
 
-        # Get all the archetypes on the page
-        archetype_html_elements = wait.until(EC.presence_of_all_elements_located((By.CLASS_NAME, "arch-item")))
+    # Get the total amount of archetypes to use in the progress bar later
+    total_archetypes = len(archetypes)
+    total_archetypes_message = f"Total Archetypes: **{total_archetypes}**"
 
-        # Get the total amount of archetypes to use in the progress bar later
-        total_archetypes = len(archetype_html_elements)
-        total_archetypes_message = f"Total Archetypes: **{total_archetypes}**"
+    # Define archetype structure in the JSON, in the order of the page
+    for archetype_name, archetype_percentage in archetypes:
+        archetype_data[archetype_name] = {
+            "percentage": archetype_percentage,
+            "decks": {}
+        }
 
-        # For every archetype on the page
-        for archetype in archetype_html_elements:
-            try:
-                # Counter for progress through the array, to be sent to the progress bar function
-                archetype_number +=1
-
-                # Get the archetype name and percentage
-                archetype_name = (archetype.find_element(By.CLASS_NAME, "arch-name")).text.strip()
-                archetype_percentage = (archetype.find_element(By.CLASS_NAME, "arch-sub")).text.strip()
-
-                # Define archetype structure in the JSON
-                archetype_data[archetype_name] = {
-                    "percentage": archetype_percentage,
-                    "decks": {}
-                }
-
-                # Build initial sentence structure for informing the user on current progress
-                archetype_message = "Finding all decklists for:"
-                archetype_message += f" **{archetype_name}**"
-
-                # Update the progress bar and add it to the message
-                progress_bar_message = progress_bar(archetype_number, total_archetypes)
-
-                # Inform the user which archetype we are currently looking at, and how many archetypes have been completed
-                await message.edit(content=f"{total_archetypes_message}\n\n{archetype_message}\n\n{progress_bar_message}")
-
-                # Scroll to the archetype and click it
-                if not click_element(driver, wait, archetype):
-                    # Skip to the next archetype if this one couldn't be clicked
-                    continue  
-
-                # Wait for the page to load
-                wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "a.deck_article-card-title")))
-
-                # Extract all the decklist URLs into a set to prevent duplicates
-                deck_links = set()
-                deck_elements = driver.find_elements(By.CSS_SELECTOR, "a.deck_article-card-title")
-
-                # For every decklist, if the url exists, add it to the set
-                for deck_list in deck_elements:
-                    deck_url = deck_list.get_attribute("href")
-                    if deck_url:
-                        deck_links.add(deck_url)
-                    else:
-                        print(f"Skipping deck without URL in {archetype_name}.")
-
-                # If there are any deck links for this archetype, add it to the json
-                if deck_links:
-                    all_deck_links.append((archetype_name, deck_links))
-                else:
-                    print(f"No deck URLs found for {archetype_name}, skipping this archetype.")
-
-            except Exception as e:
-                await message.edit(content=f"Error processing: **{archetype}**: {e}")
-                print(f"Error processing archetype {archetype}: {e}")
-                # Skip this archetype and move on to the next
-                continue  
-    except Exception as e:
-        await message.edit(content=f"Error loading archetype page: {e}")
-        print(f"Error loading archetype page: {e}")
+    # Click every archetype at once across the pool's browsers
+    archetype_futures = {pool.submit(read_archetype_deck_links, archetype_name): archetype_name for archetype_name, _ in archetypes}
+    deck_links_by_archetype = {}
+
+    # Archetypes whose decks couldn't be listed, their saved decks are kept instead of being retired
+    failed_archetypes = set()
+
+    # Iterator for Progress Bar function
+    archetype_number = 0
+
+    # For every archetype, as its browser finishes it
+    for future in concurrent.futures.as_completed(archetype_futures):
+        # Stop between archetypes if the bot asked us to
+        if cancel_event.is_set():
+            pool.cancel_pending()
+            return None
+
+        # Counter for progress through the array, to be sent to the progress bar function
+        archetype_number += 1
+        archetype_name = archetype_futures[future]
+
+        # Inform the user which archetype was just read, and how many archetypes have been completed
+        progress_bar_message = progress_bar(archetype_number, total_archetypes)
+        progress_queue.put((PROGRESS, f"{total_archetypes_message}\n\nFound all decklists for: **{archetype_name}**\n\n{progress_bar_message}"))
+
+        try:
+            deck_links = future.result()
+        except Exception as e:
+            progress_queue.put((PROGRESS, f"Error processing: **{archetype_name}**: {e}"))
+            print(f"Error processing archetype {archetype_name}: {e}")
+            # Skip this archetype and move on to the next
+            failed_archetypes.add(archetype_name)
+            continue
+
+        # If there are any deck links for this archetype, add it to the json
+        if deck_links:
+            deck_links_by_archetype[archetype_name] = deck_links
+        else:
+            print(f"No deck URLs found for {archetype_name}, keeping its saved decks.")
+            failed_archetypes.add(archetype_name)
+
+    # Keep the archetypes in the order of the page
+    all_deck_links = [(archetype_name, deck_links_by_archetype[archetype_name]) for archetype_name in archetype_data if archetype_name in deck_links_by_archetype]
+
+    # An empty page would retire every saved deck, treat it as a failed scrape instead
+    if not all_deck_links:
+        raise ValueError("No topping decks were found on the Top Archetypes page")
+
+    # Decks saved by an earlier scrape are kept as they are, only new deck URLs are visited
+    known_decks = {}
+    if DECKLIST_SCRAPE_MODE == INCREMENTAL_SCRAPE_MODE:
+        known_decks = decks_by_url(previous_archetype_data)
+
+    # Decks visited by an interrupted scrape are newer than the saved ones
+    known_decks.update(journaled_decks)
+    new_deck_links = [(archetype_name, [deck_url for deck_url in deck_links if deck_url not in known_decks]) for archetype_name, deck_links in all_deck_links]
 
     # Calculate the total number of decks by iterating through the Tuple, and create the initial message
     total_decks = sum(len(deck_links) for _, deck_links in all_deck_links)
-    total_decks_message = f"Found **{total_decks}** unique deck lists"
-    await message.edit(content=total_decks_message)
+    total_new_decks = sum(len(deck_links) for _, deck_links in new_deck_links)
+    total_decks_message = f"Found **{total_decks}** unique deck lists, **{total_new_decks}** of them new"
+    progress_queue.put((PROGRESS, total_decks_message))
+
+    # Converts a new deck page and writes it to the journal straight away, returns False if the page couldn't be converted
+    new_decks = {}
+    def record_deck(deck_url, deck_page):
+        try:
+            new_decks[deck_url] = build_deck(deck_url, deck_page, card_index)
+        except Exception as e:
+            print(f"Error extracting data for {deck_url}: {e}")
+            return False
+        journal.append({"deck_url": deck_url, "deck": new_decks[deck_url]})
+        return True
+
+    # Writes a deck that couldn't be read to the journal, so the next scrape tries it again instead of skipping it
+    def record_failure(deck_url, error):
+        progress_queue.put((PROGRESS, f"Error extracting data for {deck_url}: {error}"))
+        failed_decks[deck_url] = str(error)
+        journal.append({"deck_url": deck_url, "error": str(error)})
+
+    # Download every new deck page at once, only the ones that couldn't be downloaded or converted are opened in the browser below
+    deck_pages = {}
+    if DECK_FETCH_MODE == HTTP_FETCH_MODE and total_new_decks:
+        deck_pages = fetch_deck_pages(new_deck_links, total_decks_message, progress_queue, cancel_event, record_deck)
+        if cancel_event.is_set():
+            return None
+
+    # Open every new deck page that wasn't downloaded across the pool's browsers
+    browser_deck_urls = {}
+    for archetype_name, deck_links in new_deck_links:
+        for deck_url in deck_links:
+            if deck_url not in deck_pages:
+                browser_deck_urls.setdefault(deck_url, archetype_name)
+    deck_futures = {pool.submit(read_deck_page_in_browser, deck_url): deck_url for deck_url in browser_deck_urls}
 
     # Iterator for Progress Bar function
     deck_number = 0
 
-    # For every archetype, look at the deck url
+    # For every deck page, as its browser finishes it
+    for future in concurrent.futures.as_completed(deck_futures):
+        # Stop between decks if the bot asked us to
+        if cancel_event.is_set():
+            pool.cancel_pending()
+            return None
+
+        # Increment the iterator for the Progress Bar function
+        deck_number += 1
+        deck_url = deck_futures[future]
+
+        # Update the progress bar and Inform the user which archetype we are looking at
+        progress_bar_message = progress_bar(deck_number, len(deck_futures))
+        progress_queue.put((PROGRESS, f"{total_decks_message}\n\n Visiting deck lists for: **{browser_deck_urls[deck_url]}**\n\n{progress_bar_message}"))
+
+        try:
+            deck_page = future.result()
+        except Exception as e:
+            print(f"Error extracting data for {deck_url}: {e}")
+            record_failure(deck_url, e)
+            continue
+        if not record_deck(deck_url, deck_page):
+            record_failure(deck_url, "The deck page couldn't be converted")
+
+    # For every archetype, look at the deck url, decks that dropped off the page aren't carried over
     for archetype_name, deck_links in all_deck_links:
-        # For every deck url, visit all the deck links and extract data
         for deck_url in deck_links:
-            # Increment the iterator for the Progress Bar function
-            deck_number += 1
-
-            # Update the progress bar and Inform the user which archetype we are looking at
-            progress_bar_message = progress_bar(deck_number, total_decks)
-            await message.edit(content=f"{total_decks_message}\n\n Visiting deck lists for: **{archetype_name}**\n\n{progress_bar_message}")
-
+            # Known decks keep their saved data, even if they moved to another archetype
+            if deck_url in known_decks:
+                deck = known_decks[deck_url]
+                archetype_data[archetype_name]["decks"][f"{deck['deck_name']}-{deck['deck_id']}"] = deck
+                continue
+
+            # Decks that couldn't be read were already reported
+            if deck_url not in new_decks:
+                continue
+
+            # Store deck data, using name and ID to make a unique key
+            deck = new_decks[deck_url]
+            archetype_data[archetype_name]["decks"][f"{deck['deck_name']}-{deck['deck_id']}"] = deck
+
+    # Archetypes that failed to load keep their saved decks unchanged, unless a deck was found under another archetype this time
+    scraped_deck_urls = {deck_url for _, deck_links in all_deck_links for deck_url in deck_links}
+    for archetype_name in failed_archetypes:
+        for deck_key, deck in previous_archetype_data.get(archetype_name, {}).get("decks", {}).items():
+            if deck["deck_url"] not in scraped_deck_urls:
+                archetype_data[archetype_name]["decks"][deck_key] = deck
+
+    return archetype_data
+
+# Reads every archetype's name and percentage from the Top Archetypes page
+def read_archetypes(driver):
+    wait = WebDriverWait(driver, 10)
+    driver.get(TOP_ARCHETYPES_URL)
+
+    # Get all the archetypes on the page
+    archetype_html_elements = wait.until(EC.presence_of_all_elements_located((By.CLASS_NAME, "arch-item")))
+    return [
+        (archetype.find_element(By.CLASS_NAME, "arch-name").text.strip(), archetype.find_element(By.CLASS_NAME, "arch-sub").text.strip())
+        for archetype in archetype_html_elements
+    ]
+
+# Clicks an archetype on the Top Archetypes page and returns the URLs of its decks
+def read_archetype_deck_links(driver, archetype_name):
+    wait = WebDriverWait(driver, 10)
+    driver.get(TOP_ARCHETYPES_URL)
+
+    # Find the archetype by name, the page is reloaded for every archetype
+    archetype_html_elements = wait.until(EC.presence_of_all_elements_located((By.CLASS_NAME, "arch-item")))
+    archetype = next((element for element in archetype_html_elements if element.find_element(By.CLASS_NAME, "arch-name").text.strip() == archetype_name), None)
+    if archetype is None:
+        raise ValueError(f"{archetype_name} is no longer on the Top Archetypes page")
+
+    # Scroll to the archetype and click it, skipping it if it couldn't be clicked
+    if not click_element(driver, wait, archetype):
+        return set()
+
+    # Wait for the page to load
+    wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "a.deck_article-card-title")))
+
+    # Extract all the decklist URLs into a set to prevent duplicates
+    deck_links = set()
+    deck_elements = driver.find_elements(By.CSS_SELECTOR, "a.deck_article-card-title")
+
+    # For every decklist, if the url exists, add it to the set
+    for deck_list in deck_elements:
+        deck_url = deck_list.get_attribute("href")
+        if deck_url:
+            deck_links.add(deck_url)
+        else:
+            print(f"Skipping deck without URL in {archetype_name}.")
+    return deck_links
+
+# Downloads every deck page over HTTP, handing each one to "on_deck_page" as it arrives, returns deck url -> deck page for the ones that could be read
+# "on_deck_page" returns False for a page it couldn't convert, those are left out so the browser tries them again
+def fetch_deck_pages(all_deck_links, total_decks_message, progress_queue, cancel_event, on_deck_page):
+    deck_urls = [deck_url for _, deck_links in all_deck_links for deck_url in deck_links]
+    finished_decks = 0
+    unconverted_deck_urls = set()
+
+    # Called as each page finishes
+    def report_result(deck_url, deck_page, error):
+        nonlocal finished_decks
+        finished_decks += 1
+        if error is not None:
+            print(f"Error downloading {deck_url}, it will be opened in the browser: {error}")
+        elif not on_deck_page(deck_url, deck_page):
+            print(f"Error converting the download of {deck_url}, it will be opened in the browser")
+            unconverted_deck_urls.add(deck_url)
+        progress_bar_message = progress_bar(finished_decks, len(deck_urls))
+        progress_queue.put((PROGRESS, f"{total_decks_message}\n\n Downloading deck lists...\n\n{progress_bar_message}"))
+
+    fetcher = DeckPageFetcher(base_url=DECK_PAGE_BASE_URL)
+    deck_pages, _ = asyncio.run(fetcher.fetch_decks(deck_urls, on_result=report_result, should_stop=cancel_event.is_set))
+    return {deck_url: deck_page for deck_url, deck_page in deck_pages.items() if deck_url not in unconverted_deck_urls}
+
+# Visits a deck page and reads the same values DeckPageFetcher reads from the HTML
+def read_deck_page_in_browser(driver, deck_url):
+    # Visit the deck URL and wait for the page to load
+    wait = WebDriverWait(driver, 10)
+    driver.get(deck_url)
+    wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))  
+
+    # Extract data from public variables, and html values
+    return {
+        "main_deck": driver.execute_script("return maindeckjs;"),
+        "extra_deck": driver.execute_script("return extradeckjs;"),
+        "side_deck": driver.execute_script("return sidedeckjs;"),
+        "deck_name": driver.execute_script("return deckname;"),
+        "deck_id": driver.execute_script("return deckid;"),
+        "archetypes": driver.execute_script("return chart1;"),
+        "main_deck_count": driver.execute_script("return maindeckcount;"),
+        "total_price": driver.execute_script("return jQuery('a[title=\"Deck Price (TCGplayer)\"]').text();"),
+        "placement": driver.execute_script("return jQuery('.deck-metadata-child:first-of-type b:first-of-type').text();"),
+    }
+
+# Converts a deck page's values into the deck stored in topping_decklists.json
+def build_deck(deck_url, deck_page, card_index):
+    #Convert deck string of ids, into an array of names
+    main_deck_ids = json.loads(deck_page["main_deck"])
+    main_deck_names = [formatter.assign_single_card_by_id(int(card_id), card_index) for card_id in main_deck_ids]
+    extra_deck_ids = json.loads(deck_page["extra_deck"])
+    extra_deck_names = [formatter.assign_single_card_by_id(int(card_id), card_index) for card_id in extra_deck_ids]
+    side_deck_ids = json.loads(deck_page["side_deck"])
+    side_deck_names = [formatter.assign_single_card_by_id(int(card_id), card_index) for card_id in side_deck_ids]
+
+    return {
+        "deck_url": deck_url,
+        "deck_name": deck_page["deck_name"],
+        "deck_id": deck_page["deck_id"],
+        "total_price": deck_page["total_price"],
+        "placement": deck_page["placement"],
+        "main_deck_count": deck_page["main_deck_count"],
+        "deck_list": {
+            "main_deck": main_deck_names,
+            "extra_deck": extra_deck_names,
+            "side_deck": side_deck_names,
+        },
+        "archetypes": deck_page["archetypes"],
+    }
+
+# Starts the scraper in its own process and relays its progress to "message" until it finishes
+async def pull_data_from_ygo_pro(message):
+    global scraper_process, scraper_cancel_event, scraper_started_at, scraper_progress
+
+    # Only one scrape at a time, a second /update leaves the running one alone
+    if is_scrape_running():
+        await message.edit(content="Decklists are already being scraped in the background, please wait for it to finish")
+        return
+
+    # Spawned so the worker never inherits the event loop's threads
+    context = multiprocessing.get_context("spawn")
+    progress_queue = context.Queue()
+    scraper_cancel_event = context.Event()
+    scraper_process = context.Process(target=scrape_topping_decklists, args=(progress_queue, scraper_cancel_event), daemon=True)
+    scraper_process.start()
+    scraper_started_at = datetime.now()
+    scraper_progress = None
+
+    loop = asyncio.get_running_loop()
+    process = scraper_process
+    cancel_event = scraper_cancel_event
+    try:
+        while True:
+            # Wait for the next event on a thread, so the event loop keeps serving commands
             try:
-                # Visit the deck URL and wait for the page to load
-                driver.get(deck_url)
-                wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))  
-
-                # Extract data from public variables, and html values
-                main_deck = driver.execute_script("return maindeckjs;")
-                extra_deck = driver.execute_script("return extradeckjs;")
-                side_deck = driver.execute_script("return sidedeckjs;")
-                deck_name = driver.execute_script("return deckname;")
-                deck_id = driver.execute_script("return deckid;")
-                archetypes = driver.execute_script("return chart1;")
-                main_deck_count = driver.execute_script("return maindeckcount;")
-                total_price = driver.execute_script("return jQuery('a[title=\"Deck Price (TCGplayer)\"]').text();")
-                placement = driver.execute_script("return jQuery('.deck-metadata-child:first-of-type b:first-of-type').text();")
-
-                #Convert deck string of ids, into an array of names
-                main_deck_ids = json.loads(main_deck)
-                main_deck_names = [formatter.assign_single_card_by_id(int(card_id), full_database) for card_id in main_deck_ids]
-                extra_deck_ids = json.loads(extra_deck)
-                extra_deck_names = [formatter.assign_single_card_by_id(int(card_id), full_database) for card_id in extra_deck_ids]
-                side_deck_ids = json.loads(side_deck)
-                side_deck_names = [formatter.assign_single_card_by_id(int(card_id), full_database) for card_id in side_deck_ids]
-
-                # Store deck data, using name and ID to make a unique key
-                archetype_data[archetype_name]["decks"][f"{deck_name}-{deck_id}"] = {
-                    "deck_url": deck_url,
-                    "deck_name": deck_name,
-                    "deck_id": deck_id,
-                    "total_price": total_price,
-                    "placement": placement,
-                    "main_deck_count": main_deck_count,
-                    "deck_list": {
-                        "main_deck": main_deck_names,
-                        "extra_deck": extra_deck_names,
-                        "side_deck": side_deck_names,
-                    },
-                    "archetypes": archetypes,
-                }
-
-                # Write the results to a file after processing each deck
-                save_progress(archetype_data)
-
-            except Exception as e:
-                await message.edit(content=f"Error extracting data for {deck_url}: {e}")
-                print(f"Error extracting data for {deck_url}: {e}")
-                # Skip this deck and move on to the next
-                continue  
-
-    # Final save when done
-    save_progress(archetype_data)
-
-    # Inform the user the process is done
-    await message.edit(content="Complete! All data has been updated")
-
-    # Close WebDriver
-    driver.quit()
+                event, content = await loop.run_in_executor(None, progress_queue.get, True, EVENT_POLL_SECONDS)
+            except queue.Empty:
+                if not process.is_alive():
+                    await edit_progress_message(message, "Decklist scraping stopped unexpectedly, keeping the current decklists")
+                    return
+                continue
+
+            # Only show the newest progress, older updates would just be overwritten
+            while event == PROGRESS:
+                try:
+                    event, content = progress_queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if event == COMPLETE:
+                # Swap in the new decklists for every command, and the command workers, loading them on a thread
+                await loop.run_in_executor(None, card_repository.reload_repository)
+                command_pool.restart_command_pool()
+
+            scraper_progress = content
+            await edit_progress_message(message, content)
+            if event != PROGRESS:
+                return
+    finally:
+        # Stop the worker if the bot stopped listening early, then give it time to close the browser before forcing it
+        cancel_event.set()
+        await loop.run_in_executor(None, stop_process, process)
+        if scraper_process is process:
+            scraper_process = None
+            scraper_cancel_event = None
+            scraper_started_at = None
+            scraper_progress = None
+
+# Progress messages are best effort, a deleted message or a rate limit shouldn't stop the scrape
+async def edit_progress_message(message, content: str):
+    try:
+        await message.edit(content=content)
+    except Exception as e:
+        print(f"Error editing scraper progress message: {e}")
+
+# Waits for a worker to finish, terminating it if it takes longer than the grace period
+def stop_process(process):
+    process.join(CANCEL_GRACE_SECONDS)
+    if process.is_alive():
+        process.terminate()
+        process.join()
+
+# Whether a scrape is currently running
+def is_scrape_running():
+    return scraper_process is not None and scraper_process.is_alive()
+
+# Describes the running scrape and its latest progress, used by /update_status
+def scrape_status():
+    if not is_scrape_running():
+        return "No decklist scrape is running right now"
+
+    minutes = int((datetime.now() - scraper_started_at).total_seconds() // 60)
+    status = f"Decklists have been scraping in the background for **{minutes}** minute(s)"
+    if scraper_cancel_event.is_set():
+        status += ", waiting for the scrape to stop"
+    if scraper_progress:
+        status += f"\n\n{scraper_progress}"
+    return status
+
+# Asks the running scrape to stop after the page it is on, the current decklists are kept
+def cancel_scrape():
+    if scraper_cancel_event is not None:
+        scraper_cancel_event.set()
+        return True
+    return False
+
+# Cancels the running scrape and waits for its browser to close, used when the bot shuts down
+def stop_scrape():
+    process = scraper_process
+    if cancel_scrape() and process is not None:
+        stop_process(process)
 
 # Creates a progress bar as a string to append to messages
 def progress_bar(iteration, total):
@@ -3,9 +3,23 @@ import re
 import discord
 import aiohttp
 import os
-from scripts import decklist_scraper
+from scripts import decklist_scraper, card_repository, card_snapshot, command_pool, ydk_parser
+from scripts.small_world_adjacency import SmallWorldAdjacency, ADJACENCY_FILE_NAME, ADJACENCY_IDS_FILE_NAME
 from datetime import datetime, timezone
 import asyncio
+import time
+
+# Konami card database API URLs, can be pointed at a local server serving a recorded dump (ex: http://localhost:8080/cardinfo.php)
+CARD_DATABASE_URL = os.getenv("CARD_DATABASE_URL", "https://db.ygoprodeck.com/api/v7/cardinfo.php")
+DATABASE_VERSION_URL = os.getenv("DATABASE_VERSION_URL", "https://db.ygoprodeck.com/api/v7/checkDBVer.php")
+FULL_DATABASE_PATH = "global/json/full_database.json"
+CARD_DATABASE_PATH = "global/json/card_database.json"
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Results of retrieve_full_database
+DOWNLOADED = "downloaded"
+DOWNLOAD_NOT_MODIFIED = "not_modified"
+DOWNLOAD_FAILED = "failed"
 
 # Calls all functions in the file to update all json files
 async def update(interaction: discord.Interaction):
@@ -15,50 +29,175 @@ async def update(interaction: discord.Interaction):
     # Defer the response so multiple processes can use its webhook
     await interaction.response.defer(thinking=True)
 
-    message = await interaction.followup.send("Updating full card database...")
-    await retrieve_full_database(message)
-
-    await message.edit(content="Creating Monster databases...")
-    format_monsters()
+    # How long each stage of the update took
+    stage_timings = []
 
-    await message.edit(content="Creating Names database for autocompletion...")
-    format_names()
-
-    await message.edit(content="Creating Names and Set Codes database for autocompletion...")
-    format_names_and_set_codes()
-
-    # Save the date of the last update
-    with open("global/json/last_update.json", "w") as f:
-        json.dump({"last_update": get_current_date()}, f)
+    message = await interaction.followup.send("Checking for card database updates...")
+    card_database_summary = await refresh_card_databases(message, stage_timings)
 
     await message.edit(content="Beginning to update all topping decklists...")
     
     asyncio.create_task(decklist_scraper.pull_data_from_ygo_pro(message))
-    await message.edit(content="Initial updates complete. Decklist scraping is now running in the background.")
+    await message.edit(content=f"Initial updates complete. Decklist scraping is now running in the background.\n\n{card_database_summary}\n" + "\n".join(stage_timings))
 
 
     # await decklist_scraper.pull_data_from_ygo_pro(message)
 
-# retrieves the full card database from Konami's API
-async def retrieve_full_database(message):
-    # Konami card database API URL
-    url = "https://db.ygoprodeck.com/api/v7/cardinfo.php"
+# Downloads and rebuilds the card databases, skipping the work when nothing changed upstream
+async def refresh_card_databases(message, stage_timings):
+    stage_start = time.perf_counter()
+    repository = card_repository.get_repository()
+    previous_update = repository.last_update_info()
+
+    # Ask the API which database version it is serving
+    database_version = await retrieve_database_version()
+    stage_start = record_stage_time(stage_timings, "Check database version", stage_start)
+
+    # Nothing to do if we already built this version and every file built from it is still there, only note that it was checked
+    if database_version is not None and database_version == previous_update.get("database_version") and derived_files_exist():
+        save_last_update(database_version, previous_update.get("etag"))
+        return f"Card database is already up to date (version **{database_version}**)"
+
+    # Only download if the file changed since the last download
+    await message.edit(content="Updating full card database...")
+    download_status, etag = await retrieve_full_database(message, etag=previous_update.get("etag"))
+    stage_start = record_stage_time(stage_timings, "Download card database", stage_start)
+
+    if download_status == DOWNLOAD_FAILED:
+        return "Card database could not be downloaded, keeping the current databases"
+
+    if download_status == DOWNLOAD_NOT_MODIFIED and derived_files_exist():
+        summary = "Card database has not changed since the last download"
+    else:
+        # Every stage below runs on a thread, so the event loop keeps answering Discord and other commands while it works
+        # Parse the download one card at a time while building the derived databases
+        await message.edit(content="Creating Card, Monster, Names, Set Codes and Seventh Tachyon databases...")
+        derived_databases = await asyncio.to_thread(build_derived_databases, iter_full_database_cards(FULL_DATABASE_PATH))
+        stage_start = record_stage_time(stage_timings, "Parse and build derived databases", stage_start)
+
+        # Compare against the databases the bot is currently using
+        added, changed, removed = await asyncio.to_thread(diff_card_databases, repository, derived_databases)
+        summary = f"Cards added: **{len(added)}**, changed: **{len(changed)}**, removed: **{len(removed)}**"
+        stage_start = record_stage_time(stage_timings, "Compare card databases", stage_start)
+
+        # Only rewrite and reload the databases (and every index built from them) if a card actually changed
+        if added or changed or removed or not derived_files_exist():
+            await asyncio.to_thread(write_derived_databases, derived_databases)
+            stage_start = record_stage_time(stage_timings, "Write derived databases", stage_start)
+
+            # Binary snapshot that worker processes map into memory instead of parsing JSON
+            await asyncio.to_thread(card_snapshot.write_snapshot, derived_databases["card_database.json"]["data"], derived_databases["card_id_aliases.json"], card_repository.SNAPSHOT_PATH)
+            del derived_databases
+            stage_start = record_stage_time(stage_timings, "Write card snapshot", stage_start)
+
+            # Small World graph over the snapshot's main deck monsters, saved next to it
+            await asyncio.to_thread(build_small_world_adjacency)
+            stage_start = record_stage_time(stage_timings, "Build Small World adjacency", stage_start)
+
+            # Swap in the freshly built databases for every command
+            await message.edit(content="Loading the new databases...")
+            await asyncio.to_thread(card_repository.reload_repository)
+
+            # Replace the command workers so they load the new databases too
+            await asyncio.to_thread(command_pool.restart_command_pool)
+            stage_start = record_stage_time(stage_timings, "Load new databases", stage_start)
+
+    save_last_update(database_version, etag)
+    return summary
+
+# Builds the Small World graph over the new snapshot's main deck monsters, and saves it next to the snapshot
+def build_small_world_adjacency():
+    snapshot = card_snapshot.open_snapshot(card_repository.SNAPSHOT_PATH)
+    SmallWorldAdjacency.build(snapshot.monster_columns(main_deck_only=True)).save(card_snapshot.SNAPSHOT_DIRECTORY)
+
+# Whether every file built from the card database is on disk (and readable), if one is missing they are all rebuilt
+def derived_files_exist():
+    return (
+        os.path.exists(CARD_DATABASE_PATH)
+        and card_snapshot.open_snapshot(card_repository.SNAPSHOT_PATH) is not None
+        and all(os.path.exists(os.path.join(card_snapshot.SNAPSHOT_DIRECTORY, file_name)) for file_name in [ADJACENCY_FILE_NAME, ADJACENCY_IDS_FILE_NAME])
+    )
+
+# Saves the date of the last update, and what was downloaded
+def save_last_update(database_version, etag):
+    with open("global/json/last_update.json", "w") as f:
+        json.dump({
+            "last_update": get_current_date(),
+            "database_version": database_version,
+            "etag": etag,
+        }, f)
+
+    # The footers read the date through the repository, so it has to read the file again
+    card_repository.get_repository().forget("last_update.json")
 
-    # Try to access Konami's card database API
+# Gets the version of the card database the API is currently serving
+async def retrieve_database_version(url: str = DATABASE_VERSION_URL):
     try:
         async with aiohttp.ClientSession() as session:
             async with session.get(url) as response:
+                if response.status != 200:
+                    return None
+                version_info = await response.json()
+        return str(version_info[0]["database_version"])
+
+    # Without a version, the update falls back to a full download
+    except Exception as e:
+        print(f"Error checking the card database version: {e}")
+        return None
+
+# Returns the ids of cards that were added, changed or removed compared to the repository's databases
+def diff_card_databases(repository, derived_databases):
+    # Compare against the last compact database only, falling back to the full download would report every card as changed
+    old_cards = {card["id"]: card for card in (repository.load("card_database.json") or {"data": []})["data"]}
+    new_cards = {card["id"]: card for card in derived_databases["card_database.json"]["data"]}
+
+    # Set codes are stored by name
+    old_set_codes = {card["name"]: set(card["set_code"]) for card in repository.card_names_and_set_codes()}
+    new_set_codes = {card["name"]: set(card["set_code"]) for card in derived_databases["card_names_and_set_codes_database.json"]}
+
+    added = [card_id for card_id in new_cards if card_id not in old_cards]
+    removed = [card_id for card_id in old_cards if card_id not in new_cards]
+    changed = [
+        card_id for card_id, card in new_cards.items()
+        if card_id in old_cards and (card != old_cards[card_id] or new_set_codes.get(card["name"]) != old_set_codes.get(card["name"]))
+    ]
+
+    return added, changed, removed
+
+# Streams the full card database from Konami's API straight to disk
+async def retrieve_full_database(message, url: str = CARD_DATABASE_URL, file_path: str = FULL_DATABASE_PATH, etag: str = None):
+    # Download to a temporary file so a failed download never replaces the last good database
+    temporary_file_path = f"{file_path}.download"
+
+    # Ask for a compressed response, aiohttp decompresses each chunk as it arrives
+    headers = {"Accept-Encoding": "gzip"}
+
+    # Let the server skip the download if the file hasn't changed since the last one
+    if etag and os.path.exists(file_path):
+        headers["If-None-Match"] = etag
+
+    # Try to access Konami's card database API
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url, headers=headers) as response:
+                if response.status == 304:
+                    return DOWNLOAD_NOT_MODIFIED, etag
+
                 # Check if the response was successful
                 if response.status != 200:
                     await message.edit(content=f"Failed to fetch data. Status code: {response.status}")
-                    return
-                data = await response.json()
+                    return DOWNLOAD_FAILED, etag
 
-        # Save the data to a JSON file
-        with open("global/json/full_database.json", "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+                # Write the body to disk in chunks instead of holding the whole response in memory
+                with open(temporary_file_path, "wb") as f:
+                    async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+
+        # Swap in the new download
+        os.replace(temporary_file_path, file_path)
 
         await message.edit(content="Card database successfully saved.")
+        return DOWNLOADED, response.headers.get("ETag")
 
     # Error Handling
     except aiohttp.ClientError as e:
@@ -67,175 +206,243 @@ async def retrieve_full_database(message):
         await message.edit(content=f"Error decoding JSON: {e}")
     except Exception as e:
         await message.edit(content=f"An unexpected error occurred: {e}")
-
-# Formats the monster_database.json file
-def format_monsters():
-    # Get the latest database of cards
-    with open('global/json/full_database.json', 'r', encoding="utf-8") as file:
-        full_database = json.load(file)
-
+    return DOWNLOAD_FAILED, etag
+
+# Reads the cards out of a downloaded card database one at a time, without loading the whole file
+def iter_full_database_cards(file_path: str = FULL_DATABASE_PATH):
+    decoder = json.JSONDecoder()
+
+    with open(file_path, 'r', encoding="utf-8") as file:
+        buffer = ""
+
+        # Reads the next chunk of the file into the buffer, returns False at the end of the file
+        def read_chunk():
+            nonlocal buffer
+            chunk = file.read(DOWNLOAD_CHUNK_SIZE)
+            buffer += chunk
+            return chunk != ""
+
+        # Skip ahead to the start of the "data" array
+        while re.search(r'"data"\s*:\s*\[', buffer) is None:
+            if not read_chunk():
+                raise json.JSONDecodeError("Card database has no \"data\" list", buffer, 0)
+        position = re.search(r'"data"\s*:\s*\[', buffer).end()
+
+        while True:
+            # Skip the separators between cards
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+
+            # Need more of the file to see what comes next
+            if position == len(buffer):
+                buffer = ""
+                position = 0
+                if not read_chunk():
+                    raise json.JSONDecodeError("Card database ended early", buffer, 0)
+                continue
+
+            # End of the "data" array
+            if buffer[position] == "]":
+                return
+
+            # Decode the next card, reading more of the file if it was cut off by the end of the buffer
+            try:
+                card, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                buffer = buffer[position:]
+                position = 0
+                if not read_chunk():
+                    raise
+                continue
+
+            yield card
+
+# Builds every database derived from the full card list in a single pass, the cards can be streamed in
+def build_derived_databases(cards):
+    all_cards = []
     all_monsters = []
     main_monsters = []
-    
+    all_names = []
+    names_and_set_codes = []
+    card_id_aliases = {}
+
     # Seventh Tachyon numbers
     xyz_numbers = ['101', '102', '103', '104', '105', '106', '107']
     seventh_tachyon_targets = []
 
-    # Filter to just monsters and specific fields
-    for card in full_database["data"]:
+    for card in cards:
+        # Every card name, for autocompletion
+        all_names.append(card["name"])
+
+        # Every card name with its set codes, duplicates removed
+        set_codes = list({set_info["set_code"] for set_info in card.get("card_sets", [])})
+        names_and_set_codes.append({
+            "name": card["name"],
+            "set_code": set_codes
+        })
+
+        # Every card, only keeping the fields the bot uses
+        card_data = {
+            "id": card["id"],
+            "name": card["name"],
+            "type": card["type"],
+            "race": card.get("race"),
+            "level": card.get("level"),
+            "atk": card.get("atk"),
+            "def": card.get("def"),
+            "attribute": card.get("attribute")
+        }
+        all_cards.append(card_data)
+
+        # Alternate art ids point back to the original card id
+        for card_image in card.get("card_images", []):
+            if card_image["id"] != card["id"]:
+                card_id_aliases[card_image["id"]] = card["id"]
+
         # If its a monster, store its data
         if "Monster" in card["type"]:
-            monster_data = {
-                "id": card["id"],
-                "name": card["name"],
-                "type": card["type"],
-                "race": card["race"],
-                "level": card["level"],
-                "atk": card.get("atk"),
-                "def": card.get("def"),
-                "attribute": card.get("attribute")
-            }
+            monster_data = card_data
             # Add it to the list of all monsters
             all_monsters.append(monster_data)
 
             # If its not an extra deck monster, add it to the list of main deck monsters
             if all(x not in card["type"] for x in ["Fusion", "XYZ", "Link", "Synchro"]):
                 main_monsters.append(monster_data)
-            
-            for number in xyz_numbers:
-                if number in card["name"] and "XYZ" in card["type"]:
-                    seventh_tachyon_targets.append(monster_data)
-    
-    # Get it back into json format
-    all_monsters = {"data": all_monsters}
-    main_monsters = {"data": main_monsters}
-    seventh_tachyon_targets = {"data": seventh_tachyon_targets}
-
-    # Store all monster data
-    with open('global/json/all_monster_database.json', 'w', encoding="utf-8") as file:
-        json.dump(all_monsters, file, indent=4, ensure_ascii=False)
 
-    # Store main deck monster data
-    with open('global/json/main_monster_database.json', 'w', encoding="utf-8") as file:
-        json.dump(main_monsters, file, indent=4, ensure_ascii=False)
-
-    # Store Seventh Tachyon data
-    with open('global/json/seventh_tachyon_targets.json', 'w', encoding="utf-8") as file:
-        json.dump(seventh_tachyon_targets, file, indent=4, ensure_ascii=False)
-
-# Converts a ydk clipboard deck to an array of ids
+            # If its one of the Number 101-107 XYZ monsters, add it to the Seventh Tachyon targets
+            if "XYZ" in card["type"] and any(number in card["name"] for number in xyz_numbers):
+                seventh_tachyon_targets.append(monster_data)
+
+    # File name -> contents
+    return {
+        "card_database.json": {"data": all_cards},
+        "all_monster_database.json": {"data": all_monsters},
+        "main_monster_database.json": {"data": main_monsters},
+        "seventh_tachyon_targets.json": {"data": seventh_tachyon_targets},
+        "card_names_database.json": all_names,
+        "card_names_and_set_codes_database.json": names_and_set_codes,
+        "card_id_aliases.json": card_id_aliases,
+    }
+
+# Writes the derived databases without indentation, they are only ever read by the bot
+def write_derived_databases(derived_databases):
+    for file_name, data in derived_databases.items():
+        # Write to a temporary file first, so a crash mid write never leaves a truncated database behind
+        file_path = f"global/json/{file_name}"
+        temporary_file_path = f"{file_path}.tmp"
+        with open(temporary_file_path, 'w', encoding="utf-8") as file:
+            json.dump(data, file, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temporary_file_path, file_path)
+
+# Records how long a stage of the update took, and returns the start time of the next stage
+def record_stage_time(stage_timings, stage_name, stage_start):
+    elapsed = time.perf_counter() - stage_start
+    stage_timings.append(f"{stage_name}: **{elapsed:.2f}s**")
+    print(f"/update - {stage_name}: {elapsed:.2f}s")
+    return time.perf_counter()
+
+# Converts a ydk clipboard deck to an array of ids, each card is only listed once
 def convert_ydk_clipboard_to_id(decklist, array_of_ids):
-    filter = decklist.strip().split()
-    for line in filter:
-        if line and line[0].isdigit() and int(line) not in array_of_ids:
-            array_of_ids.append(int(line))
+    deck = decklist if isinstance(decklist, ydk_parser.Deck) else ydk_parser.parse_deck(decklist)
+    seen_ids = set(array_of_ids)
+    for card_id in deck.unique_ids():
+        if card_id not in seen_ids:
+            seen_ids.add(card_id)
+            array_of_ids.append(card_id)
     return
 
-# Converts a ygopro clipboard deck to an array of ids
+# Converts a ygopro clipboard deck (ydke:// link) to an array of ids, each card is only listed once
 def convert_ygo_pro_clipboard_to_id(decklist, array_of_ids):
-    filter = decklist.strip().split()
-    for line in filter:
-        if line and line[0].isdigit() and int(line) not in array_of_ids:
-            array_of_ids.append(int(line))
+    convert_ydk_clipboard_to_id(decklist, array_of_ids)
     return
 
 # Converts an array of card ids to an array of correlated card json objects that are only monsters
-def assign_monster_card_by_id(array_of_ids, array_of_cards, database):
+def assign_monster_card_by_id(array_of_ids, array_of_cards, card_index):
     # For every id in the array
     for id in array_of_ids:
-        # Iterate through the database
-        for card in database["data"]:
-            # If there is a match
-            if card["id"] == id:
-                # Check if it's a monster, otherwise break from the loop
-                if "Monster" in card["type"]:
-                    array_of_cards.append(
-                        {
-                            "id": card["id"],
-                            "name": card["name"],
-                            "type": card["type"],
-                            "race": card["race"],
-                            "level": card.get("level"),
-                            "atk": card.get("atk"),
-                            "def": card.get("def"),
-                            "attribute": card.get("attribute")
-                        }
-                    )
-                break
+        # Look up the card, skipping ids that don't exist
+        card = card_index.get(id)
+        # Check if it's a monster
+        if card and "Monster" in card["type"]:
+            array_of_cards.append(
+                {
+                    "id": card["id"],
+                    "name": card["name"],
+                    "type": card["type"],
+                    "race": card["race"],
+                    "level": card.get("level"),
+                    "atk": card.get("atk"),
+                    "def": card.get("def"),
+                    "attribute": card.get("attribute")
+                }
+            )
     return
 
 # Converts an array of card ids to an array of correlated card json objects that are only main deck monsters
-def assign_main_deck_monsters_by_id(array_of_ids, array_of_cards, database):
+def assign_main_deck_monsters_by_id(array_of_ids, array_of_cards, card_index):
     # For every id in the array
     for id in array_of_ids:
-        # Iterate through the database
-        for card in database["data"]:
-            # If there is a match
-            if card["id"] == id:
-                # Check if it's a monster, otherwise break from the loop
-                if all(x not in card["type"] for x in ["Fusion", "XYZ", "Link", "Synchro"]) and "Monster" in card["type"]:
-                    array_of_cards.append(
-                        {
-                            "id": card["id"],
-                            "name": card["name"],
-                            "type": card["type"],
-                            "race": card["race"],
-                            "level": card.get("level"),
-                            "atk": card.get("atk"),
-                            "def": card.get("def"),
-                            "attribute": card.get("attribute")
-                        }
-                    )
-                break
+        # Look up the card, skipping ids that don't exist
+        card = card_index.get(id)
+        # Check if it's a main deck monster
+        if card and all(x not in card["type"] for x in ["Fusion", "XYZ", "Link", "Synchro"]) and "Monster" in card["type"]:
+            array_of_cards.append(
+                {
+                    "id": card["id"],
+                    "name": card["name"],
+                    "type": card["type"],
+                    "race": card["race"],
+                    "level": card.get("level"),
+                    "atk": card.get("atk"),
+                    "def": card.get("def"),
+                    "attribute": card.get("attribute")
+                }
+            )
     return
 
 # Converts an array of card ids to an array of correlated card json objects
-def assign_cards_by_id(array_of_ids, array_of_cards, database):
+def assign_cards_by_id(array_of_ids, array_of_cards, card_index):
     # For every id in the array
     for id in array_of_ids:
-        # Iterate through the database
-        for card in database["data"]:
-            # If there is a match
-            if card["id"] == id:
-                array_of_cards.append(
-                    {
-                        "id": card["id"],
-                        "name": card["name"],
-                    }
-                )
-                break
+        # Look up the card, skipping ids that don't exist
+        card = card_index.get(id)
+        if card:
+            array_of_cards.append(
+                {
+                    "id": card["id"],
+                    "name": card["name"],
+                }
+            )
     return
 
-# Converts an array of card ids to an array of correlated card json objects
-def assign_single_card_by_id(card_id, database):
-    # Iterate through the database
-    for card in database["data"]:
-        for card_image in card["card_images"]:
-            # If there is a match
-            if card_image["id"] == card_id:
-                return card["name"]
+# Converts a card id (or alternate art id) to its card name
+def assign_single_card_by_id(card_id, card_index):
+    card = card_index.get(card_id)
+    if card:
+        return card["name"]
     return
 
-# Converts an array of card names to an array of correlated card json objects
-def assign_cards_by_name(array_of_names, array_of_cards, database):
-    # For every id in the array
+# Converts an array of card names (partial or misspelled names work too) to an array of correlated card json objects
+def assign_cards_by_name(array_of_names, array_of_cards, cards_by_name, name_resolver):
+    # For every name in the array
     for name in array_of_names:
-        # Iterate through the database
-        for card in database["data"]:
-            # If there is a match
-            if name.lower().strip() in card["name"].lower().strip():
-                array_of_cards.append(
-                    {
-                        "id": card["id"],
-                        "name": card["name"],
-                        "type": card["type"],
-                        "race": card["race"],
-                        "level": card.get("level"),
-                        "atk": card.get("atk"),
-                        "attribute": card.get("attribute")
-                    }
-                )
-                break
+        # Find the closest real card name
+        resolved_name = name_resolver.resolve(name)
+        # If there is a match
+        if resolved_name is not None:
+            card = cards_by_name[resolved_name]
+            array_of_cards.append(
+                {
+                    "id": card["id"],
+                    "name": card["name"],
+                    "type": card["type"],
+                    "race": card["race"],
+                    "level": card.get("level"),
+                    "atk": card.get("atk"),
+                    "def": card.get("def"),
+                    "attribute": card.get("attribute")
+                }
+            )
     return
 
 def smart_capitalize(s):
@@ -255,68 +462,30 @@ def smart_capitalize(s):
     ).strip()
 
 
-# Formats the monster_database.json file
-def format_names():
-    # Get the latest database of cards
-    with open('global/json/full_database.json', 'r', encoding="utf-8") as file:
-        full_database = json.load(file)
-
-    all_names = []
-
-    # Filter to just monsters and specific fields
-    for card in full_database["data"]:
-        all_names.append(card["name"])
-
-    # Store all monster data
-    with open('global/json/card_names_database.json', 'w', encoding="utf-8") as file:
-        json.dump(all_names, file, indent=4, ensure_ascii=False)
-
-# Formats the monster_database.json file
-def format_names_and_set_codes():
-    # Get the latest database of cards
-    with open('global/json/full_database.json', 'r', encoding="utf-8") as file:
-        full_database = json.load(file)
-
-    card_data = []
-
-    # Filter to just monsters and specific fields
-    for card in full_database["data"]:
-        # Get the set codes
-        set_codes = []
-        if "card_sets" in card:
-            set_codes = [set_info["set_code"] for set_info in card["card_sets"]]
-
-        # Remove duplicates by converting the list to a set and back to a list
-        set_codes = list(set(set_codes))
-
-        card_data.append({
-            "name": card["name"],
-            "set_code": set_codes
-        })
-
-    # Store all monster data
-    with open('global/json/card_names_and_set_codes_database.json', 'w', encoding="utf-8") as file:
-        json.dump(card_data, file, indent=4, ensure_ascii=False)
-
 def card_name_autocomplete(current_input: str):
-    with open('global/json/card_names_database.json', 'r', encoding="utf-8") as file:
-        card_names_database = json.load(file)
+    card_name_index = card_repository.get_repository().card_name_autocomplete_index()
+    return autocomplete_choices(card_name_index, current_input)
+
+# Converts the best matches from an autocomplete index into Discord choices
+def autocomplete_choices(autocomplete_index, current_input: str):
     return [
         discord.app_commands.Choice(name=name, value=name)
-        for name in card_names_database
-        if current_input.lower() in name.lower()
-    ][:25]
+        for name in autocomplete_index.search(current_input)
+    ]
 
 def card_set_code_autocomplete(card_name: str, current_input: str):
-    with open('global/json/card_names_and_set_codes_database.json', 'r', encoding="utf-8") as file:
-        card_data_list = json.load(file)
+    repository = card_repository.get_repository()
+
+    # Without a card name, search every set code
+    if not card_name:
+        return autocomplete_choices(repository.set_code_autocomplete_index(), current_input)
 
-    set_codes = []
-    for card in card_data_list:
-        if card["name"].lower() == card_name.lower():
-            if "set_code" in card:
-                set_codes = card["set_code"]
-            break
+    # Exact names are a single lookup, partial names are resolved first
+    set_codes_by_name = repository.set_codes_by_name()
+    set_codes = set_codes_by_name.get(card_name.casefold())
+    if set_codes is None:
+        resolved_card_name = resolve_card_name(card_name)
+        set_codes = set_codes_by_name.get(resolved_card_name.casefold(), []) if resolved_card_name else []
 
     return [
         discord.app_commands.Choice(name=code, value=code)
@@ -324,17 +493,17 @@ def card_set_code_autocomplete(card_name: str, current_input: str):
         if current_input.lower() in code.lower()
     ][:25]
 
+# Returns the card printed under a set code, None if the set code doesn't exist
+def card_name_from_set_code(set_code: str):
+    return card_repository.get_repository().card_name_by_set_code().get(set_code.strip().upper())
 
-def check_valid_card_name(card_name):
-    # Open the list of card names
-    with open('global/json/card_names_database.json', 'r', encoding="utf-8") as file:
-        card_names_database = json.load(file)
 
-    # Check if the name is correct before proceeding
-    for name in card_names_database:
-        if card_name.lower() in name.lower():
-            return True
-    return False
+# Resolves a partial or misspelled card name to the closest real card name, None if nothing is close
+def resolve_card_name(card_name):
+    return card_repository.get_repository().card_name_resolver().resolve(card_name)
+
+def check_valid_card_name(card_name):
+    return resolve_card_name(card_name) is not None
 
 async def format_two_decklist_inputs(interaction: discord.Interaction,
                                 opponents_clipboard_ydk: str = None,
@@ -353,17 +522,15 @@ async def format_two_decklist_inputs(interaction: discord.Interaction,
         await interaction.followup.send("❌ You must provide either a `copied ydk` or a `.ydk file` for `your decklist`.")
         return None, None
     
-    # Default to copied input
-    opponents_decklist = opponents_clipboard_ydk
-    your_decklist = your_clipboard_ydk
-
-    # Read uploaded files (if any)
-    if opponents_ydk_file is not None:
-        opponents_decklist = (await opponents_ydk_file.read()).decode("utf-8")
-    if your_ydk_file is not None:
-        your_decklist = (await your_ydk_file.read()).decode("utf-8")
-    
-    return opponents_decklist, your_decklist
+    # Read and parse each decklist
+    opponents_deck = await read_deck(interaction, "opponent's decklist", opponents_clipboard_ydk, opponents_ydk_file)
+    if opponents_deck is None:
+        return None, None
+    your_deck = await read_deck(interaction, "your decklist", your_clipboard_ydk, your_ydk_file)
+    if your_deck is None:
+        return None, None
+
+    return opponents_deck, your_deck
 
 async def format_one_decklist_input(interaction: discord.Interaction,
                                 decklist_clipboard_ydk: str = None,
@@ -373,14 +540,21 @@ async def format_one_decklist_input(interaction: discord.Interaction,
         await interaction.followup.send("❌ You must provide either a `copied ydk` or a `.ydk file`.")
         return None
     
-    # Default to copied input
-    decklist = decklist_clipboard_ydk
+    return await read_deck(interaction, "decklist", decklist_clipboard_ydk, decklist_ydk_file)
 
-    # Read uploaded files (if any)
-    if decklist_ydk_file is not None:
-        decklist = (await decklist_ydk_file.read()).decode("utf-8")
-
-    return decklist
+# Reads a decklist from the copied input or the uploaded file and parses it, sends a message and returns None if it isn't valid
+async def read_deck(interaction: discord.Interaction, deck_description: str, clipboard_ydk: str = None, ydk_file: discord.Attachment = None):
+    try:
+        # Default to copied input, uploaded files take priority
+        decklist = clipboard_ydk
+        if ydk_file is not None:
+            decklist = (await ydk_file.read()).decode("utf-8")
+        return ydk_parser.parse_deck(decklist)
+    except UnicodeDecodeError:
+        await interaction.followup.send(f"❌ The `.ydk file` for {deck_description} is not a text file.")
+    except ValueError as e:
+        await interaction.followup.send(f"❌ Could not read {deck_description}: {e}")
+    return None
 
 # Replace non-alphanumeric characters (except spaces) with a space
 def sanitize_card_name(card_name: str):
@@ -15,6 +15,7 @@ class HelpPaginationView(discord.ui.View):
             {"command": "/feedback", "description": "Send the creator of Duelkit a message!", "url": "https://github.com/balboni65/Duelkit/tree/main?tab=readme-ov-file#feedback"},
             {"command": "/masterpack", "description": "Posts the links to view and open Master Packs", "url": "https://github.com/balboni65/Duelkit/tree/main?tab=readme-ov-file#masterpack"},
             {"command": "/metaltronus_decklist", "description": "Lists all the Metaltronus targets your deck has against another deck", "url": "https://github.com/balboni65/Duelkit/tree/main?tab=readme-ov-file#metaltronus_decklist"},
+            {"command": "/metaltronus_gauntlet", "description": "Tests your deck's Metaltronus targets against every topping decklist", "url": "https://github.com/balboni65/Duelkit/tree/main?tab=readme-ov-file#metaltronus_gauntlet"},
             {"command": "/metaltronus_single", "description": "Lists all the Metaltronus targets in the game for a specific card", "url": "https://github.com/balboni65/Duelkit/tree/main?tab=readme-ov-file#metaltronus_single"},
             {"command": "/report", "description": "Report a game's result", "url": "https://github.com/balboni65/Duelkit/tree/main?tab=readme-ov-file#report"},
             {"command": "/roundrobin", "description": "Creates a 3-8 player Round Robin tournament, enter names with spaces in between", "url": "https://github.com/balboni65/Duelkit/tree/main?tab=readme-ov-file#roundrobin"},
@@ -24,13 +25,17 @@ class HelpPaginationView(discord.ui.View):
             {"command": "/seventh_tachyon_decklist", "description": "Lists all the Metaltronus targets your deck has against another deck", "url": "https://github.com/balboni65/Duelkit/tree/main?tab=readme-ov-file#seventh_tachyon_decklist"},
             {"command": "/small_world", "description": "Find all the valid Small World bridges between 2 cards", "url": "https://github.com/balboni65/Duelkit/tree/main?tab=readme-ov-file#small_world"},
             {"command": "/small_world_decklist", "description": "Find all the valid Small World bridges within a decklist", "url": "https://github.com/balboni65/Duelkit/tree/main?tab=readme-ov-file#small_world_decklist"},
+            {"command": "/small_world_optimize", "description": "Find the best Small World bridges for a decklist and a target", "url": "https://github.com/balboni65/Duelkit/tree/main?tab=readme-ov-file#small_world_optimize"},
+            {"command": "/small_world_path", "description": "Find the shortest chain of Small World activations between 2 cards", "url": "https://github.com/balboni65/Duelkit/tree/main?tab=readme-ov-file#small_world_path"},
             {"command": "/spin", "description": "Spin 5 random Secret Packs!", "url": "https://github.com/balboni65/Duelkit/tree/main?tab=readme-ov-file#spin"},
             {"command": "/standings", "description": "See current season standings", "url": "https://github.com/balboni65/Duelkit/tree/main?tab=readme-ov-file#standings"},
             {"command": "/top_archetype_breakdown", "description": "View a card-by-card breakdown of a top archetype for the current format", "url": "https://github.com/balboni65/Duelkit/tree/main?tab=readme-ov-file#top_archetype_breakdown"},
             {"command": "/top_archetypes", "description": "View the top archetypes for the current format and their deck variants", "url": "https://github.com/balboni65/Duelkit/tree/main?tab=readme-ov-file#top_archetypes"},
             {"command": "/top_cards", "description": "View a card's usage across all topping archetypes", "url": "https://github.com/balboni65/Duelkit/tree/main?tab=readme-ov-file#top_cards"},
             {"command": "/tournamentinfo", "description": "Find out what record is needed to receive an Invite or make Top Cut", "url": "https://github.com/balboni65/Duelkit/tree/main?tab=readme-ov-file#tournamentinfo"},
-            {"command": "/update", "description": "Updates all the databases found within the bot (takes a while to run)", "url": "https://github.com/balboni65/Duelkit/tree/main?tab=readme-ov-file#update"}
+            {"command": "/update", "description": "Updates all the databases found within the bot (takes a while to run)", "url": "https://github.com/balboni65/Duelkit/tree/main?tab=readme-ov-file#update"},
+            {"command": "/update_cancel", "description": "Cancels the decklist scraping started by /update, keeping the current decklists", "url": "https://github.com/balboni65/Duelkit/tree/main?tab=readme-ov-file#update_cancel"},
+            {"command": "/update_status", "description": "Shows the progress of the decklist scraping started by /update", "url": "https://github.com/balboni65/Duelkit/tree/main?tab=readme-ov-file#update_status"}
         ]
 
         # Set the max number of pages based on the number of commands above
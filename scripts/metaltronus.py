@@ -1,137 +1,159 @@
-import json
 import scripts.formatter as formatter
+from scripts import card_repository, ydk_parser, stat_matcher
+from scripts.monster_columns import MonsterColumns
+import numpy as np
 import os
-import discord
 
 # Creates a list of all the current Metaltronus targets
 def metaltronus_single(guild_id_as_int, input: str):    
-    # Get the latest database of cards
-    with open('global/json/all_monster_database.json', 'r', encoding="utf-8") as file:
-        metaltronus_database = json.load(file)
-
-    chosen_card = {}
-    matching_characteristics = 0
-    metaltronus_targets = []
-
-    # Filter to just monsters and specific fields
-    for card in metaltronus_database["data"]:
-        if input.lower().strip() in card.get("name", "").lower().strip():
-            chosen_card = {
-                "name": card["name"],
-                "race": card["race"],
-                "attribute": card.get("attribute"),
-                "atk": card.get("atk"),
-            }
-            break  # Exit the loop after the first match
+    # Get the latest monster columns
+    repository = card_repository.get_repository()
+    columns = repository.all_monster_columns()
+    file_path = f"guilds/{guild_id_as_int}/docs/metaltronus_single.txt"
+
+    # Remove the last result, so a failed search never sends an old file
+    if os.path.exists(file_path):
+        os.remove(file_path)
+
+    # Find the closest monster name (partial or misspelled names work too)
+    monster_name = repository.all_monster_name_resolver().resolve(input)
 
     # Exits if the card search could not be validated
-    if chosen_card == {}:
+    if monster_name is None or monster_name not in columns.position_by_name:
         return "I could not validate the card you're searching for"
 
-    # Find any matching cards
-    for card in metaltronus_database["data"]:
-        if chosen_card["race"].lower().strip() in card.get("race", "").lower().strip():
-            matching_characteristics += 1
-        if chosen_card["attribute"].lower().strip() in card.get("attribute", "").lower().strip():
-            matching_characteristics += 1
-        if chosen_card["atk"] == card.get("atk"):
-            matching_characteristics += 1
-        if matching_characteristics >= 2:
-            if chosen_card["name"].lower().strip() != card.get("name", "").lower().strip():
-                metaltronus_targets.append(card["name"])
-        matching_characteristics = 0
+    # Every monster sharing at least 2 of Type, Attribute and ATK
+    target_positions = repository.all_monster_matcher().targets(stat_matcher.METALTRONUS, columns.position_by_name[monster_name])
+    metaltronus_targets = [columns.names[position] for position in target_positions]
 
     # Creates the file path if it doesn't exist
     os.makedirs(f"guilds/{guild_id_as_int}/docs", exist_ok=True)
 
     # Create the file with the results
-    with open(f"guilds/{guild_id_as_int}/docs/metaltronus_single.txt", "w", encoding="utf-8") as file:
-        file.write(f"Metaltronus Targets for {formatter.smart_capitalize(chosen_card['name'])}:\n")
+    with open(file_path, "w", encoding="utf-8") as file:
+        file.write(f"Metaltronus Targets for {formatter.smart_capitalize(monster_name)}:\n")
         for card in metaltronus_targets:
             file.write(f"\t-{card}\n")
     
-    return f"Here are all your matches for:\n**{formatter.smart_capitalize(chosen_card['name'])}**"
+    return f"Here are all your matches for:\n**{formatter.smart_capitalize(monster_name)}**"
 
 # Creates a list of all the Metaltronus targets between 2 given decklists
-def metaltronus_decklist(guild_id_as_int, opponents_decklist: str, your_decklist: str):    
-    # Get the latest database of cards
-    with open('global/json/all_monster_database.json', 'r', encoding="utf-8") as file:
-        metaltronus_database = json.load(file)
-        
+def metaltronus_decklist(guild_id_as_int, opponents_decklist: ydk_parser.Deck, your_decklist: ydk_parser.Deck):    
+    # Get the card id index and monster columns
+    repository = card_repository.get_repository()
+    card_index = repository.card_database_index()
+    columns = repository.all_monster_columns()
+
     array_of_opponents_ids = []
     array_of_your_ids = []
     opponents_cards = []
     your_cards = []
-    metaltronus_final_results = []
 
-    # Convert ydk clipboard deck to array of ids
+    # Convert the parsed decks to arrays of ids
     formatter.convert_ydk_clipboard_to_id(opponents_decklist, array_of_opponents_ids)
     formatter.convert_ydk_clipboard_to_id(your_decklist, array_of_your_ids)
 
-    # Convert arrays of IDs to array of JSON card details
-    formatter.assign_monster_card_by_id(array_of_opponents_ids, opponents_cards, metaltronus_database)
-    formatter.assign_monster_card_by_id(array_of_your_ids, your_cards, metaltronus_database)
-    # Computes all targets into metaltronus_final_results
-    metaltronus_list_from_two_decklists(opponents_cards, your_cards, metaltronus_final_results)
+    # Convert arrays of IDs to array of JSON card details, then to their positions in the columns
+    formatter.assign_monster_card_by_id(array_of_opponents_ids, opponents_cards, card_index)
+    formatter.assign_monster_card_by_id(array_of_your_ids, your_cards, card_index)
+    opponents_positions = columns.positions_of_ids(card["id"] for card in opponents_cards)
+    your_positions = columns.positions_of_ids(card["id"] for card in your_cards)
+
+    # Computes all targets at once, then the report
+    matches = repository.all_monster_matcher().match_matrix(stat_matcher.METALTRONUS, opponents_positions, your_positions)
+    report = metaltronus_report(columns, opponents_positions, your_positions, matches)
     
     # Creates the file path if it doesn't exist
     os.makedirs(f"guilds/{guild_id_as_int}/docs", exist_ok=True)
 
     # Writes the findings to a file
     with open(f"guilds/{guild_id_as_int}/docs/metaltronus_deck_compare.txt", "w", encoding="utf-8") as file:
-        for card in metaltronus_final_results:
-            file.write(f"{card}")
+        file.write(report)
     return "Here's all the valid targets I was able to find for those 2 decklists"
 
-# Creates a list of all the valid Metaltronus targets for two given arrays of cards
-def metaltronus_list_from_two_decklists(cards_to_search, cards_as_targets, metaltronus_final_results):
-    matching_characteristics = 0
-    current_card_results = "Targets for: "
-    no_card_results = "There are unfortunately no targets for:\n"
-
-    # For every card in the first decklist
-    for searched_card in cards_to_search:
-        # Add the card name to results
-        current_card_results += f"{searched_card['name']}\n"
-        # Compare to every monster in the second decklist
-        for target_card in cards_as_targets:
-            # Compare properties
-            if target_card["race"].lower().strip() in searched_card.get("race", "").lower().strip():
-                matching_characteristics += 1
-            if target_card["attribute"].lower().strip() in searched_card.get("attribute", "").lower().strip():
-                matching_characteristics += 1
-            if target_card["atk"] == searched_card.get("atk"):
-                matching_characteristics += 1
-            # If a valid Metaltronus target
-            if matching_characteristics >= 2:
-                # If they aren't the same name
-                if target_card["name"].lower().strip() != searched_card.get("name", "").lower().strip():
-                    # Add the card to the list of valid targets for the target card
-                    current_card_results += f"\t-{target_card['name']}\n"
-            # Reset the matching characteristics
-            matching_characteristics = 0
-
-        # After searching through every card in the second decklist, check if you did not find any targets
-        if current_card_results == f"Targets for: {searched_card['name']}\n":
-            # Add to no results found section
-            no_card_results += f"\t-{searched_card['name']}\n"
-        else:
-            # Add to valid targets list
-            current_card_results += "\n"
-            metaltronus_final_results.append(current_card_results)
-        # Reset current card text
-        current_card_results = "Targets for: "
-    
-    # After searching all cards in the first decklist, append the cards we didn't find
-    metaltronus_final_results.append(no_card_results)
-    return
+# Writes the targets of every searched monster, monsters without targets are listed at the end
+def metaltronus_report(columns: MonsterColumns, searched_positions, target_positions, matches):
+    lines = []
+    no_card_results = ["There are unfortunately no targets for:\n"]
+
+    for searched_position, row in zip(searched_positions, matches):
+        targets = np.flatnonzero(row)
+        if not len(targets):
+            no_card_results.append(f"\t-{columns.names[searched_position]}\n")
+            continue
+        lines.append(f"Targets for: {columns.names[searched_position]}\n")
+        lines.extend(f"\t-{columns.names[target_positions[target]]}\n" for target in targets)
+        lines.append("\n")
+
+    return "".join(lines + no_card_results)
+
+# Runs a decklist's Metaltronus targets against every topping decklist at once
+def metaltronus_gauntlet(guild_id_as_int, your_decklist: ydk_parser.Deck):
+    repository = card_repository.get_repository()
+    card_index = repository.card_database_index()
+    columns = repository.all_monster_columns()
+    topping_decklists = repository.topping_decklists()
+
+    # Metaltronus summons from your Main Deck
+    your_cards = []
+    formatter.assign_monster_card_by_id(your_decklist.unique_ids(("main",)), your_cards, card_index)
+    your_positions = list(dict.fromkeys(columns.positions_of_ids(card["id"] for card in your_cards)))
+    if not your_positions:
+        return "Could not find any Main Deck monsters in your decklist"
+
+    # Every monster the topping decks can put on the field (Main and Extra Deck) -> copies per archetype
+    copies_by_archetype = {}
+    decks_by_archetype = {}
+    for archetype, archetype_data in topping_decklists.items():
+        copies = {}
+        for deck_info in archetype_data.get("decks", {}).values():
+            deck_list = deck_info.get("deck_list", {})
+            for card_name in deck_list.get("main_deck", []) + deck_list.get("extra_deck", []):
+                if card_name in columns.position_by_name:
+                    position = columns.position_by_name[card_name]
+                    copies[position] = copies.get(position, 0) + 1
+        if copies:
+            copies_by_archetype[archetype] = copies
+            decks_by_archetype[archetype] = len(archetype_data.get("decks", {}))
+
+    if not copies_by_archetype:
+        return "There are no topping decklists yet, try again after the next /update"
+
+    # One matrix for every monster in every topping deck
+    opponents_positions = sorted({position for copies in copies_by_archetype.values() for position in copies})
+    matches = repository.all_monster_matcher().match_matrix(stat_matcher.METALTRONUS, opponents_positions, your_positions)
+    has_target = dict(zip(opponents_positions, matches.any(axis=1).tolist()))
+    row_by_position = {position: row for row, position in enumerate(opponents_positions)}
+
+    # Share of each archetype's monsters (counting every copy) that you have a target for
+    coverage = {
+        archetype: sum(count for position, count in copies.items() if has_target[position]) / sum(copies.values())
+        for archetype, copies in copies_by_archetype.items()
+    }
+    ranked_archetypes = sorted(coverage, key=lambda archetype: (-coverage[archetype], archetype))
+
+    lines = [f"Metaltronus targets in your deck against {sum(decks_by_archetype.values())} topping decks:\n\n"]
+    lines.extend(
+        f"{archetype} ({decks_by_archetype[archetype]} decks): {coverage[archetype]:.0%} of their monsters have a target\n"
+        for archetype in ranked_archetypes
+    )
+
+    # Targets for every monster of every archetype, most played first
+    for archetype in ranked_archetypes:
+        copies = copies_by_archetype[archetype]
+        lines.append(f"\n{archetype}:\n")
+        for position in sorted(copies, key=lambda position: (-copies[position], columns.names[position])):
+            targets = [columns.names[your_positions[target]] for target in np.flatnonzero(matches[row_by_position[position]])]
+            lines.append(f"\t{columns.names[position]}: {', '.join(targets) if targets else 'No targets'}\n")
+
+    # Creates the file path if it doesn't exist
+    os.makedirs(f"guilds/{guild_id_as_int}/docs", exist_ok=True)
+
+    with open(f"guilds/{guild_id_as_int}/docs/metaltronus_gauntlet.txt", "w", encoding="utf-8") as file:
+        file.write("".join(lines))
+
+    return f"Here's how your Metaltronus targets hold up against {len(ranked_archetypes)} topping archetypes:"
 
 def metaltronus_autocomplete(current_input: str):
-    with open('global/json/all_monster_database.json', 'r', encoding="utf-8") as file:
-        metaltronus_database = json.load(file)
-    monster_names = [card['name'] for card in metaltronus_database['data']]
-    return [
-        discord.app_commands.Choice(name=name, value=name)
-        for name in monster_names
-        if current_input.lower() in name.lower()
-    ][:25]
\ No newline at end of file
+    all_monster_index = card_repository.get_repository().all_monster_autocomplete_index()
+    return formatter.autocomplete_choices(all_monster_index, current_input)
\ No newline at end of file
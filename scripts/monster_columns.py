@@ -0,0 +1,115 @@
+import numpy as np
+
+# Stored in place of a missing level, ATK or DEF (ex: Link monsters have no level or DEF)
+MISSING_VALUE = -32768
+
+# Code used for a missing race or attribute, every real value gets its own code after it
+MISSING_CODE = 0
+
+# Bit flags for the words found in a monster's "type"
+TYPE_FLAGS = {
+    "Normal": 1 << 0,
+    "Effect": 1 << 1,
+    "Ritual": 1 << 2,
+    "Fusion": 1 << 3,
+    "Synchro": 1 << 4,
+    "XYZ": 1 << 5,
+    "Link": 1 << 6,
+    "Pendulum": 1 << 7,
+    "Tuner": 1 << 8,
+    "Flip": 1 << 9,
+    "Gemini": 1 << 10,
+    "Spirit": 1 << 11,
+    "Toon": 1 << 12,
+    "Union": 1 << 13,
+    "Monster": 1 << 14,
+}
+EXTRA_DECK_FLAGS = TYPE_FLAGS["Fusion"] | TYPE_FLAGS["Synchro"] | TYPE_FLAGS["XYZ"] | TYPE_FLAGS["Link"]
+
+# The monster stats as NumPy arrays (one entry per monster) so they can be compared all at once
+class MonsterColumns:
+    def __init__(self, monsters):
+        monsters = list(monsters)
+
+        # Race / attribute string -> small integer code
+        self.race_codes = {None: MISSING_CODE}
+        self.attribute_codes = {None: MISSING_CODE}
+
+        # Name table, the position of a monster is the same in every column
+        self.names = [monster["name"] for monster in monsters]
+        self.ids = np.array([monster["id"] for monster in monsters], dtype=np.int64)
+
+        self.race = np.array([self.race_code(monster.get("race")) for monster in monsters], dtype=np.int8)
+        self.attribute = np.array([self.attribute_code(monster.get("attribute")) for monster in monsters], dtype=np.int8)
+        self.level = np.array([encode_stat(monster.get("level")) for monster in monsters], dtype=np.int16)
+        self.atk = np.array([encode_stat(monster.get("atk")) for monster in monsters], dtype=np.int16)
+        self.defense = np.array([encode_stat(monster.get("def")) for monster in monsters], dtype=np.int16)
+        self.type_flags = np.array([encode_type(monster["type"]) for monster in monsters], dtype=np.uint16)
+
+        self.build_lookups()
+
+    # Creates the columns from arrays that were already encoded, ex: read from a card snapshot
+    @classmethod
+    def from_arrays(cls, names, ids, race, attribute, level, atk, defense, type_flags, race_codes, attribute_codes, name_codes=None):
+        columns = cls.__new__(cls)
+        columns.race_codes = dict(race_codes)
+        columns.attribute_codes = dict(attribute_codes)
+        columns.names = names
+        columns.ids = ids
+        columns.race = race
+        columns.attribute = attribute
+        columns.level = level
+        columns.atk = atk
+        columns.defense = defense
+        columns.type_flags = type_flags
+        columns.build_lookups(name_codes)
+        return columns
+
+    # Builds the lookups back into the columns, "name_codes" can be given if they were stored with the columns
+    def build_lookups(self, name_codes=None):
+        self.position_by_id = {card_id: position for position, card_id in enumerate(self.ids.tolist())}
+        self.position_by_name = {}
+        for position, name in enumerate(self.names):
+            self.position_by_name.setdefault(name, position)
+
+        # Monsters with the same name share a code (the first position of that name), so they can be compared all at once
+        if name_codes is None:
+            name_codes = np.array([self.position_by_name[name] for name in self.names], dtype=np.int32)
+        self.name_codes = name_codes
+
+    def __len__(self):
+        return len(self.names)
+
+    # Returns the code for a race, adding it to the table if it's new
+    def race_code(self, race):
+        return self.race_codes.setdefault(race, len(self.race_codes))
+
+    # Returns the code for an attribute, adding it to the table if it's new
+    def attribute_code(self, attribute):
+        return self.attribute_codes.setdefault(attribute, len(self.attribute_codes))
+
+    # True for every monster that goes in the main deck
+    def main_deck_mask(self):
+        return ((self.type_flags & TYPE_FLAGS["Monster"]) != 0) & ((self.type_flags & EXTRA_DECK_FLAGS) == 0)
+
+    # Returns the positions of a list of card ids, skipping ids that aren't in the columns
+    def positions_of_ids(self, card_ids):
+        return [self.position_by_id[card_id] for card_id in card_ids if card_id in self.position_by_id]
+
+    # Total bytes held by the NumPy columns
+    def nbytes(self):
+        return sum(column.nbytes for column in [self.ids, self.race, self.attribute, self.level, self.atk, self.defense, self.type_flags])
+
+# Stores a level / ATK / DEF as an integer, using a placeholder if it's missing
+def encode_stat(value):
+    if value is None:
+        return MISSING_VALUE
+    return value
+
+# Converts a monster's "type" into its bit flags
+def encode_type(card_type: str):
+    flags = 0
+    for word, flag in TYPE_FLAGS.items():
+        if word in card_type:
+            flags |= flag
+    return flags
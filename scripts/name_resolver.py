@@ -0,0 +1,143 @@
+import bisect
+import functools
+import re
+from collections import Counter
+from scripts.autocomplete_index import AutocompleteIndex, WORD_START_MATCH
+
+CACHE_SIZE = 4096                 # Most recent queries kept per resolver
+TYPO_CANDIDATES = 20              # Names sharing the most trigrams with a misspelled query that get an edit distance check
+COMMON_TRIGRAM_POSTINGS = 1000    # Trigrams found in more names than this are skipped when looking for typos
+
+# Resolves what a user typed to a single real name: exact > prefix > word start > every word > substring > closest typo
+class NameResolver:
+    def __init__(self, autocomplete_index: AutocompleteIndex):
+        self.autocomplete_index = autocomplete_index
+
+        # Word -> positions of every name containing it
+        self.words = {}
+        for position, lower_name in enumerate(autocomplete_index.lower_names):
+            for word in set(split_words(lower_name)):
+                self.words.setdefault(word, set()).add(position)
+        self.sorted_words = sorted(self.words)
+
+        # Cache results per resolver, so they are dropped along with the repository on /update
+        self.resolve = functools.lru_cache(maxsize=CACHE_SIZE)(self.resolve_uncached)
+
+    # Returns the best matching name, or None if nothing is close enough
+    def resolve_uncached(self, query: str):
+        query = query.lower().strip()
+        if not query:
+            return None
+
+        # Exact, prefix and word start matches
+        best = self.autocomplete_index.search(query, limit=1)
+        if best and self.autocomplete_index.rank(query, self.autocomplete_index.exact.get(best[0].lower())) <= WORD_START_MATCH:
+            return best[0]
+
+        # Names containing every word of the query, in any order
+        position = self.every_word_match(query)
+        if position is not None:
+            return self.autocomplete_index.names[position]
+
+        # Anywhere in the name
+        if best:
+            return best[0]
+
+        # Misspellings
+        position = self.closest_typo(query)
+        if position is not None:
+            return self.autocomplete_index.names[position]
+        return None
+
+    # Returns the shortest name containing every word of the query, or None
+    def every_word_match(self, query: str):
+        query_words = split_words(query)
+        if len(query_words) < 2:
+            return None
+
+        # Each word can be the start of a longer word (ex: "blue eye" -> "Blue-Eyes")
+        matching_positions = None
+        for query_word in query_words:
+            positions = set()
+            start = bisect.bisect_left(self.sorted_words, query_word)
+            for word in self.sorted_words[start:]:
+                if not word.startswith(query_word):
+                    break
+                positions |= self.words[word]
+            matching_positions = positions if matching_positions is None else matching_positions & positions
+            if not matching_positions:
+                return None
+
+        return min(matching_positions, key=lambda position: (len(self.autocomplete_index.names[position]), position))
+
+    # Returns the name closest to a misspelled query, or None if nothing is within the allowed number of edits
+    def closest_typo(self, query: str):
+        max_distance = allowed_edits(query)
+
+        # Only check the names that share the most trigrams with the query, very common trigrams barely narrow it down
+        shared_trigrams = Counter()
+        for trigram in {query[i:i + 3] for i in range(len(query) - 2)}:
+            postings = self.autocomplete_index.trigrams.get(trigram, [])
+            if len(postings) <= COMMON_TRIGRAM_POSTINGS:
+                shared_trigrams.update(postings)
+
+        # A typo in the whole name beats a typo in just the start of the name, ties keep the candidate with more shared trigrams
+        best_position = None
+        best_score = 2 * max_distance + 2
+        for position, _ in shared_trigrams.most_common(TYPO_CANDIDATES):
+            lower_name = self.autocomplete_index.lower_names[position]
+            score = min(
+                2 * bounded_edit_distance(query, lower_name, max_distance),
+                2 * bounded_edit_distance(query, lower_name[:len(query)], max_distance) + 1,
+            )
+            if score < best_score:
+                best_position = position
+                best_score = score
+
+        if best_score > 2 * max_distance + 1:
+            return None
+        return best_position
+
+# Splits a lowercase name into its words
+def split_words(lower_name: str):
+    return re.findall(r"[a-z0-9]+", lower_name)
+
+# Number of typos allowed for a query, longer queries can have more
+def allowed_edits(query: str):
+    if len(query) <= 4:
+        return 1
+    if len(query) <= 10:
+        return 2
+    return 3
+
+# Levenshtein distance that gives up once the distance is over the limit (returns limit + 1)
+def bounded_edit_distance(first: str, second: str, limit: int):
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+
+    # Only cells within "limit" of the diagonal can stay under the limit, everything else counts as over it
+    over_limit = limit + 1
+    previous_row = [j if j <= limit else over_limit for j in range(len(second) + 1)]
+    for i in range(1, len(first) + 1):
+        first_character = first[i - 1]
+        current_row = [over_limit] * (len(second) + 1)
+        if i <= limit:
+            current_row[0] = i
+
+        row_minimum = current_row[0]
+        for j in range(max(1, i - limit), min(len(second), i + limit) + 1):
+            distance = min(
+                previous_row[j] + 1,
+                current_row[j - 1] + 1,
+                previous_row[j - 1] + (first_character != second[j - 1]),
+            )
+            current_row[j] = distance
+            if distance < row_minimum:
+                row_minimum = distance
+
+        # Every path is already over the limit
+        if row_minimum > limit:
+            return over_limit
+        previous_row = current_row
+
+    return min(previous_row[-1], over_limit)
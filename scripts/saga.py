@@ -1,12 +1,12 @@
 import discord
-import json
 import random
+from scripts import card_repository, formatter
+from scripts.autocomplete_index import AutocompleteIndex
 
 # Creates the random secret packs
 async def secret_packs(interaction: discord.Interaction, number_of_spins: int = None):
     # Read the master_data JSON
-    with open('global/json/master_data.json', 'r', encoding="utf-8") as file:
-        master_data = json.load(file)
+    master_data = card_repository.get_repository().master_data()
         
     # Set Default
     num_spins = 5
@@ -40,8 +40,7 @@ def master_packs():
 # Generates the secret pack information for a given archetype
 async def search_by_archetype(interaction: discord.Interaction, input: str):
     # Read the master_data JSON
-    with open('global/json/master_data.json', 'r', encoding="utf-8") as file:
-        master_data = json.load(file)
+    master_data = card_repository.get_repository().master_data()
         
     embeds_list = []
 
@@ -67,8 +66,7 @@ def find_matching_packs(packs, search_input):
 # Generates the secret pack information for a given pack title
 async def search_by_title(interaction: discord.Interaction, input: str):
     # Read the master_data JSON
-    with open('global/json/master_data.json', 'r', encoding="utf-8") as file:
-        master_data = json.load(file)
+    master_data = card_repository.get_repository().master_data()
         
     # Embedded list for multiple results
     embeds_list = []
@@ -111,26 +109,15 @@ def create_secret_pack_embed(secret_pack):
     return embed
 
 def search_by_archetype_autocomplete(current_input: str):
-    with open('global/json/master_data.json', 'r', encoding="utf-8") as file:
-        secret_pack_database = json.load(file)
-    archetypes = set()
-    for pack in secret_pack_database["packs"]:
-        archetypes.update(pack["archetypes"])
-    unique_archetypes = sorted(archetypes)
-    return [
-        discord.app_commands.Choice(name=name, value=name)
-        for name in unique_archetypes
-        if current_input.lower() in name.lower()
-    ][:25]
+    archetype_index = card_repository.get_repository().index(
+        "secret_pack_archetype_autocomplete_index",
+        lambda repository: AutocompleteIndex(archetype for pack in repository.master_data()["packs"] for archetype in pack["archetypes"])
+    )
+    return formatter.autocomplete_choices(archetype_index, current_input)
 
 def search_by_title_autocomplete(current_input: str):
-    with open('global/json/master_data.json', 'r', encoding="utf-8") as file:
-        secret_pack_database = json.load(file)
-    
-    secret_pack_titles = [pack['title'] for pack in secret_pack_database['packs']]
-
-    return [
-        discord.app_commands.Choice(name=name, value=name)
-        for name in secret_pack_titles
-        if current_input.lower() in name.lower()
-    ][:25]
\ No newline at end of file
+    title_index = card_repository.get_repository().index(
+        "secret_pack_title_autocomplete_index",
+        lambda repository: AutocompleteIndex(pack["title"] for pack in repository.master_data()["packs"])
+    )
+    return formatter.autocomplete_choices(title_index, current_input)
\ No newline at end of file
@@ -0,0 +1,82 @@
+import json
+import os
+import time
+
+FSYNC_BATCH_SIZE = 25           # Records written before they are forced to disk
+FSYNC_INTERVAL_SECONDS = 2      # Longest a written record waits before it is forced to disk
+MAX_AGE_SECONDS = 24 * 60 * 60  # Journals older than this are from a scrape too old to resume
+
+# Append only log of a scrape's progress, one JSON record per line
+# A crash can at most tear the last line, which is skipped when the journal is read back
+class ScrapeJournal:
+    def __init__(self, file_path: str, fsync_batch_size: int = FSYNC_BATCH_SIZE, fsync_interval_seconds: float = FSYNC_INTERVAL_SECONDS):
+        self.file_path = file_path
+        self.fsync_batch_size = fsync_batch_size
+        self.fsync_interval_seconds = fsync_interval_seconds
+        self.file = None
+        self.unsynced_records = 0
+        self.last_sync = time.monotonic()
+
+    # Returns every record of an earlier scrape that didn't finish, or [] if there is nothing to resume
+    def read(self, max_age_seconds: float = MAX_AGE_SECONDS):
+        if not os.path.exists(self.file_path):
+            return []
+
+        # An old journal would resume decks that may have changed since
+        if time.time() - os.path.getmtime(self.file_path) > max_age_seconds:
+            self.discard()
+            return []
+
+        records = []
+        with open(self.file_path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    print(f"Skipping a torn line in {self.file_path}")
+        return records
+
+    # Adds a record to the end of the journal, forcing it to disk once enough records or time have built up
+    def append(self, record: dict):
+        if self.file is None:
+            os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+            self.file = open(self.file_path, "a", encoding="utf-8")
+
+            # Start on a new line after a torn one, so the first record isn't lost with it
+            if self.file.tell() and not self.ends_with_newline():
+                self.file.write("\n")
+
+        self.file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.unsynced_records += 1
+        if self.unsynced_records >= self.fsync_batch_size or time.monotonic() - self.last_sync >= self.fsync_interval_seconds:
+            self.sync()
+
+    # Whether the journal on disk ends with a complete line
+    def ends_with_newline(self):
+        with open(self.file_path, "rb") as file:
+            file.seek(-1, os.SEEK_END)
+            return file.read(1) == b"\n"
+
+    # Forces every written record to disk
+    def sync(self):
+        if self.file is not None and self.unsynced_records:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        self.unsynced_records = 0
+        self.last_sync = time.monotonic()
+
+    # Syncs and closes the journal, it stays on disk so the scrape can be resumed
+    def close(self):
+        if self.file is not None:
+            self.sync()
+            self.file.close()
+            self.file = None
+
+    # Deletes the journal, used once its records were compacted into the final file
+    def discard(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.unsynced_records = 0
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
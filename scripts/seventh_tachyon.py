@@ -1,82 +1,85 @@
-import json
 import os
 import scripts.formatter as formatter
+from scripts import card_repository, ydk_parser, stat_matcher
+import numpy as np
 
 # Creates a list of all the current Seventh Tachyon targets
 def seventh_tachyon_list(guild_id_as_int):
-    # Load the full database of cards
-    with open('global/json/full_database.json', 'r', encoding="utf-8") as file:
-        full_database = json.load(file)
-
-    # Retrieve all the valid targets
-    valid_targets = search_for_tachyon_targets(full_database["data"])
+    # The report only changes with the card database, so it is built once per repository
+    report = card_repository.get_repository().index("seventh_tachyon_report", build_seventh_tachyon_report)
 
     # Creates the file path if it doesn't exist
     os.makedirs(f"guilds/{guild_id_as_int}/docs", exist_ok=True)
 
     # Save the results to a file
     with open(f"guilds/{guild_id_as_int}/docs/seventh_tachyon_targets.txt", "w", encoding="utf-8") as file:
-        for card in valid_targets:
-            file.write(f"{card}")
+        file.write(report)
     return "Here's all the current Seventh Tachyon targets in the game:"
 
+# Builds the report of every Seventh Tachyon target in the game
+def build_seventh_tachyon_report(repository):
+    columns = repository.all_monster_columns()
+    matcher = repository.all_monster_matcher()
+
+    # Every main deck monster that matches the XYZ monster
+    def target_names(xyz_monster):
+        position = columns.position_by_id.get(xyz_monster["id"])
+        if position is None:
+            return []
+        return [columns.names[target] for target in matcher.targets(stat_matcher.SEVENTH_TACHYON, position)]
+
+    return "".join(search_for_tachyon_targets(repository.seventh_tachyon_targets(), target_names))
+
 # Creates a list of all the Seventh Tachyon targets in a given decklist
-def seventh_tachyon_decklist(guild_id_as_int, decklist: str):
-    # Load the full database of cards
-    with open('global/json/full_database.json', 'r', encoding="utf-8") as file:
-        full_database = json.load(file)
+def seventh_tachyon_decklist(guild_id_as_int, decklist: ydk_parser.Deck):
+    # Get the card id index
+    repository = card_repository.get_repository()
+    card_index = repository.card_database_index()
+    columns = repository.all_monster_columns()
 
     array_of_ids_to_search = []
     cards_to_search = []
 
-    # Convert ydk clipboard deck to array of IDs
+    # Convert the parsed deck to an array of IDs
     formatter.convert_ydk_clipboard_to_id(decklist, array_of_ids_to_search)
 
-    # Convert arrays of IDs to array of JSON card details
-    formatter.assign_monster_card_by_id(array_of_ids_to_search, cards_to_search, full_database)
+    # Convert arrays of IDs to array of JSON card details, then to their positions in the columns
+    formatter.assign_monster_card_by_id(array_of_ids_to_search, cards_to_search, card_index)
+    deck_positions = columns.positions_of_ids(card["id"] for card in cards_to_search)
+
+    # Compare every XYZ monster with the deck at once
+    seventh_tachyon_database = repository.seventh_tachyon_targets()
+    xyz_positions = columns.positions_of_ids(card["id"] for card in seventh_tachyon_database["data"])
+    matches = repository.all_monster_matcher().match_matrix(stat_matcher.SEVENTH_TACHYON, xyz_positions, deck_positions)
+    matches_by_id = {int(columns.ids[position]): row for position, row in zip(xyz_positions, matches)}
+
+    # The deck's main deck monsters that match the XYZ monster
+    def deck_target_names(xyz_monster):
+        if xyz_monster["id"] not in matches_by_id:
+            return []
+        return [columns.names[deck_positions[target]] for target in np.flatnonzero(matches_by_id[xyz_monster["id"]])]
     
     # Retrieve all the valid targets
-    valid_targets = search_for_tachyon_targets(cards_to_search)
+    valid_targets = search_for_tachyon_targets(seventh_tachyon_database, deck_target_names)
 
     # Creates the file path if it doesn't exist
     os.makedirs(f"guilds/{guild_id_as_int}/docs", exist_ok=True)
     
     # Save the results to a file
     with open(f"guilds/{guild_id_as_int}/docs/seventh_tachyon_deck_targets.txt", "w", encoding="utf-8") as file:
-        for card in valid_targets:
-            file.write(f"{card}")
+        file.write("".join(valid_targets))
 
     return "Here is the list of your deck's Seventh Tachyon targets:"
 
-# Creates a list of all the valid Seventh Tachyon targets for a given array of cards
-def search_for_tachyon_targets(cards_json):
-    # Load the Seventh Tachyon database
-    with open('global/json/seventh_tachyon_targets.json', 'r', encoding="utf-8") as file:
-        seventh_tachyon_database = json.load(file)
-
-    current_card_results = "Targets for "
+# Creates a list of all the valid Seventh Tachyon targets, "target_names" returns the names of the targets for an XYZ monster
+def search_for_tachyon_targets(seventh_tachyon_database, target_names):
     valid_targets = []
 
     # For every XYZ monster listed in the Seventh Tachyon database
     for card in seventh_tachyon_database["data"]:
-        # List the name of the card in the output
-        current_card_results += f"{card['name']}\n"
-        # For every card in the list
-        for data in cards_json:
-            # If it is a monster and not an extra deck monster
-            if all(x not in data["type"] for x in ["Fusion", "XYZ", "Link", "Synchro"]) and "Monster" in data["type"]:
-                # If the level of the monster equals the rank of the XYZ monster
-                if data["level"] == card["level"]:
-                    # If the type or attribute is also the same
-                    if data["race"] == card["race"] or data["attribute"] == card["attribute"]:
-                        # Add the card to the list
-                        current_card_results += f"\t-{data['name']}\n"
+        names = target_names(card)
 
         # If there are any valid targets for the card, add it to the list
-        if current_card_results != f"Targets for {card['name']}\n":
-            current_card_results += "\n"
-            valid_targets.append(current_card_results)
-
-        # Reset the base text
-        current_card_results = "Targets for "
+        if names:
+            valid_targets.append(f"Targets for {card['name']}\n" + "".join(f"\t-{name}\n" for name in names) + "\n")
     return valid_targets
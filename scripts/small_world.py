@@ -1,133 +1,199 @@
-import json
 import os
 import scripts.formatter as formatter
-import discord
+from scripts import card_repository, ydk_parser, small_world_optimizer, small_world_paths
+
+OPTIMIZE_RANKED_BRIDGES = 50    # Number of bridges listed in the /small_world_optimize ranking
 
 # Creates a list of all the Small World bridges between 2 cards
 def small_world_pair(guild_id_as_int, first_card: str, second_card: str):
-    # Get the latest database of cards
-    with open('global/json/main_monster_database.json', 'r', encoding="utf-8") as file:
-        main_monster_database = json.load(file)
+    # Get the main deck monster columns
+    repository = card_repository.get_repository()
+    columns = repository.main_monster_columns()
+    name_resolver = repository.main_monster_name_resolver()
+    file_path = f"guilds/{guild_id_as_int}/docs/small_world.txt"
+
+    # Remove the last result, so a failed search never sends an old file
+    if os.path.exists(file_path):
+        os.remove(file_path)
 
     # Small World is exactly 1 of the same: Type, Attribute, Level, ATK or DEF
     cards_as_names = [first_card, second_card]
-    cards_as_json = []
-    valid_bridges_matrix = []
-    list_of_matches = []
-
-    # Change list of card names to a list of card objects with populated information
-    formatter.assign_cards_by_name(cards_as_names, cards_as_json, main_monster_database)
+    card_positions = []
 
-    # Change a list of card objects to a matrix of valid Small World targets
-    share_one_feature(cards_as_json, valid_bridges_matrix, main_monster_database["data"])
+    # Change the card names (partial or misspelled) to their positions in the columns
+    for card_name in cards_as_names:
+        resolved_name = name_resolver.resolve(card_name)
+        if resolved_name is None or resolved_name not in columns.position_by_name:
+            return f"Could not find a main deck monster named **{card_name}**"
+        card_positions.append(columns.position_by_name[resolved_name])
 
-    # Change 2 or more lists of valid Small World targets to a single list of valid bridges
-    same_name(valid_bridges_matrix, list_of_matches)
+    # Every monster that shares exactly 1 feature with both cards, one AND of their adjacency rows
+    list_of_matches = repository.small_world_adjacency().bridge_positions(card_positions[0], card_positions[1])
 
     # Creates the file path if it doesn't exist
     os.makedirs(f"guilds/{guild_id_as_int}/docs", exist_ok=True)
 
     # Write results to a file
-    with open(f"guilds/{guild_id_as_int}/docs/small_world.txt", "w", encoding="utf-8") as file:
+    with open(file_path, "w", encoding="utf-8") as file:
         # Write the bridge we're trying to solve
-        file.write(f"{cards_as_json[0]['name']} -> {cards_as_json[1]['name']}:\n")
+        file.write(f"{columns.names[card_positions[0]]} -> {columns.names[card_positions[1]]}:\n")
         
         # Write the valid targets
-        for card in list_of_matches:
-            file.write(f"{card}")
+        for position in list_of_matches:
+            file.write(f"\t-{columns.names[position]}\n")
 
     return f"Here's all the Small World bridges for:\n**{formatter.smart_capitalize(first_card)} -> {formatter.smart_capitalize(second_card)}**"
 
 # Creates a list of all the Small World bridges in a decklist
-def small_world_decklist(guild_id_as_int, decklist: str):
-    with open('global/json/full_database.json', 'r', encoding="utf-8") as file:
-        full_database = json.load(file)
-        
+def small_world_decklist(guild_id_as_int, decklist: ydk_parser.Deck):
+    repository = card_repository.get_repository()
+    card_index = repository.card_database_index()
+    columns = repository.main_monster_columns()
+
     # Variable declarations
     array_of_ids_to_search = []
     cards_to_search = []
-    valid_bridges_matrix = []
 
-    # Convert ydk clipboard deck to array of IDs
+    # Convert the parsed deck to an array of IDs
     formatter.convert_ydk_clipboard_to_id(decklist, array_of_ids_to_search)
 
     # Convert arrays of IDs to array of JSON card details
-    formatter.assign_main_deck_monsters_by_id(array_of_ids_to_search, cards_to_search, full_database)
+    formatter.assign_main_deck_monsters_by_id(array_of_ids_to_search, cards_to_search, card_index)
 
-    # Create a matrix that holds all cards that share 1 feature with every card in the array 
-    share_one_feature(cards_to_search, valid_bridges_matrix, cards_to_search)
+    # Find every card's position in the columns, then every pair of cards with a bridge in the deck
+    deck_positions = columns.positions_of_ids(card["id"] for card in cards_to_search)
+    valid_bridges = repository.small_world_adjacency().deck_bridges(deck_positions)
     
     # Creates the file path if it doesn't exist
     os.makedirs(f"guilds/{guild_id_as_int}/docs", exist_ok=True)
 
     # Write the results to a file
+    lines = []
+    # For every pair of cards with at least one bridge
+    for starting_card, ending_card, bridges in valid_bridges:
+        # Write the card names and all valid bridges
+        lines.append(f"{columns.names[starting_card]} --> {columns.names[ending_card]}:\n")
+        lines.extend(f"\t-{columns.names[bridge]}\n" for bridge in bridges)
+        lines.append("\n")
     with open(f"guilds/{guild_id_as_int}/docs/small_world_decklist.txt", "w", encoding="utf-8") as file:
-        # For every card in every list
-        for starting_card in range(len(valid_bridges_matrix)):
-            # For every card in every other list
-            for ending_card in range(starting_card + 1, len(valid_bridges_matrix)):
-                # Set the lists to variables
-                starting_card_list = valid_bridges_matrix[starting_card]
-                ending_card_list = valid_bridges_matrix[ending_card]
-                
-                # Use matrix "set" to intersect the lists (only keep duplicates)
-                valid_bridges_list = set(starting_card_list) & set(ending_card_list)
-                
-                # If it finds any matches to begin with
-                if valid_bridges_list:
-                    # Write the card names and all valid bridges
-                    file.write(f"{starting_card_list[0]} --> {ending_card_list[0]}:\n")
-                    for card in valid_bridges_list:
-                        file.write(f"{card}")
-                    file.write("\n")
+        file.write("".join(lines))
 
     return "Here's all the Small World bridges for your decklist:"
 
-# Converts a list of card objects to a matrix of valid Small World targets
-def share_one_feature(cards_as_json, valid_bridges_matrix, database):
-    matching_features = 0
-    current_matches = []
-    # For every card passed in the array (for every card in the decklist)
-    for card in cards_as_json:
-        current_matches = [card["name"]]
-        # For every card in the game OR 
-        for data in database:
-            if card["name"] != data["name"]:
-                # Reset the number of matching features
-                matching_features = 0
-
-                # Check for only 1 matching feature
-                if card["race"] == data["race"]:
-                    matching_features += 1
-                if card["attribute"] == data["attribute"]:
-                    matching_features += 1
-                if card["level"] == data["level"]:
-                    matching_features += 1
-                if card.get("atk") == data.get("atk"):
-                    matching_features += 1
-                if card.get("def") == data.get("def"):
-                    matching_features += 1
-                if matching_features == 1:
-                    current_matches.append(f"\t-{data['name']}\n")
-            
-        valid_bridges_matrix.append(current_matches)
-        current_matches = []
-    return
-
-# Compares two different lists of targets, returns a result if there is a match between them (They both have the same target)
-def same_name(valid_bridges_matrix, list_of_matches):
-    for first_card in valid_bridges_matrix[0]:
-        for second_card in valid_bridges_matrix[1]:
-            if first_card == second_card:
-                list_of_matches.append(first_card)
-    return
+# Ranks every bridge for a decklist, and suggests the fewest bridges that connect every monster in it to a target
+def small_world_optimize(guild_id_as_int, decklist: ydk_parser.Deck, target_card: str):
+    repository = card_repository.get_repository()
+    card_index = repository.card_database_index()
+    columns = repository.main_monster_columns()
+    adjacency = repository.small_world_adjacency()
+    file_path = f"guilds/{guild_id_as_int}/docs/small_world_optimize.txt"
+
+    # Remove the last result, so a failed search never sends an old file
+    if os.path.exists(file_path):
+        os.remove(file_path)
+
+    # Find the target's position in the columns
+    target_name = repository.main_monster_name_resolver().resolve(target_card)
+    if target_name is None or target_name not in columns.position_by_name:
+        return f"Could not find a main deck monster named **{target_card}**"
+    target_position = columns.position_by_name[target_name]
+
+    array_of_ids_to_search = []
+    cards_to_search = []
+
+    # Convert the parsed deck to an array of main deck monsters
+    formatter.convert_ydk_clipboard_to_id(decklist, array_of_ids_to_search)
+    formatter.assign_main_deck_monsters_by_id(array_of_ids_to_search, cards_to_search, card_index)
+    deck_positions = columns.positions_of_ids(card["id"] for card in cards_to_search)
+    if not deck_positions:
+        return "Could not find any main deck monsters in that decklist"
+
+    # Best bridges overall, then the fewest that reach the target
+    ranked_bridges = small_world_optimizer.rank_bridges(adjacency, deck_positions, OPTIMIZE_RANKED_BRIDGES)
+    suggested_bridges, already_connected, unreachable = small_world_optimizer.cover_deck(adjacency, deck_positions, target_position)
+    in_deck = set(deck_positions)
+
+    # Creates the file path if it doesn't exist
+    os.makedirs(f"guilds/{guild_id_as_int}/docs", exist_ok=True)
+
+    lines = [f"Connecting every monster in your deck to {target_name}:\n\n"]
+
+    # Suggested bridges, and which deck monsters each one connects
+    lines.append(f"Suggested bridges ({len(suggested_bridges)}):\n")
+    for bridge, connected_cards in suggested_bridges:
+        lines.append(f"\t+ {columns.names[bridge]}\n")
+        lines.extend(f"\t\t-{columns.names[card]}\n" for card in connected_cards)
+    if not suggested_bridges:
+        lines.append("\tNone needed\n")
+
+    if already_connected:
+        lines.append("\nAlready connected by a bridge in your deck:\n")
+        lines.extend(f"\t-{columns.names[card]}\n" for card in already_connected)
+
+    if unreachable:
+        lines.append(f"\nNo bridge in the game connects these to {target_name}:\n")
+        lines.extend(f"\t-{columns.names[card]}\n" for card in unreachable)
+
+    # Best bridges by the number of ordered pairs of deck monsters they connect
+    lines.append(f"\nTop {len(ranked_bridges)} bridges for your deck (ordered pairs of deck monsters bridged):\n")
+    for bridge, bridged_pairs in ranked_bridges:
+        lines.append(f"\t-{columns.names[bridge]}: {bridged_pairs}{' (in deck)' if bridge in in_deck else ''}\n")
+
+    with open(file_path, "w", encoding="utf-8") as file:
+        file.write("".join(lines))
+
+    return f"Here are the best Small World bridges for your decklist, targeting:\n**{target_name}**"
+
+# Finds the shortest chain of Small World activations between 2 cards, and everything the first card can reach
+def small_world_path(guild_id_as_int, first_card: str, second_card: str, activations: int = None):
+    repository = card_repository.get_repository()
+    columns = repository.main_monster_columns()
+    name_resolver = repository.main_monster_name_resolver()
+    paths = repository.small_world_paths()
+    activations = activations or small_world_paths.MAX_ACTIVATIONS
+    file_path = f"guilds/{guild_id_as_int}/docs/small_world_path.txt"
+
+    # Remove the last result, so a failed search never sends an old file
+    if os.path.exists(file_path):
+        os.remove(file_path)
+
+    # Change the card names (partial or misspelled) to their positions in the columns
+    card_positions = []
+    for card_name in [first_card, second_card]:
+        resolved_name = name_resolver.resolve(card_name)
+        if resolved_name is None or resolved_name not in columns.position_by_name:
+            return f"Could not find a main deck monster named **{card_name}**"
+        card_positions.append(columns.position_by_name[resolved_name])
+    first_name = columns.names[card_positions[0]]
+    second_name = columns.names[card_positions[1]]
+
+    # Both searches are served from the cache when the same starting card is searched again
+    path = paths.shortest_path(card_positions[0], card_positions[1], activations)
+    newly_reachable = paths.reachable(card_positions[0], activations)
+
+    # Creates the file path if it doesn't exist
+    os.makedirs(f"guilds/{guild_id_as_int}/docs", exist_ok=True)
+
+    lines = [f"{first_name} -> {second_name}:\n"]
+    if path is None:
+        lines.append(f"\tCannot be reached in {activations} activation(s)\n")
+    else:
+        # Every activation reveals the card in hand, reveals a bridge, then adds the next card
+        for activation, step in enumerate(range(0, len(path) - 1, 2), start=1):
+            lines.append(f"\t{activation}. {columns.names[path[step]]} -> {columns.names[path[step + 1]]} -> {columns.names[path[step + 2]]}\n")
+
+    # Every card the first card can add, grouped by the fewest activations it takes
+    for activation, positions in enumerate(newly_reachable, start=1):
+        lines.append(f"\nFirst reachable from {first_name} in {activation} activation(s) ({len(positions)}):\n")
+        lines.extend(f"\t-{columns.names[position]}\n" for position in positions)
+
+    with open(file_path, "w", encoding="utf-8") as file:
+        file.write("".join(lines))
+
+    if path is None:
+        return f"**{formatter.smart_capitalize(second_name)}** can't be reached from **{formatter.smart_capitalize(first_name)}** in {activations} Small World activation(s)"
+    return f"**{formatter.smart_capitalize(first_name)} -> {formatter.smart_capitalize(second_name)}** takes {len(path) // 2} Small World activation(s):"
 
 def small_world_autocomplete(current_input: str):
-    with open('global/json/main_monster_database.json', 'r', encoding="utf-8") as file:
-        small_world_database = json.load(file)
-    monster_names = [card['name'] for card in small_world_database['data']]
-    return [
-        discord.app_commands.Choice(name=name, value=name)
-        for name in monster_names
-        if current_input.lower() in name.lower()
-    ][:25]
\ No newline at end of file
+    main_monster_index = card_repository.get_repository().main_monster_autocomplete_index()
+    return formatter.autocomplete_choices(main_monster_index, current_input)
\ No newline at end of file
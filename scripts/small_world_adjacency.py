@@ -0,0 +1,76 @@
+import os
+import numpy as np
+from scripts.monster_columns import MonsterColumns
+from scripts import small_world_engine, stat_matcher
+from scripts.stat_matcher import StatMatcher
+
+ADJACENCY_FILE_NAME = "small_world_adjacency.npy"
+ADJACENCY_IDS_FILE_NAME = "small_world_adjacency_ids.npy"
+BUILD_CHUNK_SIZE = 256    # Rows compared at once while building, keeps the temporary arrays small
+
+# The Small World graph as one bitset row per main deck monster, bit j of row i is set if i and j share exactly 1 feature
+class SmallWorldAdjacency:
+    def __init__(self, bits, ids):
+        self.bits = bits
+        self.ids = ids
+        self.monster_count = len(ids)
+
+    # Builds every row from the monster columns
+    @classmethod
+    def build(cls, columns: MonsterColumns, matcher: StatMatcher = None):
+        matcher = matcher or StatMatcher(columns)
+        monster_count = len(columns)
+        all_positions = np.arange(monster_count)
+
+        bits = np.zeros((monster_count, (monster_count + 7) // 8), dtype=np.uint8)
+        for start in range(0, monster_count, BUILD_CHUNK_SIZE):
+            end = min(start + BUILD_CHUNK_SIZE, monster_count)
+            rows = matcher.match_matrix(stat_matcher.SMALL_WORLD, all_positions[start:end], all_positions)
+            bits[start:end] = np.packbits(rows, axis=1)
+
+        return cls(bits, columns.ids.copy())
+
+    # Maps a saved adjacency into memory, returns None if there isn't one or it was built from different columns
+    @classmethod
+    def load(cls, directory: str, columns: MonsterColumns):
+        bits_path = os.path.join(directory, ADJACENCY_FILE_NAME)
+        ids_path = os.path.join(directory, ADJACENCY_IDS_FILE_NAME)
+        if not os.path.exists(bits_path) or not os.path.exists(ids_path):
+            return None
+
+        ids = np.load(ids_path)
+        if not np.array_equal(ids, columns.ids):
+            return None
+        # Plain array view of the mapped file, skips the overhead of slicing a memmap
+        return cls(np.load(bits_path, mmap_mode="r").view(np.ndarray), ids)
+
+    # Saves the adjacency next to the card snapshot, swapping the files in so readers never see a partial one
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        for file_name, array in [(ADJACENCY_IDS_FILE_NAME, self.ids), (ADJACENCY_FILE_NAME, self.bits)]:
+            temporary_file_path = os.path.join(directory, f"{file_name}.tmp.npy")
+            np.save(temporary_file_path, np.asarray(array))
+            os.replace(temporary_file_path, os.path.join(directory, file_name))
+
+    # Unpacks the rows at "positions" to booleans
+    def unpack_rows(self, positions):
+        return np.unpackbits(self.bits[positions], axis=-1, count=self.monster_count).astype(bool)
+
+    # Returns the positions of every valid bridge between 2 monsters, in column order
+    def bridge_positions(self, first_position: int, second_position: int):
+        bridges = np.bitwise_and(self.bits[first_position], self.bits[second_position])
+        return np.flatnonzero(np.unpackbits(bridges, count=self.monster_count)).tolist()
+
+    # Adjacency between only the monsters at "positions", entry [i][j] is True if they share exactly 1 feature
+    def adjacency_matrix(self, positions):
+        positions = np.asarray(positions, dtype=np.int64)
+        return self.unpack_rows(positions)[:, positions]
+
+    # Returns every pair of monsters in a deck with at least one bridge in the same deck, as (first, second, bridges)
+    def deck_bridges(self, positions):
+        positions = list(dict.fromkeys(positions))
+        return small_world_engine.bridges_from_adjacency(positions, self.adjacency_matrix(positions))
+
+    # Total bytes held by the bitsets
+    def nbytes(self):
+        return self.bits.nbytes + self.ids.nbytes
@@ -0,0 +1,17 @@
+import numpy as np
+
+# Lists the bridges of every pair of monsters from their adjacency matrix, as (first, second, bridges)
+def bridges_from_adjacency(positions, adjacency):
+    # Bridges of every pair at once, [i][j][k] is True if k is a bridge between i and j (only i < j is kept)
+    upper_triangle = np.triu(np.ones((len(positions), len(positions)), dtype=bool), k=1)
+    bridges = adjacency[:, None, :] & adjacency[None, :, :] & upper_triangle[:, :, None]
+
+    # Group the bridges by pair, np.nonzero already returns them sorted by pair
+    positions_array = np.array(positions, dtype=np.int64)
+    first_cards, second_cards, bridge_cards = np.nonzero(bridges)
+    results = []
+    for first, second, bridge in zip(positions_array[first_cards].tolist(), positions_array[second_cards].tolist(), positions_array[bridge_cards].tolist()):
+        if not results or results[-1][0] != first or results[-1][1] != second:
+            results.append((first, second, []))
+        results[-1][2].append(bridge)
+    return results
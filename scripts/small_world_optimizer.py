@@ -0,0 +1,54 @@
+import numpy as np
+from scripts.small_world_adjacency import SmallWorldAdjacency
+
+# Ranks every main deck monster in the game by how many ordered pairs of deck monsters it bridges, returns (position, pairs) best first
+def rank_bridges(adjacency: SmallWorldAdjacency, deck_positions, limit: int = None):
+    deck_positions = list(dict.fromkeys(deck_positions))
+    if not deck_positions:
+        return []
+
+    # A monster adjacent to k deck monsters bridges every ordered pair of them, k * (k - 1)
+    adjacent_deck_monsters = adjacency.unpack_rows(deck_positions).sum(axis=0, dtype=np.int64)
+    bridged_pairs = adjacent_deck_monsters * (adjacent_deck_monsters - 1)
+
+    # Best first, ties keep column order
+    ranking = np.argsort(-bridged_pairs, kind="stable")
+    ranking = ranking[bridged_pairs[ranking] > 0]
+    if limit is not None:
+        ranking = ranking[:limit]
+    return [(int(position), int(bridged_pairs[position])) for position in ranking]
+
+# Greedily picks the fewest bridges that connect every deck monster to the target
+# Returns (bridges as (position, newly connected deck positions), deck positions already connected by the deck, deck positions that can't be connected)
+def cover_deck(adjacency: SmallWorldAdjacency, deck_positions, target_position: int):
+    deck_positions = [position for position in dict.fromkeys(deck_positions) if position != target_position]
+    if not deck_positions:
+        return [], [], []
+    deck_array = np.array(deck_positions, dtype=np.int64)
+
+    # [i][x] is True if deck monster i can reveal x, and x can reveal the target
+    deck_rows = adjacency.unpack_rows(deck_positions)
+    reaches_target = adjacency.unpack_rows(target_position)
+    covers = deck_rows & reaches_target
+
+    # Deck monsters that a bridge already in the deck connects don't need a new one
+    in_deck = np.zeros(adjacency.monster_count, dtype=bool)
+    in_deck[deck_array] = True
+    already_connected = (covers & in_deck).any(axis=1)
+
+    # Deck monsters that no bridge in the game connects
+    unreachable = ~covers.any(axis=1)
+
+    # Pick the bridge connecting the most remaining deck monsters until none are left
+    remaining = ~already_connected & ~unreachable
+    candidates = np.flatnonzero(reaches_target)
+    candidate_covers = covers[:, candidates]
+    bridges = []
+    while remaining.any():
+        connected_counts = candidate_covers[remaining].sum(axis=0)
+        best = int(np.argmax(connected_counts))
+        newly_connected = remaining & candidate_covers[:, best]
+        bridges.append((int(candidates[best]), deck_array[newly_connected].tolist()))
+        remaining &= ~newly_connected
+
+    return bridges, deck_array[already_connected].tolist(), deck_array[unreachable].tolist()
@@ -0,0 +1,92 @@
+import functools
+import numpy as np
+from scripts.small_world_adjacency import SmallWorldAdjacency
+
+MAX_ACTIVATIONS = 5     # Longest chain of Small World activations searched
+CACHE_SIZE = 256        # Starting cards whose search is kept
+
+# Chained Small World activations: each one reveals a card in hand, reveals a bridge from the deck, then adds a card that shares exactly 1 feature with the bridge
+class SmallWorldPaths:
+    def __init__(self, adjacency: SmallWorldAdjacency):
+        self.adjacency = adjacency
+
+        # Cache the search from every starting card, so they are dropped along with the repository on /update
+        self.levels = functools.lru_cache(maxsize=CACHE_SIZE)(self.levels_uncached)
+
+    # Bounded BFS from a starting card, returns one (bridges, added cards) pair of boolean masks per activation
+    def levels_uncached(self, start_position: int):
+        hand = np.zeros(self.adjacency.monster_count, dtype=bool)
+        hand[start_position] = True
+
+        levels = []
+        for _ in range(MAX_ACTIVATIONS):
+            bridges = self.neighbours(hand)
+            added_cards = self.neighbours(bridges)
+            levels.append((bridges, added_cards))
+
+            # Once an activation can add the same cards as the one before it, every later one will too
+            if np.array_equal(added_cards, hand):
+                break
+            hand = added_cards
+
+        # Read only, every caller shares the cached arrays
+        for bridges, added_cards in levels:
+            bridges.flags.writeable = False
+            added_cards.flags.writeable = False
+        return tuple(levels)
+
+    # Every monster that shares exactly 1 feature with at least one monster in the mask
+    def neighbours(self, mask):
+        positions = np.flatnonzero(mask)
+        if not len(positions):
+            return np.zeros(self.adjacency.monster_count, dtype=bool)
+        packed_rows = np.bitwise_or.reduce(self.adjacency.bits[positions], axis=0)
+        return np.unpackbits(packed_rows, count=self.adjacency.monster_count).astype(bool)
+
+    # Mask of the cards that can be added with exactly "activations" activations (1 based)
+    def added_cards(self, start_position: int, activations: int):
+        levels = self.levels(start_position)
+        return levels[min(activations, len(levels)) - 1][1]
+
+    # Returns the cards first reachable at each activation, up to "activations", as lists of positions
+    def reachable(self, start_position: int, activations: int = MAX_ACTIVATIONS):
+        reached = np.zeros(self.adjacency.monster_count, dtype=bool)
+        reached[start_position] = True
+
+        newly_reachable = []
+        for activation in range(1, min(activations, MAX_ACTIVATIONS) + 1):
+            added_cards = self.added_cards(start_position, activation)
+            newly_reachable.append(np.flatnonzero(added_cards & ~reached).tolist())
+            reached |= added_cards
+        return newly_reachable
+
+    # Returns the shortest chain from the start to the end as [start, bridge, added card, bridge, ..., end], or None if it takes more than "activations"
+    def shortest_path(self, start_position: int, end_position: int, activations: int = MAX_ACTIVATIONS):
+        levels = self.levels(start_position)
+        activations = min(activations, MAX_ACTIVATIONS)
+
+        # Fewest activations that can add the end card
+        needed_activations = None
+        for activation in range(1, activations + 1):
+            if self.added_cards(start_position, activation)[end_position]:
+                needed_activations = activation
+                break
+        if needed_activations is None:
+            return None
+
+        # Walk back from the end card, every step picks a bridge the previous activation could reveal, then a card in hand that can reveal it
+        path = [end_position]
+        current = end_position
+        for activation in range(needed_activations, 0, -1):
+            bridges = levels[min(activation, len(levels)) - 1][0]
+            bridge = int(np.flatnonzero(bridges & self.adjacency.unpack_rows(current))[0])
+
+            if activation > 1:
+                hand = self.added_cards(start_position, activation - 1)
+                current = int(np.flatnonzero(hand & self.adjacency.unpack_rows(bridge))[0])
+            else:
+                current = start_position
+            path.extend([bridge, current])
+
+        path.reverse()
+        return path
@@ -0,0 +1,225 @@
+import functools
+import time
+import numpy as np
+from scripts.monster_columns import MonsterColumns
+
+CACHE_SIZE = 4096         # (rule, card) results kept per matcher
+CHUNK_SIZE = 256          # Searched cards compared at once by the vectorized strategy, keeps the temporary arrays small
+VECTOR_SPEEDUP = 40       # Roughly how many field comparisons NumPy does in the time the hash buckets visit one candidate (measured on ~13k monsters)
+
+# Strategies a match can run with
+HASH_BUCKETS = "hash_buckets"
+VECTORIZED = "vectorized"
+
+# Which targets a rule can return, named so rules stay declarative
+TARGET_FILTERS = {
+    "main_deck": lambda columns: columns.main_deck_mask(),
+}
+
+# A "shares stats with" card: how many of "fields" must be the same, which fields must always be the same, and which targets are allowed
+class MatchRule:
+    def __init__(self, name: str, fields, shared_counts, required_fields=(), target_filter: str = None, exclude_same_name: bool = True):
+        self.name = name
+        self.fields = tuple(fields)
+        self.shared_counts = frozenset(shared_counts)
+        self.required_fields = tuple(required_fields)
+        self.target_filter = target_filter
+        self.exclude_same_name = exclude_same_name
+
+    def __repr__(self):
+        return f"MatchRule({self.name})"
+
+# Small World: exactly 1 of the same Type, Attribute, Level, ATK or DEF
+SMALL_WORLD = MatchRule("small_world", ["race", "attribute", "level", "atk", "defense"], shared_counts=[1])
+
+# Metaltronus: at least 2 of the same Type, Attribute or ATK
+METALTRONUS = MatchRule("metaltronus", ["race", "attribute", "atk"], shared_counts=[2, 3])
+
+# Seventh Tachyon: a main deck monster whose Level is the Xyz monster's Rank, with the same Type or Attribute
+SEVENTH_TACHYON = MatchRule("seventh_tachyon", ["race", "attribute"], shared_counts=[1, 2], required_fields=["level"], target_filter="main_deck", exclude_same_name=False)
+
+# Runs match rules over a set of monster columns, picking hash buckets or NumPy for every query
+class StatMatcher:
+    def __init__(self, columns: MonsterColumns):
+        self.columns = columns
+        self.buckets = {}
+        self.filters = {}
+
+        # (rule name, strategy) -> [calls, total seconds], see timing_report()
+        self.timings = {}
+
+        # Cache results per matcher, so they are dropped along with the repository on /update
+        self.targets = functools.lru_cache(maxsize=CACHE_SIZE)(self.targets_uncached)
+
+    # Field value -> positions of every monster with it, built the first time a field is bucketed
+    def field_buckets(self, field: str):
+        if field not in self.buckets:
+            values = getattr(self.columns, field)
+            order = np.argsort(values, kind="stable")
+            unique_values, starts = np.unique(values[order], return_index=True)
+            self.buckets[field] = dict(zip(unique_values.tolist(), np.split(order, starts[1:])))
+        return self.buckets[field]
+
+    # Mask of the monsters a rule can return, None if every monster is allowed
+    def target_mask(self, rule: MatchRule):
+        if rule.target_filter is None:
+            return None
+        if rule.target_filter not in self.filters:
+            self.filters[rule.target_filter] = TARGET_FILTERS[rule.target_filter](self.columns)
+        return self.filters[rule.target_filter]
+
+    # Number of candidates the hash buckets would visit for a card
+    def bucket_cost(self, rule: MatchRule, position: int):
+        # Required fields narrow the search to a single bucket
+        if rule.required_fields:
+            return len(self.bucket_of(rule.required_fields[0], position))
+        return sum(len(self.bucket_of(field, position)) for field in rule.fields)
+
+    # Positions of every monster with the same value as the card at "position"
+    def bucket_of(self, field: str, position: int):
+        return self.field_buckets(field).get(int(getattr(self.columns, field)[position]), np.empty(0, dtype=np.int64))
+
+    # Picks the strategy for comparing some cards with "target_count" targets
+    def choose_strategy(self, rule: MatchRule, searched_positions, target_count: int):
+        # Hash buckets can only find targets sharing at least 1 field
+        if 0 in rule.shared_counts:
+            return VECTORIZED
+        bucket_cost = sum(self.bucket_cost(rule, position) for position in searched_positions)
+        vectorized_cost = len(searched_positions) * target_count * (len(rule.fields) + len(rule.required_fields))
+        if bucket_cost * VECTOR_SPEEDUP < vectorized_cost:
+            return HASH_BUCKETS
+        return VECTORIZED
+
+    # Returns the positions of every target of the card at "position" among all the columns, cached per rule and card
+    def targets_uncached(self, rule: MatchRule, position: int):
+        strategy = self.choose_strategy(rule, [position], len(self.columns))
+        start = time.perf_counter()
+
+        if strategy == HASH_BUCKETS:
+            targets = self.bucket_targets(rule, position)
+        else:
+            targets = np.flatnonzero(self.vectorized_matrix(rule, np.array([position]), np.arange(len(self.columns)))[0])
+
+        self.record_time(rule, strategy, start)
+        return tuple(targets.tolist())
+
+    # Compares every searched card with every target card, entry [i][j] is True if target j matches searched card i
+    def match_matrix(self, rule: MatchRule, searched_positions, target_positions):
+        searched_positions = np.asarray(searched_positions, dtype=np.int64)
+        target_positions = np.asarray(target_positions, dtype=np.int64)
+        strategy = self.choose_strategy(rule, searched_positions.tolist(), len(target_positions))
+        start = time.perf_counter()
+
+        if strategy == HASH_BUCKETS:
+            matrix = self.bucket_matrix(rule, searched_positions, target_positions, self.targets)
+        else:
+            matrix = self.vectorized_matrix(rule, searched_positions, target_positions)
+
+        self.record_time(rule, strategy, start)
+        return matrix
+
+    # Hash bucket strategy: only the monsters in the card's buckets are compared
+    def bucket_targets(self, rule: MatchRule, position: int):
+        columns = self.columns
+
+        if rule.required_fields:
+            # Candidates come from the first required field's bucket, then the shared fields are counted on just them
+            candidates = self.bucket_of(rule.required_fields[0], position)
+            shared = np.zeros(len(candidates), dtype=np.int8)
+            for field in rule.fields:
+                values = getattr(columns, field)
+                shared += values[candidates] == values[position]
+            keep = np.isin(shared, list(rule.shared_counts))
+            for field in rule.required_fields[1:]:
+                keep &= getattr(columns, field)[candidates] == getattr(columns, field)[position]
+        else:
+            # Counts how many of the card's buckets each monster is in
+            shared = np.bincount(np.concatenate([self.bucket_of(field, position) for field in rule.fields]), minlength=len(columns))
+            candidates = np.flatnonzero(shared)
+            keep = np.isin(shared[candidates], list(rule.shared_counts))
+
+        if rule.exclude_same_name:
+            keep &= columns.name_codes[candidates] != columns.name_codes[position]
+        mask = self.target_mask(rule)
+        if mask is not None:
+            keep &= mask[candidates]
+
+        # Buckets and np.flatnonzero both keep the candidates in column order
+        return candidates[keep]
+
+    # Looks up every searched card's targets, then marks the ones in the target list
+    def bucket_matrix(self, rule: MatchRule, searched_positions, target_positions, find_targets):
+        matrix = np.zeros((len(searched_positions), len(target_positions)), dtype=bool)
+
+        # Position -> column of the matrix, lists with a card more than once fall back to np.isin
+        unique_targets = len(np.unique(target_positions)) == len(target_positions)
+        target_columns = np.full(len(self.columns), -1, dtype=np.int64)
+        target_columns[target_positions] = np.arange(len(target_positions))
+
+        for row, position in enumerate(searched_positions.tolist()):
+            targets = np.asarray(find_targets(rule, position), dtype=np.int64)
+            if unique_targets:
+                columns = target_columns[targets]
+                matrix[row, columns[columns >= 0]] = True
+            else:
+                matrix[row] = np.isin(target_positions, targets)
+        return matrix
+
+    # Vectorized strategy: one broadcast per field, a chunk of searched cards at a time
+    def vectorized_matrix(self, rule: MatchRule, searched_positions, target_positions):
+        columns = self.columns
+        matrix = np.zeros((len(searched_positions), len(target_positions)), dtype=bool)
+        allowed_counts = np.array(sorted(rule.shared_counts), dtype=np.int8)
+        mask = self.target_mask(rule)
+
+        for start in range(0, len(searched_positions), CHUNK_SIZE):
+            chunk = searched_positions[start:start + CHUNK_SIZE]
+
+            shared = np.zeros((len(chunk), len(target_positions)), dtype=np.int8)
+            for field in rule.fields:
+                values = getattr(columns, field)
+                shared += values[chunk][:, None] == values[target_positions][None, :]
+            matches = np.isin(shared, allowed_counts)
+
+            for field in rule.required_fields:
+                values = getattr(columns, field)
+                matches &= values[chunk][:, None] == values[target_positions][None, :]
+            if rule.exclude_same_name:
+                matches &= columns.name_codes[chunk][:, None] != columns.name_codes[target_positions][None, :]
+            if mask is not None:
+                matches &= mask[target_positions][None, :]
+
+            matrix[start:start + len(chunk)] = matches
+        return matrix
+
+    # Adds a query's run time to the totals
+    def record_time(self, rule: MatchRule, strategy: str, start: float):
+        timing = self.timings.setdefault((rule.name, strategy), [0, 0.0])
+        timing[0] += 1
+        timing[1] += time.perf_counter() - start
+
+    # Runs both strategies for the same query and returns how long each took in seconds, the results are checked to be identical
+    def benchmark(self, rule: MatchRule, searched_positions, target_positions=None):
+        if target_positions is None:
+            target_positions = np.arange(len(self.columns))
+        searched_positions = np.asarray(searched_positions, dtype=np.int64)
+        target_positions = np.asarray(target_positions, dtype=np.int64)
+
+        start = time.perf_counter()
+        bucket_matrix = self.bucket_matrix(rule, searched_positions, target_positions, self.bucket_targets)
+        bucket_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        vectorized_matrix = self.vectorized_matrix(rule, searched_positions, target_positions)
+        vectorized_time = time.perf_counter() - start
+
+        if not np.array_equal(bucket_matrix, vectorized_matrix):
+            raise ValueError(f"{rule} returned different results with each strategy")
+        return {HASH_BUCKETS: bucket_time, VECTORIZED: vectorized_time}
+
+    # Calls and average time of every rule and strategy used so far
+    def timing_report(self):
+        return [
+            f"{rule_name} ({strategy}): {calls} calls, {total / calls * 1000:.3f}ms average"
+            for (rule_name, strategy), (calls, total) in sorted(self.timings.items())
+        ]
@@ -1,7 +1,6 @@
 import discord
-import json
 import math
-from scripts import formatter
+from scripts import formatter, card_repository
 from collections import Counter, defaultdict
 
 
@@ -52,8 +51,7 @@ class TopArchetypeBreakdownPaginationView(discord.ui.View):
         embed = discord.Embed(title=f"{formatter.smart_capitalize(self.archetype)} Card Usage - {self.total_decks} Decks", color=0xbbaa5e)
 
         # Get the date of the last update
-        with open('global/json/last_update.json', 'r', encoding="utf-8") as file:
-            last_update = json.load(file)["last_update"]
+        last_update = card_repository.get_repository().last_update()
         embed.set_footer(text=f"Last updated: {last_update}")
 
         # For every card
@@ -160,8 +158,7 @@ async def create_single_card_pagination(interaction: discord.Interaction, archet
 
 # Returns all the decklists for a given archetype
 def load_decklists(archetype: str):
-    with open('global/json/topping_decklists.json', 'r', encoding="utf-8") as file:
-        data = json.load(file)
+    data = card_repository.get_repository().topping_decklists()
     archetype_name = formatter.smart_capitalize(archetype)
 
     return {deck_key: deck_value["deck_list"] for deck_key, deck_value in data.get(archetype_name, {}).get("decks", {}).items()}
@@ -209,8 +206,7 @@ def count_card_occurrences(archetype: str):
 
 # Get all archetypes from the JSON file
 def get_all_archetypes():
-    with open('global/json/topping_decklists.json', 'r', encoding='utf-8') as file:
-        data = json.load(file)
+    data = card_repository.get_repository().topping_decklists()
     return list(data.keys())
 
 # Autocomplete function for archetypes
@@ -1,7 +1,7 @@
 import discord
-import json
 import math
 from collections import Counter
+from scripts import card_repository
 
 class TopArchetypesPaginationView(discord.ui.View):
     def __init__(self, archetype_info):
@@ -46,8 +46,7 @@ class TopArchetypesPaginationView(discord.ui.View):
         embed = discord.Embed(title="Top Archetypes", color=0xbbaa5e)
 
         # Get the date of the last update
-        with open('global/json/last_update.json', 'r', encoding="utf-8") as file:
-            last_update = json.load(file)["last_update"]
+        last_update = card_repository.get_repository().last_update()
         embed.set_footer(text=f"Last updated: {last_update}")
 
         # For every value in the Archetype tuple
@@ -170,9 +169,8 @@ async def get_top_archetypes(interaction: discord.Interaction):
 
 # Returns a tuple of information about each archetype
 def get_archetype_data():
-    # Opens the file
-    with open('global/json/topping_decklists.json', 'r', encoding="utf-8") as file:
-        topping_archetypes = json.load(file)
+    # Gets the topping decklists
+    topping_archetypes = card_repository.get_repository().topping_decklists()
 
     archetype_info = []
     
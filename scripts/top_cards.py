@@ -1,8 +1,9 @@
 import discord
-import json
 import math
 from collections import Counter
-from scripts import formatter
+from scripts import formatter, card_repository
+from scripts.autocomplete_index import AutocompleteIndex
+from scripts.name_resolver import NameResolver
 
 
 class TopCardsPaginationView(discord.ui.View):
@@ -48,8 +49,7 @@ class TopCardsPaginationView(discord.ui.View):
         embed = discord.Embed(title=f"{self.card_name} Usage:", color=0xbbaa5e)
 
         # Get the date of the last update
-        with open('global/json/last_update.json', 'r', encoding="utf-8") as file:
-            last_update = json.load(file)["last_update"]
+        last_update = card_repository.get_repository().last_update()
         embed.set_footer(text=f"Last updated: {last_update}")
 
         for archetype, usage_data in data:
@@ -129,6 +129,9 @@ class TopCardsPaginationView(discord.ui.View):
 
 
 async def create_card_usage_pagination(interaction: discord.Interaction, card_name: str):
+    # Partial or misspelled names become the closest card found in a topping deck
+    card_name = topping_card_name_resolver(card_repository.get_repository()).resolve(card_name) or card_name
+
     card_usage_data, total_decks_per_archetype = count_card_usage_in_all_archetypes(card_name)
     if not card_usage_data:
         await interaction.response.send_message(f"No topping decks include `{formatter.smart_capitalize(card_name)}` in the current format.")
@@ -144,8 +147,7 @@ async def create_card_usage_pagination(interaction: discord.Interaction, card_na
 
 
 def count_card_usage_in_all_archetypes(target_card_name: str):
-    with open('global/json/topping_decklists.json', 'r', encoding='utf-8') as file:
-        data = json.load(file)
+    data = card_repository.get_repository().topping_decklists()
 
     results = {}
     total_decks_per_archetype = {}
@@ -183,24 +185,34 @@ def count_card_usage_in_all_archetypes(target_card_name: str):
     return results, total_decks_per_archetype
 
 
-def get_all_card_names():
-    with open('global/json/topping_decklists.json', 'r', encoding='utf-8') as file:
-        data = json.load(file)
-
+# Returns every card name found in the topping decklists
+def get_all_card_names(topping_decklists):
     card_set = set()
-    for archetype_data in data.values():
+    for archetype_data in topping_decklists.values():
         for deck_data in archetype_data.get("decks", {}).values():
             deck = deck_data.get("deck_list", {})
             for part in ["main_deck", "extra_deck", "side_deck"]:
                 card_set.update(deck.get(part, []))
 
+    # Skip cards the scraper couldn't resolve to a name
+    card_set.discard(None)
+
     return sorted(card_set)
 
 
 async def card_autocomplete(current_input: str):
-    card_names = get_all_card_names()
-    return [
-        discord.app_commands.Choice(name=name, value=name)
-        for name in card_names
-        if current_input.lower() in name.lower()
-    ][:25]
+    return formatter.autocomplete_choices(topping_card_autocomplete_index(card_repository.get_repository()), current_input)
+
+# Autocomplete index over every card found in a topping deck
+def topping_card_autocomplete_index(repository):
+    return repository.index(
+        "topping_card_autocomplete_index",
+        lambda repository: AutocompleteIndex(get_all_card_names(repository.topping_decklists()))
+    )
+
+# Resolves partial or misspelled names to a card found in a topping deck
+def topping_card_name_resolver(repository):
+    return repository.index(
+        "topping_card_name_resolver",
+        lambda repository: NameResolver(topping_card_autocomplete_index(repository))
+    )
\ No newline at end of file
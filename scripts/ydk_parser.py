@@ -0,0 +1,123 @@
+import base64
+import binascii
+import struct
+
+YDKE_PREFIX = "ydke://"
+SECTIONS = ("main", "extra", "side")
+
+# Section headers found in a .ydk file, anything else starting with "#" is a comment (ex: "#created by ...")
+SECTION_HEADERS = {
+    "#main": "main",
+    "#extra": "extra",
+    "!side": "side",
+}
+
+# A parsed decklist, every section maps card id -> number of copies in the order the cards were first listed
+class Deck:
+    def __init__(self, main=None, extra=None, side=None):
+        self.main = dict(main or {})
+        self.extra = dict(extra or {})
+        self.side = dict(side or {})
+
+    # Returns the id -> count dictionary of a section
+    def section(self, section_name: str) -> dict:
+        return getattr(self, section_name)
+
+    # Adds copies of a card to a section
+    def add(self, section_name: str, card_id: int, copies: int = 1):
+        section = self.section(section_name)
+        section[card_id] = section.get(card_id, 0) + copies
+
+    # Every distinct card id in the deck, main deck first, then extra, then side
+    def unique_ids(self, section_names=SECTIONS):
+        unique_ids = {}
+        for section_name in section_names:
+            unique_ids.update(dict.fromkeys(self.section(section_name)))
+        return list(unique_ids)
+
+    # Total copies of a card across the given sections
+    def copies(self, card_id: int, section_names=SECTIONS) -> int:
+        return sum(self.section(section_name).get(card_id, 0) for section_name in section_names)
+
+    # Card id -> total copies across the given sections
+    def counts(self, section_names=SECTIONS) -> dict:
+        counts = {}
+        for section_name in section_names:
+            for card_id, copies in self.section(section_name).items():
+                counts[card_id] = counts.get(card_id, 0) + copies
+        return counts
+
+    # Number of cards in a section, counting every copy
+    def size(self, section_name: str) -> int:
+        return sum(self.section(section_name).values())
+
+    def __len__(self):
+        return sum(self.size(section_name) for section_name in SECTIONS)
+
+    def __repr__(self):
+        return f"Deck(main={self.size('main')}, extra={self.size('extra')}, side={self.size('side')})"
+
+# Parses a .ydk file, a copied "Clipboard YDK" (newlines become spaces when pasted into Discord) or a ydke:// link
+def parse_deck(decklist: str) -> Deck:
+    if decklist is None or not decklist.strip():
+        raise ValueError("The decklist is empty.")
+
+    decklist = decklist.strip()
+    if decklist.startswith(YDKE_PREFIX):
+        deck = parse_ydke(decklist)
+    else:
+        deck = parse_ydk(decklist.split())
+
+    if not len(deck):
+        raise ValueError("No card ids were found in the decklist.")
+    return deck
+
+# Parses every decklist in one pass, ex: a batch of uploaded files
+def parse_decks(decklists) -> list:
+    return [parse_deck(decklist) for decklist in decklists]
+
+# Parses the words of a .ydk file one at a time, cards listed before any section header count as main deck
+def parse_ydk(tokens) -> Deck:
+    deck = Deck()
+    section_name = "main"
+
+    for token in tokens:
+        # Section headers switch where the next ids go
+        if token.lower() in SECTION_HEADERS:
+            section_name = SECTION_HEADERS[token.lower()]
+        # Card ids
+        elif token[0].isdigit():
+            if not token.isdigit():
+                raise ValueError(f"`{token}` is not a valid card id.")
+            deck.add(section_name, int(token))
+        # Everything else is a comment or the words following it
+
+    return deck
+
+# Parses a ydke:// link, each section is base64 encoded little endian 32 bit card ids, separated by "!"
+def parse_ydke(decklist: str) -> Deck:
+    sections = decklist[len(YDKE_PREFIX):].split("!")
+    if len(sections) < len(SECTIONS):
+        raise ValueError("The ydke:// link is missing a section.")
+
+    deck = Deck()
+    for section_name, encoded_section in zip(SECTIONS, sections):
+        try:
+            section_bytes = base64.b64decode(encoded_section, validate=True)
+        except binascii.Error:
+            raise ValueError(f"The {section_name} deck of the ydke:// link is not valid base64.")
+        if len(section_bytes) % 4:
+            raise ValueError(f"The {section_name} deck of the ydke:// link has a partial card id.")
+
+        for (card_id,) in struct.iter_unpack("<I", section_bytes):
+            deck.add(section_name, card_id)
+
+    return deck
+
+# Creates a ydke:// link from a deck
+def to_ydke(deck: Deck) -> str:
+    encoded_sections = []
+    for section_name in SECTIONS:
+        card_ids = [card_id for card_id, copies in deck.section(section_name).items() for _ in range(copies)]
+        encoded_sections.append(base64.b64encode(struct.pack(f"<{len(card_ids)}I", *card_ids)).decode("ascii"))
+    return YDKE_PREFIX + "!".join(encoded_sections) + "!"